@@ -0,0 +1,84 @@
+"""
+Ricerca dei soci duplicati nel registro di aViS66.
+
+Genera un registro con nominativi realistici e alcuni duplicati inseriti
+di proposito (stesso codice fiscale, stesso nominativo, refusi nel
+cognome) e misura find_duplicates.
+
+Uso:
+    python benchmarks/bench_avis_duplicates.py [--rows 100000] [--duplicates 500]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+
+SURNAMES = ["ROSSI", "RUSSO", "FERRARI", "ESPOSITO", "BIANCHI", "ROMANO", "COLOMBO",
+            "RICCI", "MARINO", "GRECO", "BRUNO", "GALLO", "CONTI", "DE LUCA", "MANCINI",
+            "COSTA", "GIORDANO", "RIZZO", "LOMBARDI", "MORETTI", "D'ANGELO", "NICOLÒ"]
+NAMES = ["MARIO", "LUCA", "GIUSEPPE", "ANNA", "MARIA", "FRANCESCO", "GIULIA", "SARA",
+         "PAOLO", "ANDREA", "ELENA", "MARCO", "CHIARA", "ALESSANDRO", "FEDERICA"]
+
+
+def typo(text):
+    position = random.randrange(1, len(text))
+    return text[:position] + random.choice("AEIOURST") + text[position + 1:]
+
+
+def make_register(rows, duplicates):
+    random.seed(0)
+    columns = [chr(65 + i) for i in range(23)]
+    data = {col: [f"{col}{i}" for i in range(rows)] for col in columns}
+    data["C"] = [random.choice(SURNAMES) + random.choice(["", "I", "NI", "LLI", "TTI"]) for _ in range(rows)]
+    data["D"] = [random.choice(NAMES) for _ in range(rows)]
+    data["E"] = [f"{random.randint(1, 28):02d}/{random.randint(1, 12):02d}/{random.randint(1940, 2005)}"
+                 for _ in range(rows)]
+    data["G"] = [f"CF{i:014d}" for i in range(rows)]
+    for i in range(duplicates):
+        source, target = random.randrange(rows), random.randrange(rows)
+        kind = i % 3
+        for col in columns:
+            data[col][target] = data[col][source]
+        if kind == 1:
+            data["G"][target] = ""
+        elif kind == 2:
+            data["G"][target] = ""
+            data["C"][target] = typo(data["C"][source])
+    return pd.DataFrame(data, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark della ricerca dei duplicati aViS66')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--duplicates', type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+    from src.avis66.duplicates import find_duplicates
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows, args.duplicates))
+
+    start = time.perf_counter()
+    groups = find_duplicates(model)
+    elapsed = time.perf_counter() - start
+
+    kinds = {}
+    for group in groups:
+        kinds[group.kind] = kinds.get(group.kind, 0) + 1
+    print(f"{args.rows} righe, {args.duplicates} duplicati inseriti: {elapsed:.2f} s")
+    for kind, count in kinds.items():
+        print(f"  {kind}: {count} gruppi")
+
+
+if __name__ == '__main__':
+    main()
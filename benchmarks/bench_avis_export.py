@@ -0,0 +1,76 @@
+"""
+Esportazione del registro di aViS66 per il SIAN.
+
+Confronta la vecchia export_to_excel (to_excel seguito dalla riscrittura di
+ogni cella con iloc per applicare il formato) con quella attuale, che
+applica il formato per colonna e scrive le righe da liste Python.
+
+Uso:
+    python benchmarks/bench_avis_export.py [--rows 50000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+
+def make_export_data(rows):
+    columns = [chr(65 + i) for i in range(23)]
+    header = pd.DataFrame([[f"COLONNA{i}" for i in range(23)]], columns=columns)
+    body = pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in columns},
+        columns=columns
+    )
+    return pd.concat([header, body]).reset_index(drop=True)
+
+
+def legacy_export(data, file_path):
+    """La vecchia export_to_excel"""
+    export_data = data.copy()
+    export_data.columns = export_data.iloc[0]
+    export_data = export_data.iloc[1:].reset_index(drop=True)
+    with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
+        export_data.to_excel(writer, index=False, sheet_name='Sheet1')
+        workbook = writer.book
+        worksheet = writer.sheets['Sheet1']
+        cell_format = workbook.add_format({'font_name': 'Calibri', 'font_size': 11})
+        for row in range(len(export_data) + 1):
+            for col in range(len(export_data.columns)):
+                if row == 0:
+                    value = export_data.columns[col]
+                else:
+                    value = export_data.iloc[row - 1, col]
+                worksheet.write(row, col, value, cell_format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dell'esportazione aViS66")
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='Misura solo la versione attuale')
+    args = parser.parse_args()
+
+    from src.avis66.excel_handler import export_to_excel
+
+    data = make_export_data(args.rows)
+    work_dir = tempfile.mkdtemp()
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        legacy_export(data, os.path.join(work_dir, "legacy.xlsx"))
+        legacy = time.perf_counter() - start
+        print(f"to_excel + riscrittura per cella: {legacy:7.2f} s ({args.rows / legacy:8.0f} righe/s)")
+
+    stats = export_to_excel(data, os.path.join(work_dir, "sian.xlsx"))
+    print(f"export_to_excel attuale:          {stats['elapsed']:7.2f} s "
+          f"({stats['rows_per_second']:8.0f} righe/s)")
+
+
+if __name__ == '__main__':
+    main()
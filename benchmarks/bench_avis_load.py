@@ -0,0 +1,86 @@
+"""
+Apertura di un registro di aViS66.
+
+Confronta la vecchia lettura (pd.read_excel dell'intero file prima di
+mostrare qualsiasi riga) con il caricamento a blocchi di RegisterLoadWorker:
+tempo alla prima schermata, tempo totale e massimo blocco del thread
+dell'interfaccia.
+
+Uso:
+    python benchmarks/bench_avis_load.py [--rows 30000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtCore import QEventLoop
+from PyQt5.QtWidgets import QApplication, QTableView
+
+
+def make_register(rows):
+    columns = [chr(65 + i) for i in range(23)]
+    return pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in columns},
+        columns=columns
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del caricamento del registro aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+    from src.avis66.loader import RegisterLoadWorker
+    from src.avis66.excel_handler import save_register
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows))
+    file_path = os.path.join(tempfile.mkdtemp(), "registro.xlsx")
+    save_register(model.get_store(), model.header, file_path)
+
+    # Vecchio percorso: l'interfaccia resta bloccata per tutta la lettura
+    model = AvisTableModel()
+    start = time.perf_counter()
+    model.load_data(pd.read_excel(file_path))
+    legacy = time.perf_counter() - start
+    print(f"pd.read_excel:   prima schermata {legacy:6.2f} s   totale {legacy:6.2f} s   "
+          f"interfaccia bloccata {legacy * 1000:8.1f} ms")
+
+    model = AvisTableModel()
+    view = QTableView()
+    view.setModel(model)
+    worker = RegisterLoadWorker(file_path, skip_row=model.header)
+    worker.header_loaded.connect(lambda header: model.clear_data())
+    timings = {"first": None, "longest": 0.0}
+
+    def append(rows):
+        tick = time.perf_counter()
+        model.append_rows(rows)
+        if timings["first"] is None:
+            timings["first"] = time.perf_counter() - start
+        timings["longest"] = max(timings["longest"], time.perf_counter() - tick)
+
+    worker.chunk_loaded.connect(append)
+    loop = QEventLoop()
+    worker.finished.connect(loop.quit)
+    start = time.perf_counter()
+    worker.start()
+    loop.exec_()
+    app.processEvents()
+    total = time.perf_counter() - start
+    print(f"a blocchi:       prima schermata {timings['first']:6.2f} s   totale {total:6.2f} s   "
+          f"interfaccia bloccata {timings['longest'] * 1000:8.1f} ms (massimo per blocco)")
+    print(f"Righe caricate: {model.rowCount() - 1}")
+
+
+if __name__ == '__main__':
+    main()
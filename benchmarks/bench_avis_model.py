@@ -0,0 +1,123 @@
+"""
+Scorrimento della tabella di aViS66 su un registro di grandi dimensioni.
+
+Confronta il modello attuale (store per colonne) con il vecchio modello
+basato su DataFrame.iloc, prima chiamando data() come fa la vista durante
+il disegno di una schermata, poi scorrendo una QTableView reale.
+
+Uso:
+    python benchmarks/bench_avis_model.py [--rows 30000] [--frames 200]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel
+from PyQt5.QtWidgets import QApplication, QTableView
+
+# Ruoli richiesti dalla vista per ogni cella disegnata
+PAINT_ROLES = [
+    Qt.DisplayRole, Qt.DecorationRole, Qt.FontRole, Qt.TextAlignmentRole,
+    Qt.BackgroundRole, Qt.ForegroundRole, Qt.CheckStateRole
+]
+
+
+class LegacyModel(QAbstractTableModel):
+    """Il modello precedente: DataFrame con iloc e pd.notna per cella"""
+
+    def __init__(self, df):
+        super().__init__()
+        self._data = df
+
+    def rowCount(self, parent=None):
+        return len(self._data)
+
+    def columnCount(self, parent=None):
+        return len(self._data.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole or role == Qt.EditRole:
+            value = self._data.iloc[index.row(), index.column()]
+            return str(value) if pd.notna(value) else ""
+        elif role == Qt.BackgroundRole and index.row() == 0:
+            return Qt.lightGray
+        return None
+
+
+def make_register(rows):
+    random.seed(0)
+    columns = [chr(65 + i) for i in range(23)]
+    data = {
+        col: [f"{col}{random.randint(0, 999999)}" if random.random() > 0.1 else None
+              for _ in range(rows)]
+        for col in columns
+    }
+    return pd.DataFrame(data, columns=columns)
+
+
+def paint_frames(model, frames, visible_rows=40):
+    """Chiama data() per ogni cella e ruolo di una schermata, per frames schermate"""
+    columns = model.columnCount()
+    total = model.rowCount()
+    start = time.perf_counter()
+    for frame in range(frames):
+        first = (frame * visible_rows) % max(total - visible_rows, 1)
+        for row in range(first, first + visible_rows):
+            for col in range(columns):
+                index = model.index(row, col)
+                for role in PAINT_ROLES:
+                    model.data(index, role)
+    return (time.perf_counter() - start) / frames
+
+
+def scroll_view(model, frames):
+    """Scorre una QTableView reale ridisegnando la viewport a ogni passo"""
+    view = QTableView()
+    view.resize(1400, 800)
+    view.setModel(model)
+    view.show()
+    scrollbar = view.verticalScrollBar()
+    step = max(scrollbar.maximum() // frames, 1)
+    start = time.perf_counter()
+    for frame in range(frames):
+        scrollbar.setValue(frame * step)
+        view.viewport().grab()
+    elapsed = (time.perf_counter() - start) / frames
+    view.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dello scorrimento della tabella aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+
+    df = make_register(args.rows)
+    legacy = LegacyModel(df)
+    model = AvisTableModel()
+    start = time.perf_counter()
+    model.load_data(df)
+    print(f"Registro: {args.rows} righe, caricamento nel modello {time.perf_counter() - start:.3f} s")
+
+    for label, target in (("DataFrame.iloc", legacy), ("store per colonne", model)):
+        paint = paint_frames(target, args.frames)
+        scroll = scroll_view(target, args.frames)
+        print(f"{label:18s} data() per schermata {paint * 1000:7.2f} ms   "
+              f"scorrimento QTableView {scroll * 1000:7.2f} ms/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Riapertura di un registro di aViS66.
+
+Confronta l'apertura a freddo (lettura dell'xlsx, a blocchi come in
+AvisGUI) con quella a caldo dalla copia binaria scritta accanto al registro.
+
+Uso:
+    python benchmarks/bench_avis_reopen.py [--rows 30000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+
+
+def make_register(rows):
+    columns = [chr(65 + i) for i in range(23)]
+    return pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in columns},
+        columns=columns
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark della riapertura del registro aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+    from src.avis66.excel_handler import save_register
+    from src.avis66.loader import iter_excel_chunks
+    from src.avis66.register_cache import read_sidecar, write_sidecar, sidecar_path
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows))
+    file_path = os.path.join(tempfile.mkdtemp(), "registro.xlsx")
+    save_register(model.get_store(), model.header, file_path)
+
+    # A freddo: xlsx letto per intero
+    start = time.perf_counter()
+    rows = []
+    for header, chunk, total in iter_excel_chunks(file_path):
+        if chunk:
+            rows.extend(chunk)
+    model = AvisTableModel()
+    model.load_columns([list(values) for values in zip(*rows)])
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = [[name] + values for name, values in zip(model.header, model.get_store().columns)]
+    write_sidecar(file_path, columns)
+    write = time.perf_counter() - start
+
+    # A caldo: copia binaria valida
+    start = time.perf_counter()
+    model = AvisTableModel()
+    model.load_columns(read_sidecar(file_path, len(model.columns)))
+    warm = time.perf_counter() - start
+
+    print(f"{args.rows} righe: apertura a freddo (xlsx) {cold:.2f} s   "
+          f"a caldo (cache) {warm * 1000:.1f} ms   "
+          f"scrittura cache {write * 1000:.1f} ms")
+    print(f"Dimensioni: xlsx {os.path.getsize(file_path) / 1024:.0f} KB   "
+          f"cache {os.path.getsize(sidecar_path(file_path)) / 1024:.0f} KB   "
+          f"righe {model.rowCount() - 1}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Inserimento e rimozione di righe nella tabella di aViS66.
+
+Confronta il vecchio percorso (pd.concat + reset_index per ogni riga) con
+le operazioni a blocchi di AvisTableModel, su un registro di grandi
+dimensioni e con una vista collegata al modello, e misura l'annullamento
+dell'eliminazione.
+
+Uso:
+    python benchmarks/bench_avis_rows.py [--rows 30000] [--delete 500]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtWidgets import QApplication, QTableView
+
+
+def make_register(rows):
+    columns = [chr(65 + i) for i in range(23)]
+    return pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in columns},
+        columns=columns
+    )
+
+
+def legacy_remove(df, rows):
+    """Come il vecchio AvisGUI.remove_row: una copia completa per riga"""
+    for row in sorted(rows, reverse=True):
+        df = pd.concat([df.iloc[:row], df.iloc[row + 1:]]).reset_index(drop=True)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark di inserimento/rimozione righe aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    parser.add_argument('--delete', type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+
+    df = make_register(args.rows)
+    random.seed(0)
+    scattered = random.sample(range(1, args.rows), args.delete)
+    block_start = args.rows // 2
+    block = list(range(block_start, block_start + args.delete))
+
+    cases = [("sparse", scattered), ("contigue", block)]
+    for label, rows in cases:
+        start = time.perf_counter()
+        legacy_remove(df, rows)
+        legacy = time.perf_counter() - start
+
+        model = AvisTableModel()
+        model.load_data(df)
+        view = QTableView()
+        view.setModel(model)
+        start = time.perf_counter()
+        model.remove_row_list(rows)
+        current = time.perf_counter() - start
+        start = time.perf_counter()
+        model.undo_stack.undo()
+        undo = time.perf_counter() - start
+        print(f"Rimozione {args.delete} righe {label:8s}: pd.concat {legacy * 1000:9.1f} ms   "
+              f"a blocchi {current * 1000:8.2f} ms   annulla {undo * 1000:8.2f} ms")
+
+    model = AvisTableModel()
+    model.load_data(df)
+    view = QTableView()
+    view.setModel(model)
+    new_rows = [[f"N{i}"] * 23 for i in range(args.delete)]
+    start = time.perf_counter()
+    model.insert_row_values(block_start, new_rows)
+    print(f"Inserimento di {args.delete} righe in un blocco: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
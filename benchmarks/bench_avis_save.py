@@ -0,0 +1,74 @@
+"""
+Salvataggio del registro di aViS66.
+
+Confronta il vecchio AvisGUI.save_file (lettura di ogni cella tramite
+model.data() e DataFrame.to_excel) con excel_handler.save_register, che
+scrive in streaming dallo store del modello su un file temporaneo.
+
+Uso:
+    python benchmarks/bench_avis_save.py [--rows 30000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+
+def make_register(rows):
+    columns = [chr(65 + i) for i in range(23)]
+    return pd.DataFrame(
+        {col: [f"{col}{i}" for i in range(rows)] for col in columns},
+        columns=columns
+    )
+
+
+def legacy_save(model, file_path):
+    """Il vecchio AvisGUI.save_file"""
+    data = []
+    for row in range(model.rowCount()):
+        row_data = {}
+        for col in range(model.columnCount()):
+            header = model.headerData(col, Qt.Horizontal)
+            index = model.index(row, col)
+            value = model.data(index)
+            row_data[header] = value if value is not None else ""
+        data.append(row_data)
+    pd.DataFrame(data).to_excel(file_path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del salvataggio del registro aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+    from src.avis66.excel_handler import save_register
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows))
+    work_dir = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    legacy_save(model, os.path.join(work_dir, "legacy.xlsx"))
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_register(model.get_store(), model.header, os.path.join(work_dir, "registro.xlsx"))
+    current = time.perf_counter() - start
+
+    print(f"{args.rows} righe: model.data() + to_excel {legacy:.2f} s   "
+          f"save_register {current:.2f} s ({args.rows / current:.0f} righe/s)")
+
+
+if __name__ == '__main__':
+    main()
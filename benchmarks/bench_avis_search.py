@@ -0,0 +1,80 @@
+"""
+Ricerca e ordinamento nella tabella soci di aViS66.
+
+Misura la costruzione degli indici di MemberIndex, le ricerche per codice
+fiscale (hash) e per cognome (prefisso), un filtro su più colonne e
+l'ordinamento tramite MemberFilterProxyModel.
+
+Uso:
+    python benchmarks/bench_avis_search.py [--rows 30000] [--repeat 1000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+SURNAMES = ["ROSSI", "RUSSO", "FERRARI", "ESPOSITO", "BIANCHI", "ROMANO", "COLOMBO",
+            "RICCI", "MARINO", "GRECO", "BRUNO", "GALLO", "CONTI", "DE LUCA", "COSTA"]
+NAMES = ["MARIO", "MARCO", "GIUSEPPE", "ANNA", "GIULIA", "LUCA", "FRANCESCA", "PAOLO"]
+
+
+def make_register(rows):
+    random.seed(0)
+    columns = [chr(65 + i) for i in range(23)]
+    data = {col: [""] * rows for col in columns}
+    data["C"] = [f"{random.choice(SURNAMES)}{random.randint(0, 99)}" for _ in range(rows)]
+    data["D"] = [random.choice(NAMES) for _ in range(rows)]
+    data["G"] = [f"RSSMRA{i:010d}" for i in range(rows)]
+    data["T"] = [str(100000 + i) for i in range(rows)]
+    return pd.DataFrame(data, columns=columns)
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:38s} {elapsed * 1e6:11.1f} µs")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark della ricerca nella tabella aViS66')
+    parser.add_argument('--rows', type=int, default=30000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+    from src.avis66.search import MemberFilterProxyModel
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows))
+    proxy = MemberFilterProxyModel()
+    timed("costruzione indici", lambda: proxy.setSourceModel(model))
+    index = proxy.index_
+
+    code = f"RSSMRA{args.rows // 2:010d}"
+    timed("codice fiscale (hash)", lambda: index.lookup("G", code), args.repeat)
+    timed("tessera (hash)", lambda: index.lookup("T", "100123"), args.repeat)
+    timed("cognome per prefisso 'ROSSI1'", lambda: index.lookup("C", "ROSSI1"), args.repeat)
+    timed("filtro cognome + nome", lambda: index.search({"C": "ROSSI1", "D": "MAR"}), args.repeat)
+    timed("proxy: applica filtro", lambda: proxy.set_filters({"C": "ROSSI1", "D": "MAR"}), 10)
+    proxy.clear_filters()
+    timed("proxy: ordina per cognome", lambda: proxy.sort(2, Qt.AscendingOrder), 10)
+    timed("proxy: ordina per tessera", lambda: proxy.sort(19, Qt.DescendingOrder), 10)
+    timed("modifica di una cella indicizzata",
+          lambda: model.setData(model.index(10, 6), "NUOVOCODICE"), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
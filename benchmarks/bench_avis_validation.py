@@ -0,0 +1,67 @@
+"""
+Controllo dei dati del registro di aViS66.
+
+Misura il controllo completo del registro (validate_columns su tutte le
+righe) e il ricontrollo di una sola riga dopo una modifica.
+
+Uso:
+    python benchmarks/bench_avis_validation.py [--rows 50000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pandas as pd
+from PyQt5.QtWidgets import QApplication
+
+
+def make_register(rows):
+    random.seed(0)
+    columns = [chr(65 + i) for i in range(23)]
+    df = pd.DataFrame({col: [f"{col}{i}" for i in range(rows)] for col in columns}, columns=columns)
+    # Codice fiscale coerente con data di nascita e genere
+    df["E"] = ["10/12/1985"] * rows
+    df["F"] = ["M"] * rows
+    df["G"] = ["RSSMRA85T10A562S"] * rows
+    df["I"] = df["L"] = ["RM"] * rows
+    df["M"] = [f"{random.randint(0, 99999):05d}" for _ in range(rows)]
+    df["O"] = ["3331234567"] * rows
+    df["Q"] = df["R"] = [f"socio{i}@example.it" for i in range(rows)]
+    df["S"] = ["2010-05-01 00:00:00"] * rows
+    df["V"] = [""] * rows
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del controllo dati aViS66')
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    from src.avis66.models import AvisTableModel
+
+    model = AvisTableModel()
+    model.load_data(make_register(args.rows))
+
+    start = time.perf_counter()
+    model.validator.revalidate()
+    full = time.perf_counter() - start
+
+    row = args.rows // 2
+    start = time.perf_counter()
+    model.setData(model.index(row, 4), "31/02/1990")
+    edit = time.perf_counter() - start
+
+    print(f"{args.rows} righe: controllo completo {full * 1000:.0f} ms   "
+          f"ricontrollo dopo una modifica {edit * 1000:.2f} ms   "
+          f"celle non valide {model.validator.error_count()}")
+
+
+if __name__ == '__main__':
+    main()
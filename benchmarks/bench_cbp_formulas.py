@@ -0,0 +1,63 @@
+"""
+Ricalcolo delle formule di CBP.
+
+Misura il caricamento di una tabella con molte formule (analisi e calcolo
+di tutte le celle), il ricalcolo dopo la modifica di una sola cella, che
+tocca solo le formule dipendenti, e la lettura del totale di colonna.
+
+Uso:
+    python benchmarks/bench_cbp_formulas.py [--rows 5000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motore delle formule CBP')
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    from src.cbp.calculator import FormulaEngine
+
+    rows = args.rows
+    cells = {}
+    for row in range(rows):
+        cells[(row, 1)] = f"{row % 97 + 0.5}"
+        cells[(row, 2)] = f"=ROUND(B{row + 1}*1.22;2)"
+    cells[(rows, 1)] = f"=SUM(B1:B{rows})"
+    cells[(rows, 2)] = f"=SUM(C1:C{rows})+AVG(B1:B{rows})"
+
+    engine = FormulaEngine()
+    start = time.perf_counter()
+    engine.load(cells)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    changed = engine.set_cell(rows // 2, 1, "1000")
+    single = time.perf_counter() - start
+
+    print(f"{rows} righe, {len(engine.formulas)} formule: calcolo completo {full * 1000:.1f} ms   "
+          f"modifica di una cella {single * 1000:.2f} ms ({len(changed)} celle ricalcolate)")
+    print(f"Totali: {engine.value(rows, 1):.2f}  {engine.value(rows, 2):.2f}")
+
+    # Totale della colonna importi: somma mantenuta a ogni modifica contro scansione completa
+    start = time.perf_counter()
+    for _ in range(1000):
+        engine.column_total(1)
+    running = (time.perf_counter() - start) / 1000
+    start = time.perf_counter()
+    for _ in range(1000):
+        float(np.nansum(engine.column_values(1)))
+    rescan = (time.perf_counter() - start) / 1000
+    print(f"Totale colonna: somma corrente {running * 1e6:.2f} µs   scansione {rescan * 1e6:.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
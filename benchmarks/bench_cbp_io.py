@@ -0,0 +1,87 @@
+"""
+Caricamento e salvataggio di una tabella CBP.
+
+Confronta il vecchio percorso (DataFrame -> un QTableWidgetItem per cella,
+e ritorno cella per cella con il testo degli importi da convertire) con il
+modello a colonne: le righe lette vanno direttamente nello store, gli
+importi sono convertiti una volta in centesimi e il totale non rilegge il
+testo delle celle.
+
+Uso:
+    python benchmarks/bench_cbp_io.py [--rows 20000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark caricamento/salvataggio CBP')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    import pandas as pd
+    from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+    from src.cbp.models import CbpTableModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    headers = ["Descrizione", "Importo", "Note"]
+    rows = [(f"Voce {i}", (i % 997) + 0.25, f"Nota {i % 13}" if i % 3 else None)
+            for i in range(args.rows)]
+
+    # Percorso precedente: widget popolato cella per cella
+    df = pd.DataFrame(rows, columns=headers)
+    table = QTableWidget(len(df) + 5, len(headers))
+    start = time.perf_counter()
+    for i, row in df.iterrows():
+        for j, value in enumerate(row):
+            table.setItem(i, j, QTableWidgetItem(str(value) if pd.notna(value) else ""))
+    old_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = []
+    for row in range(table.rowCount()):
+        values = [table.item(row, col).text() if table.item(row, col) else ""
+                  for col in range(table.columnCount())]
+        if any(values):
+            data.append(values)
+    pd.DataFrame(data, columns=headers)
+    old_save = time.perf_counter() - start
+
+    start = time.perf_counter()
+    old_total = 0.0
+    for row in range(table.rowCount()):
+        item = table.item(row, 1)
+        if item and item.text():
+            old_total += float(item.text().replace("€", "").replace(",", ""))
+    old_sum = time.perf_counter() - start
+
+    # Modello a colonne
+    model = CbpTableModel(headers)
+    start = time.perf_counter()
+    model.load_rows(rows)
+    new_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    filled = model.filled_rows()
+    new_save = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_total = model.total()
+    new_sum = time.perf_counter() - start
+
+    print(f"{args.rows} righe")
+    print(f"Caricamento:   celle {old_load * 1000:8.1f} ms   modello {new_load * 1000:8.1f} ms")
+    print(f"Salvataggio:   celle {old_save * 1000:8.1f} ms   modello {new_save * 1000:8.1f} ms "
+          f"({len(filled)} righe)")
+    print(f"Totale:        celle {old_sum * 1000:8.1f} ms   modello {new_sum * 1000:8.3f} ms "
+          f"({old_total:,.2f} / {new_total:,.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Ricerca nelle tabelle di CBP.
+
+Confronta la scansione di tutte le celle (il vecchio apply_search) con
+l'indice invertito del modello, per ricerche di una e più parole, e misura
+la costruzione dell'indice, il suo aggiornamento dopo una modifica e
+l'applicazione del risultato alla vista (riga per riga contro un solo
+passaggio).
+
+Uso:
+    python benchmarks/bench_cbp_search.py [--rows 20000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+WORDS = ["quote", "sociali", "rimborso", "spese", "carburante", "cancelleria", "donazione",
+         "affitto", "sede", "bolletta", "luce", "gas", "telefono", "festa", "donatori",
+         "assicurazione", "banca", "commissioni", "contributo", "comune"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark della ricerca CBP')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication, QTableView
+    from src.cbp.models import CbpTableModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    random.seed(66)
+    rows = [(" ".join(random.sample(WORDS, 3)) + f" {i}", random.randint(100, 99999) / 100,
+             f"rif. {random.choice(WORDS)} {i % 97}") for i in range(args.rows)]
+
+    model = CbpTableModel(["Descrizione", "Importo", "Note"])
+    start = time.perf_counter()
+    model.load_rows(rows)
+    build = time.perf_counter() - start
+    index = model.search_index
+    print(f"{args.rows} righe, {len(index.terms)} termini: caricamento con indice {build * 1000:.0f} ms")
+
+    for query in ["rimborso", "spese carb", "donaz sede 12", "inesistente"]:
+        needle = query.lower()
+        start = time.perf_counter()
+        scanned = [row for row in range(model.rowCount())
+                   if any(needle in model.display_text(row, col).lower()
+                          for col in range(model.columnCount()))]
+        scan = time.perf_counter() - start
+        start = time.perf_counter()
+        found = index.search(query)
+        indexed = time.perf_counter() - start
+        print(f"'{query}': scansione {scan * 1000:8.1f} ms ({len(scanned)} righe)   "
+              f"indice {indexed * 1000:6.3f} ms ({len(found)} righe)")
+
+    start = time.perf_counter()
+    model.setData(model.index(args.rows // 2, 0), "nuova descrizione rimborso")
+    edit = time.perf_counter() - start
+    print(f"Modifica di una cella (indice e formule aggiornati): {edit * 1000:.2f} ms")
+
+    table = QTableView()
+    table.setModel(model)
+    table.show()
+    app.processEvents()
+    visible = set(index.search("rimborso"))
+
+    start = time.perf_counter()
+    for row in range(model.rowCount()):
+        table.setRowHidden(row, row not in visible)
+    app.processEvents()
+    per_row = time.perf_counter() - start
+    for row in range(model.rowCount()):
+        table.setRowHidden(row, False)
+    app.processEvents()
+
+    # Stesso passaggio di CbpGUI.show_rows
+    start = time.perf_counter()
+    table.setUpdatesEnabled(False)
+    for row in range(model.rowCount()):
+        hidden = row not in visible
+        if table.isRowHidden(row) != hidden:
+            table.setRowHidden(row, hidden)
+    table.setUpdatesEnabled(True)
+    app.processEvents()
+    batched = time.perf_counter() - start
+    print(f"Righe nascoste: una per volta {per_row * 1000:.1f} ms   in un passaggio {batched * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Somma degli importi in centesimi interi.
+
+Confronta, su una colonna di importi con due decimali, la somma in float
+riga per riga (il vecchio calcolo dei totali di CBP) con la somma
+vettoriale in centesimi di src.money, e misura lo scarto accumulato dai
+float rispetto al totale esatto. Misura anche un totale mantenuto in
+centesimi durante molte modifiche, contro lo stesso totale in float.
+
+Uso:
+    python benchmarks/bench_cbp_totals.py [--rows 100000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark delle somme in centesimi')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    from src.money import parse_cents, to_cents_array, sum_cents, cents_to_decimal, float_to_cents
+
+    random.seed(66)
+    texts = [f"{random.randint(0, 99999) / 100:.2f}" for _ in range(args.rows)]
+    exact = sum(Decimal(text) for text in texts)
+
+    # Float riga per riga, dal testo delle celle
+    start = time.perf_counter()
+    float_total = 0.0
+    for text in texts:
+        float_total += float(text.replace("€", "").replace(",", ""))
+    float_time = time.perf_counter() - start
+
+    # Centesimi: conversione una volta sola, poi somma vettoriale
+    start = time.perf_counter()
+    cents = np.array([parse_cents(text) for text in texts], dtype=np.int64)
+    parse_time = time.perf_counter() - start
+    start = time.perf_counter()
+    cents_total = sum_cents(cents)
+    sum_time = time.perf_counter() - start
+
+    # Colonna di float (es. i valori del motore delle formule) -> centesimi
+    values = cents / 100
+    start = time.perf_counter()
+    column_total = sum_cents(to_cents_array(values))
+    column_time = time.perf_counter() - start
+
+    print(f"{args.rows} importi, totale esatto {exact:,.2f}")
+    print(f"Float riga per riga:  {float_time * 1000:7.2f} ms  scarto {Decimal(float_total) - exact:+.2E}")
+    print(f"Centesimi (somma):    {sum_time * 1000:7.2f} ms  scarto {cents_to_decimal(cents_total) - exact:+.2f}"
+          f"   (conversione del testo {parse_time * 1000:.1f} ms, una volta sola)")
+    print(f"Colonna float -> cent:{column_time * 1000:7.2f} ms  scarto {cents_to_decimal(column_total) - exact:+.2f}")
+
+    # Totale mantenuto a ogni modifica: in float l'errore si accumula
+    edits = [(random.randrange(args.rows), random.randint(0, 99999) / 100) for _ in range(args.rows)]
+    current = values.copy()
+    running_float = float(np.sum(current))
+    running_cents = cents_total
+    start = time.perf_counter()
+    for row, value in edits:
+        running_cents += float_to_cents(value) - float_to_cents(current[row])
+        running_float += value - current[row]
+        current[row] = value
+    edit_time = (time.perf_counter() - start) / len(edits)
+    final = sum(Decimal(f"{value:.2f}") for value in current)
+    print(f"{len(edits)} modifiche ({edit_time * 1e6:.2f} µs l'una): "
+          f"scarto float {Decimal(running_float) - final:+.2E}   "
+          f"scarto centesimi {cents_to_decimal(running_cents) - final:+.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Confronto tra riscrittura completa e salvataggio incrementale in
+ordina.file_handler.handle_pdf su PDF di grandi dimensioni (es. verbali
+scansionati).
+
+Uso:
+    python benchmarks/bench_pdf_save.py [--pages 200] [--repeat 3] [--input FILE.pdf]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import fitz  # PyMuPDF
+from PyQt5.QtGui import QGuiApplication
+
+
+def make_scanned_pdf(path, pages):
+    """Crea un PDF con una 'scansione' incomprimibile per pagina"""
+    pdf = fitz.open()
+    for _ in range(pages):
+        page = pdf.new_page()
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 800, 1100), 0)
+        pix.set_rect(pix.irect, (255, 255, 255))
+        pix.samples_mv[:] = os.urandom(len(pix.samples_mv))
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg"))
+    pdf.save(path)
+    pdf.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del salvataggio PDF di Ordina')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--input', type=str, default=None,
+                        help='PDF da usare al posto di quello generato')
+    args = parser.parse_args()
+
+    app = QGuiApplication(sys.argv[:1])
+    from src.ordina.settings import ordina_settings as settings
+    from src.ordina.file_handler import handle_pdf
+    from src.ordina.utils import create_stamp
+
+    work_dir = tempfile.mkdtemp()
+    input_path = args.input
+    if input_path is None:
+        input_path = os.path.join(work_dir, "scansione.pdf")
+        print(f"Generazione di un PDF di {args.pages} pagine...")
+        make_scanned_pdf(input_path, args.pages)
+    input_size = os.path.getsize(input_path)
+    print(f"Input: {input_path} ({input_size / 1e6:.1f} MB)")
+
+    modes = [
+        ("riscrittura completa", {"incremental": False, "garbage": 0, "deflate": False}),
+        ("riscrittura + garbage=3, deflate", {"incremental": False, "garbage": 3, "deflate": True}),
+        ("incrementale", {"incremental": True, "garbage": 0, "deflate": False}),
+    ]
+
+    for label, pdf_save in modes:
+        settings.current_settings["pdf_save"] = pdf_save
+        timings = []
+        for i in range(args.repeat):
+            output_path = os.path.join(work_dir, f"out_{i}.pdf")
+            stamp = create_stamp(f"{i + 1:05d}")
+            start = time.perf_counter()
+            handle_pdf(input_path, output_path, stamp)
+            timings.append(time.perf_counter() - start)
+            output_size = os.path.getsize(output_path)
+            os.remove(output_path)
+        best = min(timings)
+        print(f"{label:34s} {best * 1000:9.1f} ms  "
+              f"{input_size / 1e6 / best:8.1f} MB/s  "
+              f"output {output_size / 1e6:.2f} MB (+{(output_size - input_size) / 1e3:.1f} kB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Confronto tra i profili di conversione di pdftoa.converter su un PDF di
+grandi dimensioni: tempo e picco di memoria residente per file.
+
+Ogni profilo viene eseguito in un processo nuovo (BatchConverter con un solo
+processo), così il picco misurato non risente delle esecuzioni precedenti.
+
+Uso:
+    python benchmarks/bench_pdfa_profiles.py [--pages 2000] [--input FILE.pdf]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+
+def make_register_pdf(path, pages):
+    """Crea un PDF con molte pagine e molti oggetti (es. registro soci scansionato)"""
+    pdf = fitz.open()
+    for number in range(pages):
+        page = pdf.new_page()
+        pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 600, 800), 0)
+        pix.samples_mv[:] = os.urandom(len(pix.samples_mv))
+        page.insert_image(page.rect, stream=pix.tobytes("png"))
+        page.insert_text((72, 72), f"Registro soci - pagina {number + 1}")
+    pdf.save(path)
+    pdf.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dei profili di conversione PDF/A')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--input', type=str, default=None,
+                        help='PDF da usare al posto di quello generato')
+    args = parser.parse_args()
+
+    from src.pdftoa.batch import BatchConverter
+    from src.pdftoa.converter import PDFConverter
+
+    work_dir = tempfile.mkdtemp()
+    input_path = args.input
+    if input_path is None:
+        input_path = os.path.join(work_dir, "registro.pdf")
+        print(f"Generazione di un PDF di {args.pages} pagine...")
+        make_register_pdf(input_path, args.pages)
+    input_size = os.path.getsize(input_path)
+    print(f"Input: {input_path} ({input_size / 1e6:.1f} MB)")
+
+    for profile in PDFConverter.PROFILES:
+        output_path = os.path.join(work_dir, f"out_{profile}.pdf")
+        converter = BatchConverter(plan=[(input_path, output_path)], max_workers=1, profile=profile)
+        results, _ = converter.run()
+        result = results[0]
+        if result["error"]:
+            print(f"{profile:12s} ERRORE: {result['error']}")
+            continue
+        peak = f"{result['peak_mb']:8.0f} MB" if result["peak_mb"] is not None else "       n/d"
+        output_size = os.path.getsize(output_path)
+        print(f"{profile:12s} {result['elapsed']:8.2f} s  picco {peak}  "
+              f"{input_size / 1e6 / result['elapsed']:7.1f} MB/s  output {output_size / 1e6:.1f} MB")
+        os.remove(output_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Stress test del contatore dei protocolli di Ordina.
+
+Più processi prenotano numeri contemporaneamente sullo stesso database;
+alla fine si verifica che non ci siano duplicati né buchi e si misura il
+throughput.
+
+Uso:
+    python benchmarks/bench_protocol_counter.py [--processes 8] [--requests 200] [--max-batch 5]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ordina.protocol_counter import ProtocolCounter
+
+YEAR = "2099"
+
+
+def hammer(args):
+    db_path, requests, max_batch, seed = args
+    rng = random.Random(seed)
+    counter = ProtocolCounter(db_path)
+    numbers = []
+    for _ in range(requests):
+        numbers.extend(counter.reserve(YEAR, rng.randint(1, max_batch)))
+    counter.confirm(YEAR, numbers)
+    return numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress test del contatore dei protocolli')
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Prenotazioni per processo')
+    parser.add_argument('--max-batch', type=int, default=5,
+                        help='Numeri massimi per prenotazione')
+    parser.add_argument('--db', type=str, default=None,
+                        help='Database da usare (es. su una cartella di rete)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "numerazione.db")
+    counter = ProtocolCounter(db_path)
+    counter.reset(YEAR)
+
+    jobs = [(db_path, args.requests, args.max_batch, seed) for seed in range(args.processes)]
+    start = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(hammer, jobs)
+    elapsed = time.perf_counter() - start
+
+    numbers = [n for chunk in results for n in chunk]
+    reservations = args.processes * args.requests
+    duplicates = len(numbers) - len(set(numbers))
+    last = counter.last_number(YEAR)
+    gaps = counter.audit_gaps(YEAR)
+
+    print(f"Database: {db_path}")
+    print(f"Processi: {args.processes}, prenotazioni: {reservations}, numeri: {len(numbers)}")
+    print(f"Tempo: {elapsed:.2f}s, {reservations / elapsed:.0f} prenotazioni/s, "
+          f"{elapsed / reservations * 1000:.2f} ms per prenotazione")
+    print(f"Ultimo numero: {last}, duplicati: {duplicates}, buchi: {len(gaps)}")
+
+    ok = duplicates == 0 and not gaps and sorted(numbers) == list(range(1, last + 1))
+    print("OK" if ok else "ERRORE: numerazione non consistente")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Timbratura di documenti Word ed Excel in Ordina.
+
+Timbra una serie di DOCX e XLSX con numeri di protocollo diversi, misura il
+tempo per documento e verifica che l'immagine inserita in ogni file sia
+identica, pixel per pixel, a create_stamp(numero). Esce con codice 1 se un
+documento contiene un timbro diverso (es. la parte fissa senza numero).
+
+Uso:
+    python benchmarks/bench_stamp_office.py [--documents 20] [--first 1234]
+"""
+
+import io
+import os
+import sys
+import time
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def embedded_images(path):
+    """Immagini contenute nel pacchetto Office (cartella media)"""
+    with zipfile.ZipFile(path) as package:
+        return [package.read(name) for name in package.namelist() if "/media/" in name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark e verifica della timbratura DOCX/XLSX')
+    parser.add_argument('--documents', type=int, default=20)
+    parser.add_argument('--first', type=int, default=1234)
+    args = parser.parse_args()
+
+    from PIL import Image, ImageChops
+    from PyQt5.QtWidgets import QApplication
+    from docx import Document
+    import openpyxl
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from src.ordina.utils import create_stamp
+    from src.ordina.file_handler import handle_docx, handle_xlsx
+
+    errors = 0
+    with tempfile.TemporaryDirectory() as directory:
+        docx_path = os.path.join(directory, "originale.docx")
+        Document().save(docx_path)
+        xlsx_path = os.path.join(directory, "originale.xlsx")
+        openpyxl.Workbook().save(xlsx_path)
+
+        for handler, source in ((handle_docx, docx_path), (handle_xlsx, xlsx_path)):
+            elapsed = 0.0
+            for number in range(args.first, args.first + args.documents):
+                stamp = create_stamp(str(number))
+                output = os.path.join(directory, f"timbrato_{number}{os.path.splitext(source)[1]}")
+                start = time.perf_counter()
+                handler(source, output, stamp)
+                elapsed += time.perf_counter() - start
+
+                expected = stamp.convert("RGBA")
+                images = embedded_images(output)
+                with Image.open(io.BytesIO(images[0])) as embedded:
+                    embedded = embedded.convert("RGBA")
+                    same = len(images) == 1 and embedded.size == expected.size and \
+                        ImageChops.difference(embedded, expected).getbbox() is None
+                if not same:
+                    errors += 1
+                    print(f"ERRORE: {os.path.basename(output)} non contiene il timbro {number}")
+            print(f"{handler.__name__}: {args.documents} documenti, "
+                  f"{elapsed / args.documents * 1000:.1f} ms per documento")
+
+    if errors:
+        print(f"{errors} documenti con timbro errato")
+        sys.exit(1)
+    print("Timbri inseriti corretti")
+
+
+if __name__ == '__main__':
+    main()
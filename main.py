@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # Aggiungi la directory src al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
@@ -12,6 +13,8 @@ from src.avis66.settings import avis_settings
 from src.utils import get_asset_path
 
 if __name__ == "__main__":
+    # Necessario per i processi di lavoro (protocollazione in blocco) nell'eseguibile
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon(get_asset_path('logo_abe.ico')))
     
@@ -5,7 +5,15 @@ Abe - Suite di applicazioni per Avis
 __version__ = '1.0.0'
 __author__ = 'Emmanuele Pani'
 
-from .ordina import ProtocolGUI
-from .ordina.settings import ordina_settings as settings
+__all__ = ['ProtocolGUI', 'settings']
 
-__all__ = ['ProtocolGUI', 'settings']
\ No newline at end of file
+def __getattr__(name):
+    # Import differito: gli strumenti da riga di comando (es. src.pdftoa.cli)
+    # possono usare il package senza caricare PyQt
+    if name == 'ProtocolGUI':
+        from .ordina import ProtocolGUI
+        return ProtocolGUI
+    if name == 'settings':
+        from .ordina.settings import ordina_settings
+        return ordina_settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
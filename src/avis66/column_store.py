@@ -0,0 +1,164 @@
+import pandas as pd
+
+class ColumnStore:
+    """
+    Dati del registro soci memorizzati per colonna.
+
+    Ogni colonna è una lista Python di stringhe già pronte per la
+    visualizzazione, quindi la lettura di una cella è un doppio accesso per
+    indice, senza passare da pandas. La conversione da e verso DataFrame
+    avviene solo in importazione ed esportazione.
+    """
+
+    def __init__(self, column_keys, rows=0):
+        self.column_keys = list(column_keys)
+        self.columns = [[""] * rows for _ in self.column_keys]
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    @staticmethod
+    def to_text(series):
+        """Converte una colonna di un DataFrame in stringhe ("" per i valori mancanti)"""
+        missing = series.isna().tolist()
+        return ["" if is_missing else str(value)
+                for value, is_missing in zip(series.tolist(), missing)]
+
+    @classmethod
+    def from_dataframe(cls, df, column_keys):
+        """
+        Crea lo store da un DataFrame. Le colonne vengono associate per
+        posizione: quelle in eccesso sono ignorate, quelle mancanti restano vuote.
+        """
+        store = cls(column_keys)
+        rows = len(df)
+        for i in range(len(store.column_keys)):
+            if i < len(df.columns):
+                store.columns[i] = cls.to_text(df.iloc[:, i])
+            else:
+                store.columns[i] = [""] * rows
+        return store
+
+    @classmethod
+    def from_columns(cls, column_keys, columns):
+        """Crea lo store da colonne di stringhe già pronte (es. la copia binaria del registro)"""
+        store = cls(column_keys)
+        store.columns = [list(values) for values in columns]
+        return store
+
+    def to_dataframe(self, header=None):
+        """
+        Restituisce i dati come DataFrame con colonne column_keys.
+
+        Args:
+            header (list, optional): Riga da anteporre ai dati (es. i nomi delle colonne)
+        """
+        if header is None:
+            data = {key: list(values) for key, values in zip(self.column_keys, self.columns)}
+        else:
+            data = {key: [name] + values
+                    for key, name, values in zip(self.column_keys, header, self.columns)}
+        return pd.DataFrame(data, columns=self.column_keys)
+
+    def get(self, row, column):
+        return self.columns[column][row]
+
+    def set(self, row, column, value):
+        self.columns[column][row] = "" if value is None else str(value)
+
+    def row_values(self, row):
+        """Valori di una riga, nell'ordine delle colonne"""
+        return [values[row] for values in self.columns]
+
+    def insert_rows(self, position, count=1, rows=None):
+        """
+        Inserisce un blocco di righe a partire da position.
+
+        Ogni colonna viene modificata con un'unica assegnazione a slice,
+        qualunque sia il numero di righe del blocco.
+
+        Args:
+            count (int): Numero di righe vuote da inserire (se rows è None)
+            rows (list, optional): Valori delle righe da inserire, una lista per riga
+        """
+        if rows is None:
+            empty = [""] * count
+            for values in self.columns:
+                values[position:position] = empty
+            return
+        for i, values in enumerate(self.columns):
+            values[position:position] = [
+                str(row[i]) if i < len(row) and row[i] is not None else "" for row in rows
+            ]
+
+    def remove_rows(self, position, count=1):
+        """
+        Rimuove count righe a partire da position.
+
+        Returns:
+            list: Valori delle righe rimosse, una lista per riga
+        """
+        removed = [values[position:position + count] for values in self.columns]
+        for values in self.columns:
+            del values[position:position + count]
+        return [list(row) for row in zip(*removed)]
+
+    def remove_ranges(self, ranges):
+        """
+        Rimuove più intervalli con una sola ricostruzione di ogni colonna.
+
+        Args:
+            ranges (list): Coppie (prima riga, numero di righe), dalla più alta alla più bassa
+
+        Returns:
+            list: Coppie (prima riga, valori rimossi), nello stesso ordine
+        """
+        removed = [(position, [self.row_values(row) for row in range(position, position + count)])
+                   for position, count in ranges]
+        kept = []
+        previous = 0
+        for position, count in reversed(ranges):
+            kept.append((previous, position))
+            previous = position + count
+        kept.append((previous, len(self)))
+        for i, values in enumerate(self.columns):
+            column = []
+            for start, end in kept:
+                column.extend(values[start:end])
+            self.columns[i] = column
+        return removed
+
+    def insert_blocks(self, blocks):
+        """
+        Reinserisce più blocchi di righe con una sola ricostruzione di ogni colonna.
+
+        Args:
+            blocks (list): Coppie (posizione finale, valori delle righe), dalla più bassa alla più alta
+        """
+        for i, values in enumerate(self.columns):
+            column = []
+            taken = 0
+            for position, rows in blocks:
+                needed = position - len(column)
+                column.extend(values[taken:taken + needed])
+                taken += needed
+                column.extend(row[i] if i < len(row) else "" for row in rows)
+            column.extend(values[taken:])
+            self.columns[i] = column
+
+    @staticmethod
+    def contiguous_ranges(rows):
+        """
+        Raggruppa un elenco di righe in intervalli contigui.
+
+        Returns:
+            list: Coppie (prima riga, numero di righe), dalla più alta alla più
+                  bassa, così rimuovendole in ordine gli indici restano validi
+        """
+        ranges = []
+        for row in sorted(set(rows), reverse=True):
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1] = (row, ranges[-1][1] + 1)
+            else:
+                ranges.append((row, 1))
+        return ranges
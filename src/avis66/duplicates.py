@@ -0,0 +1,241 @@
+"""
+Ricerca dei soci duplicati nel registro di aViS66.
+
+- Duplicati esatti: indici hash su chiavi normalizzate (codice fiscale;
+  cognome, nome e data di nascita).
+- Quasi-duplicati: le righe vengono raggruppate in blocchi (prime lettere
+  del cognome e anno di nascita, oppure data di nascita e iniziali del
+  nome, per i refusi all'inizio del cognome) e la somiglianza dei
+  nominativi viene calcolata solo all'interno di ogni blocco, quindi il
+  numero di confronti resta molto lontano da n².
+
+Il risultato è un elenco di gruppi da rivedere e, se confermati, unire.
+"""
+
+import re
+from difflib import SequenceMatcher
+from collections import defaultdict
+import pandas as pd
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
+)
+from PyQt5.QtCore import Qt
+from .search import normalize, COLUMN_COGNOME, COLUMN_NOME, COLUMN_CODICEFISCALE
+from .validation import COLUMN_DATANASCITA, parse_dates
+
+KIND_CODICEFISCALE = "Codice fiscale"
+KIND_NOMINATIVO = "Nominativo e data di nascita"
+KIND_SIMILE = "Nominativo simile"
+
+SIMILARITY_THRESHOLD = 0.85
+SURNAME_BLOCK_PREFIX = 3
+NAME_BLOCK_PREFIX = 2
+
+_NOT_LETTERS = re.compile(r"[^A-Z]")
+
+
+class DuplicateGroup:
+    """Righe dello store che sembrano riferirsi allo stesso socio"""
+
+    def __init__(self, kind, rows, score=1.0):
+        self.kind = kind
+        self.rows = sorted(rows)
+        self.score = score
+
+
+def _name_key(value):
+    """Nominativo per i confronti: maiuscolo, senza accenti, spazi e apostrofi"""
+    return _NOT_LETTERS.sub("", normalize(value))
+
+
+def _exact_groups(keys, kind):
+    index = defaultdict(list)
+    for row, key in enumerate(keys):
+        if key:
+            index[key].append(row)
+    return [DuplicateGroup(kind, rows) for rows in index.values() if len(rows) > 1]
+
+
+def find_duplicates(model, threshold=SIMILARITY_THRESHOLD):
+    """
+    Cerca i duplicati tra le righe di un AvisTableModel.
+
+    Args:
+        model (AvisTableModel): Registro da controllare
+        threshold (float): Somiglianza minima dei nominativi (0-1) per i quasi-duplicati
+
+    Returns:
+        list: DuplicateGroup, prima i duplicati esatti
+    """
+    store = model.get_store()
+    column = model.columns.index
+    surnames = [_name_key(value) for value in store.columns[column(COLUMN_COGNOME)]]
+    names = [_name_key(value) for value in store.columns[column(COLUMN_NOME)]]
+    codes = [normalize(value) for value in store.columns[column(COLUMN_CODICEFISCALE)]]
+    births = parse_dates(
+        pd.Series(store.columns[column(COLUMN_DATANASCITA)], dtype=object).str.strip()
+    ).dt.strftime("%Y-%m-%d").fillna("").tolist()
+
+    groups = _exact_groups(codes, KIND_CODICEFISCALE)
+    full_keys = [f"{surname} {name} {birth}" if surname and name and birth else ""
+                 for surname, name, birth in zip(surnames, names, births)]
+    # Un gruppo già trovato per codice fiscale non va ripetuto
+    by_code = {row: frozenset(group.rows) for group in groups for row in group.rows}
+    groups += [group for group in _exact_groups(full_keys, KIND_NOMINATIVO)
+               if not set(group.rows) <= by_code.get(group.rows[0], frozenset())]
+
+    # Coppie già coperte da un duplicato esatto
+    known = set()
+    for group in groups:
+        for i, first in enumerate(group.rows):
+            for second in group.rows[i + 1:]:
+                known.add((first, second))
+
+    blocks = defaultdict(list)
+    for row, (surname, name, birth) in enumerate(zip(surnames, names, births)):
+        if not surname or not birth:
+            continue
+        blocks[("C", surname[:SURNAME_BLOCK_PREFIX], birth[:4])].append(row)
+        if name:
+            blocks[("N", name[:NAME_BLOCK_PREFIX], birth)].append(row)
+
+    matcher = SequenceMatcher(autojunk=False)
+    scores = {}
+    for rows in blocks.values():
+        if len(rows) < 2:
+            continue
+        for i, first in enumerate(rows):
+            full_first = f"{surnames[first]} {names[first]}"
+            # SequenceMatcher riusa le statistiche della seconda sequenza
+            matcher.set_seq2(full_first)
+            for second in rows[i + 1:]:
+                pair = (first, second)
+                if pair in known or pair in scores or births[first] != births[second]:
+                    continue
+                if codes[first] and codes[second] and codes[first] != codes[second] \
+                        and codes[first][:11] != codes[second][:11]:
+                    # Codici fiscali diversi anche nella parte anagrafica: persone diverse
+                    continue
+                matcher.set_seq1(f"{surnames[second]} {names[second]}")
+                if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                    continue
+                score = matcher.ratio()
+                if score >= threshold:
+                    scores[pair] = score
+
+    groups += [DuplicateGroup(KIND_SIMILE, pair, score)
+               for pair, score in sorted(scores.items(), key=lambda item: -item[1])]
+    return groups
+
+
+def merge_values(rows):
+    """
+    Valori della riga risultante dall'unione: per ogni colonna il primo
+    valore non vuoto, nell'ordine delle righe.
+    """
+    merged = list(rows[0])
+    for values in rows[1:]:
+        for i, value in enumerate(values):
+            if not merged[i] and value:
+                merged[i] = value
+    return merged
+
+
+class DuplicatesDialog(QDialog):
+    """Elenco dei duplicati trovati, da rivedere prima dell'unione"""
+
+    def __init__(self, model, groups, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.groups = groups
+        self.setWindowTitle("Soci Duplicati")
+        self.resize(900, 500)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            f"Trovati {len(self.groups)} gruppi di possibili duplicati. "
+            "Seleziona quelli da unire: la prima riga del gruppo viene completata "
+            "con i dati mancanti presi dalle altre, che vengono eliminate."
+        ))
+
+        store = self.model.get_store()
+        column = self.model.columns.index
+        self.table = QTableWidget(len(self.groups), 6)
+        self.table.setHorizontalHeaderLabels(
+            ["Unisci", "Tipo", "Righe", "Nominativi", "Codici fiscali", "Somiglianza"]
+        )
+        for i, group in enumerate(self.groups):
+            check = QTableWidgetItem()
+            check.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            check.setCheckState(Qt.Unchecked)
+            self.table.setItem(i, 0, check)
+            self.table.setItem(i, 1, QTableWidgetItem(group.kind))
+            # Numeri di riga come nella tabella principale (la riga 1 è quella dei nomi)
+            self.table.setItem(i, 2, QTableWidgetItem(", ".join(str(row + 2) for row in group.rows)))
+            self.table.setItem(i, 3, QTableWidgetItem(" / ".join(
+                f"{store.get(row, column(COLUMN_COGNOME))} {store.get(row, column(COLUMN_NOME))} "
+                f"({store.get(row, column(COLUMN_DATANASCITA))})" for row in group.rows
+            )))
+            self.table.setItem(i, 4, QTableWidgetItem(" / ".join(
+                store.get(row, column(COLUMN_CODICEFISCALE)) for row in group.rows
+            )))
+            self.table.setItem(i, 5, QTableWidgetItem(f"{group.score:.0%}"))
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        select_exact = QPushButton("Seleziona Esatti")
+        select_exact.clicked.connect(self.select_exact)
+        buttons.addWidget(select_exact)
+        buttons.addStretch()
+        merge_button = QPushButton("Unisci Selezionati")
+        merge_button.clicked.connect(self.merge_selected)
+        buttons.addWidget(merge_button)
+        close_button = QPushButton("Chiudi")
+        close_button.clicked.connect(self.reject)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def select_exact(self):
+        for i, group in enumerate(self.groups):
+            if group.kind != KIND_SIMILE:
+                self.table.item(i, 0).setCheckState(Qt.Checked)
+
+    def merge_selected(self):
+        """Unisce i gruppi selezionati; una riga già unita non viene riusata"""
+        store = self.model.get_store()
+        used = set()
+        merges = []  # (riga da conservare, righe del gruppo)
+        for i, group in enumerate(self.groups):
+            if self.table.item(i, 0).checkState() != Qt.Checked:
+                continue
+            rows = [row for row in group.rows if row not in used]
+            if len(rows) < 2:
+                continue
+            used.update(rows)
+            merges.append((rows[0], rows))
+
+        # Nessun passo vuoto nella cronologia se non c'è niente da unire
+        if not merges:
+            QMessageBox.information(self, "Soci Duplicati", "Nessun gruppo selezionato")
+            return
+
+        removed = []
+        # L'unione si annulla con un solo passo
+        self.model.undo_stack.beginMacro("Unione duplicati")
+        for keep, rows in merges:
+            self.model.set_row_values(keep + 1, merge_values([store.row_values(row) for row in rows]))
+            removed.extend(row + 1 for row in rows[1:])
+        self.model.remove_row_list(removed)
+        self.model.undo_stack.endMacro()
+
+        merged = len(merges)
+        QMessageBox.information(
+            self, "Soci Duplicati",
+            f"Uniti {merged} gruppi, eliminate {len(removed)} righe"
+        )
+        self.accept()
@@ -1,4 +1,7 @@
+import os
+import time
 import pandas as pd
+import xlsxwriter
 
 def import_from_excel(file_path):
     """Importa dati da un file Excel."""
@@ -21,49 +24,97 @@ def import_from_excel(file_path):
         raise Exception(f"Errore durante l'importazione: {str(e)}")
 
 def export_to_excel(data, file_path):
-    """Esporta dati in un file Excel."""
+    """
+    Esporta dati in un file Excel.
+
+    Args:
+        data (DataFrame): Dati del registro, con i nomi delle colonne nella prima riga
+        file_path (str): File di destinazione
+
+    Returns:
+        dict: "rows" (righe esportate), "elapsed" (secondi) e "rows_per_second"
+    """
     try:
+        start = time.perf_counter()
+
         # Assicurati che il file abbia estensione .xlsx
         if not file_path.endswith('.xlsx'):
             file_path += '.xlsx'
 
-        # Crea una copia del DataFrame per non modificare l'originale
-        export_data = data.copy()
-
-        # Rinomina le colonne con i valori della prima riga
-        # e poi rimuovi la prima riga che conteneva i nomi delle colonne
-        export_data.columns = export_data.iloc[0]
-        export_data = export_data.iloc[1:]
-
-        # Resetta gli indici dopo aver rimosso la prima riga
-        export_data = export_data.reset_index(drop=True)
-
-        # Crea un nuovo file Excel con xlsxwriter come engine
-        with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-            # Esporta i dati senza formattazione
-            export_data.to_excel(writer, index=False, sheet_name='Sheet1')
-            
-            # Ottieni il foglio di lavoro
-            workbook = writer.book
-            worksheet = writer.sheets['Sheet1']
-            
-            # Definisci il formato per tutte le celle
-            cell_format = workbook.add_format({
-                'font_name': 'Calibri',
-                'font_size': 11,
-                'border': 0,
-                'bold': False
-            })
-            
-            # Applica il formato a tutte le celle
-            for row in range(len(export_data) + 1):  # +1 per l'intestazione
-                for col in range(len(export_data.columns)):
-                    # Ottieni il valore direttamente dal DataFrame
-                    if row == 0:
-                        value = export_data.columns[col]
-                    else:
-                        value = export_data.iloc[row-1, col]
-                    worksheet.write(row, col, value, cell_format)
+        # La prima riga contiene i nomi delle colonne, le altre i dati.
+        # Le colonne vengono estratte una volta sola come liste Python
+        header = list(data.iloc[0]) if len(data) else list(data.columns)
+        columns = [data.iloc[1:, col].tolist() for col in range(len(data.columns))]
+
+        workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Sheet1')
+
+        # Il formato viene applicato una volta per colonna invece che cella per cella:
+        # coincide con il carattere predefinito della cartella (Calibri 11)
+        cell_format = workbook.add_format({
+            'font_name': 'Calibri',
+            'font_size': 11,
+            'border': 0,
+            'bold': False
+        })
+        worksheet.set_column(0, len(header) - 1, None, cell_format)
+
+        worksheet.write_row(0, 0, header, cell_format)
+        write_string = worksheet.write_string
+        write = worksheet.write
+        rows = 0
+        for rows, values in enumerate(zip(*columns), start=1):
+            for col, value in enumerate(values):
+                if isinstance(value, str):
+                    if value:
+                        write_string(rows, col, value)
+                elif not pd.isna(value):
+                    write(rows, col, value)
+        workbook.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "elapsed": elapsed,
+            "rows_per_second": rows / elapsed if elapsed > 0 else 0.0
+        }
+
+    except Exception as e:
+        raise Exception(f"Errore durante l'esportazione: {str(e)}")
+
+def save_register(store, header, file_path):
+    """
+    Salva il registro soci direttamente dallo store del modello.
+
+    Le righe vengono scritte in streaming (xlsxwriter in modalità
+    constant_memory) su un file temporaneo nella stessa cartella, che poi
+    sostituisce l'originale: un'interruzione durante il salvataggio lascia
+    intatto il registro precedente.
+
+    Args:
+        store (ColumnStore): Dati dei soci
+        header (list): Nomi delle colonne, scritti nella prima riga dopo le lettere
+        file_path (str): Percorso del registro
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    tmp_path = os.path.join(directory, f".~{name}.{os.getpid()}.tmp")
+    try:
+        workbook = xlsxwriter.Workbook(tmp_path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Sheet1')
+        write_string = worksheet.write_string
+
+        worksheet.write_row(0, 0, store.column_keys)
+        worksheet.write_row(1, 0, header)
+        for row, values in enumerate(zip(*store.columns), start=2):
+            for col, value in enumerate(values):
+                if value:
+                    write_string(row, col, value)
+        workbook.close()
 
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
     except Exception as e:
-        raise Exception(f"Errore durante l'esportazione: {str(e)}") 
\ No newline at end of file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise Exception(f"Errore durante il salvataggio: {str(e)}")
@@ -1,16 +1,25 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QTableView, QVBoxLayout, QWidget, QFileDialog,
     QMessageBox, QMenuBar, QMenu, QAction, QDialog, QToolBar,
-    QPushButton, QHeaderView
+    QPushButton, QHeaderView, QHBoxLayout, QLineEdit, QComboBox, QLabel,
+    QProgressBar
 )
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QKeySequence
 from PyQt5.QtCore import Qt, pyqtSignal, QSize
 from PyQt5.QtGui import QStandardItemModel, QStandardItem
 from .models import AvisTableModel
-from .excel_handler import import_from_excel, export_to_excel
+from .search import (
+    MemberFilterProxyModel, COLUMN_COGNOME, COLUMN_NOME,
+    COLUMN_CODICEFISCALE, COLUMN_TESSERA
+)
+from .excel_handler import export_to_excel, save_register
+from .loader import RegisterLoadWorker
+from .register_cache import read_sidecar, write_sidecar
+from .duplicates import find_duplicates, DuplicatesDialog
 from .settings import avis_settings as settings
 from .startup_dialog import StartupDialog
 import os
+import time
 import pandas as pd
 from ..utils import get_asset_path
 
@@ -85,11 +94,32 @@ class AvisGUI(QMainWindow):
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
         layout = QVBoxLayout(main_widget)
-        
+
+        # Barra di ricerca
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Cerca:"))
+        self.search_field = QComboBox()
+        self.search_field.addItem("Cognome e nome", "nominativo")
+        self.search_field.addItem("Codice fiscale", COLUMN_CODICEFISCALE)
+        self.search_field.addItem("Tessera", COLUMN_TESSERA)
+        self.search_field.currentIndexChanged.connect(self.apply_search)
+        search_layout.addWidget(self.search_field)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Es. ROSSI MAR oppure il codice fiscale completo")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.apply_search)
+        search_layout.addWidget(self.search_input)
+        show_all_button = QPushButton("Mostra Tutto")
+        show_all_button.clicked.connect(self.show_all)
+        search_layout.addWidget(show_all_button)
+        layout.addLayout(search_layout)
+
         # Tabella
         self.table_view = QTableView()
         self.table_model = AvisTableModel()
-        self.table_view.setModel(self.table_model)
+        self.proxy_model = MemberFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.table_model)
+        self.table_view.setModel(self.proxy_model)
         
         # Impostazioni tabella
         header = self.table_view.horizontalHeader()
@@ -114,8 +144,46 @@ class AvisGUI(QMainWindow):
             }
         """)
         
+        # Ordinamento cliccando sull'intestazione, nessuno all'apertura
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+
         layout.addWidget(self.table_view)
 
+        # Avanzamento del caricamento in background
+        self.load_worker = None
+        self.load_incomplete = False
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(250)
+        self.load_progress.setFormat("%v / %m righe")
+        self.load_cancel_button = QPushButton("Interrompi")
+        self.load_cancel_button.clicked.connect(self.cancel_loading)
+        self.statusBar().addPermanentWidget(self.load_progress)
+        self.statusBar().addPermanentWidget(self.load_cancel_button)
+        self.load_progress.hide()
+        self.load_cancel_button.hide()
+
+    def apply_search(self):
+        """Filtra la tabella con il testo della barra di ricerca"""
+        text = self.search_input.text().strip()
+        field = self.search_field.currentData()
+        if field == "nominativo":
+            # Prima parola sul cognome, il resto sul nome
+            parts = text.split(None, 1)
+            filters = {
+                COLUMN_COGNOME: parts[0] if parts else "",
+                COLUMN_NOME: parts[1] if len(parts) > 1 else ""
+            }
+        else:
+            filters = {field: text}
+        self.proxy_model.set_filters(filters)
+
+    def show_all(self):
+        """Rimuove filtri e ordinamento"""
+        self.search_input.clear()
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.proxy_model.sort(-1)
+
     def setup_menu(self):
         menubar = self.menuBar()
         
@@ -137,6 +205,15 @@ class AvisGUI(QMainWindow):
         export_action.triggered.connect(self.export_excel)
         export_action.setShortcut('Ctrl+E')
         file_menu.addAction(export_action)
+
+        check_action = QAction('Verifica Dati...', self)
+        check_action.triggered.connect(self.check_data)
+        check_action.setShortcut('Ctrl+K')
+        file_menu.addAction(check_action)
+
+        duplicates_action = QAction('Trova Duplicati...', self)
+        duplicates_action.triggered.connect(self.find_duplicates)
+        file_menu.addAction(duplicates_action)
         
         file_menu.addSeparator()
         
@@ -145,7 +222,15 @@ class AvisGUI(QMainWindow):
         exit_action.setShortcut('Ctrl+Q')
         file_menu.addAction(exit_action)
         
-        # Menu Impostazioni
+        # Menu Modifica
+        edit_menu = menubar.addMenu('Modifica')
+        undo_action = self.table_model.undo_stack.createUndoAction(self, 'Annulla')
+        undo_action.setShortcut(QKeySequence.Undo)
+        edit_menu.addAction(undo_action)
+        redo_action = self.table_model.undo_stack.createRedoAction(self, 'Ripeti')
+        redo_action.setShortcut(QKeySequence.Redo)
+        edit_menu.addAction(redo_action)
+
         settings_menu = menubar.addMenu('Impostazioni')
         settings_action = QAction('Configura...', self)
         settings_action.triggered.connect(self.show_settings)
@@ -165,14 +250,67 @@ class AvisGUI(QMainWindow):
             "Excel Files (*.xlsx *.xls)"
         )
         if file_path:
-            try:
-                data = import_from_excel(file_path)
-                self.table_model.load_data(data)
-                QMessageBox.information(self, "Successo", "Dati importati correttamente")
-            except Exception as e:
-                QMessageBox.critical(self, "Errore", f"Errore durante l'importazione: {str(e)}")
+            # Il file da importare deve avere le colonne A-W; la riga dei nomi
+            # delle colonne (presente nei registri salvati dall'app) non è un socio
+            self.start_loading(file_path, expected_header=list(self.table_model.columns),
+                               skip_row=list(self.table_model.header), importing=True)
+
+    def check_data(self):
+        """Mostra il riepilogo dei dati non validi e seleziona la prima cella da correggere"""
+        counts = self.table_model.validator.errors_by_column()
+        if not counts:
+            QMessageBox.information(self, "Verifica Dati", "Nessun errore trovato")
+            return
+
+        details = "\n".join(
+            f"{settings.get_column_name(column)}: {count}" for column, count in counts.items()
+        )
+        QMessageBox.warning(
+            self,
+            "Verifica Dati",
+            f"Trovati {sum(counts.values())} valori non validi, evidenziati in rosso "
+            f"(il dettaglio è nel suggerimento della cella):\n\n{details}"
+        )
+
+        # Porta la vista sulla prima cella non valida (se non è nascosta dal filtro)
+        for row in range(self.proxy_model.rowCount()):
+            source_row = self.proxy_model.source_row(row)
+            for column in range(self.table_model.columnCount()):
+                if source_row > 0 and self.table_model.validator.message(source_row - 1, column):
+                    index = self.proxy_model.index(row, column)
+                    self.table_view.setCurrentIndex(index)
+                    self.table_view.scrollTo(index)
+                    return
+
+    def find_duplicates(self):
+        """Cerca i soci duplicati e mostra l'elenco da rivedere"""
+        start = time.perf_counter()
+        groups = find_duplicates(self.table_model)
+        elapsed = time.perf_counter() - start
+        if not groups:
+            QMessageBox.information(
+                self, "Soci Duplicati", f"Nessun duplicato trovato ({elapsed:.2f} s)"
+            )
+            return
+        self.statusBar().showMessage(
+            f"Trovati {len(groups)} gruppi di possibili duplicati in {elapsed:.2f} s", 5000
+        )
+        DuplicatesDialog(self.table_model, groups, self).exec_()
 
     def export_excel(self):
+        errors = self.table_model.validator.error_count()
+        if errors:
+            reply = QMessageBox.question(
+                self,
+                "Dati non validi",
+                f"Il registro contiene {errors} valori non validi, evidenziati in rosso.\n"
+                "Esportare comunque?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "Esporta in Excel",
@@ -181,8 +319,13 @@ class AvisGUI(QMainWindow):
         )
         if file_path:
             try:
-                export_to_excel(self.table_model.get_data(), file_path)
-                QMessageBox.information(self, "Successo", "Dati esportati correttamente")
+                stats = export_to_excel(self.table_model.get_data(), file_path)
+                QMessageBox.information(
+                    self,
+                    "Successo",
+                    f"Dati esportati correttamente\n{stats['rows']} righe in "
+                    f"{stats['elapsed']:.1f} s ({stats['rows_per_second']:.0f} righe/s)"
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Errore", f"Errore durante l'esportazione: {str(e)}")
 
@@ -193,17 +336,20 @@ class AvisGUI(QMainWindow):
             apply_stylesheet(self.app, theme=theme)
 
     def closeEvent(self, event):
+        if self.load_worker is not None:
+            self.load_worker.stop()
         self.closed.emit()
         event.accept() 
 
     def add_row(self):
         """Aggiunge una nuova riga alla tabella"""
-        current_row = self.table_view.currentIndex().row()
+        current = self.proxy_model.mapToSource(self.table_view.currentIndex())
+        current_row = current.row() if current.isValid() else -1
         position = current_row + 1 if current_row >= 0 else self.table_model.rowCount()
         self.table_model.insertRows(position, 1)
         
         # Seleziona la nuova riga
-        index = self.table_model.index(position, 0)
+        index = self.proxy_model.mapFromSource(self.table_model.index(position, 0))
         self.table_view.setCurrentIndex(index)
         self.table_view.edit(index)  # Inizia modifica della prima cella
 
@@ -237,10 +383,9 @@ class AvisGUI(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # Ordina gli indici in ordine decrescente per non alterare gli indici durante l'eliminazione
-            rows = sorted([index.row() for index in selected_rows], reverse=True)
-            for row in rows:
-                self.table_model.removeRows(row, 1)
+            # Un'unica rimozione per ogni blocco di righe contigue
+            rows = [self.proxy_model.source_row(index.row()) for index in selected_rows]
+            self.table_model.remove_row_list(rows)
             
             QMessageBox.information(
                 self,
@@ -264,23 +409,20 @@ class AvisGUI(QMainWindow):
         try:
             if not hasattr(self, 'file_path') or not self.file_path:
                 return
+
+            # Un registro caricato solo in parte sovrascriverebbe il file con meno soci
+            if self.load_worker is not None or self.load_incomplete:
+                QMessageBox.warning(
+                    self,
+                    "Attenzione",
+                    "Il registro non è stato caricato completamente: salvataggio non consentito"
+                )
+                return
             
-            # Salva i dati dalla tabella al DataFrame
-            data = []
-            model = self.table_view.model()
-            for row in range(model.rowCount()):
-                row_data = {}
-                for col in range(model.columnCount()):
-                    header = model.headerData(col, Qt.Horizontal)
-                    index = model.index(row, col)
-                    value = model.data(index)
-                    row_data[header] = value if value is not None else ""
-                data.append(row_data)
-            
-            # Crea DataFrame e salva
-            df = pd.DataFrame(data)
-            df.to_excel(self.file_path, index=False)
-            
+            # Scrive direttamente dallo store del modello, senza passare dalle celle Qt
+            save_register(self.table_model.get_store(), self.table_model.header, self.file_path)
+            self.update_register_cache()
+
             self.statusBar().showMessage("File salvato con successo", 3000)
         except Exception as e:
             QMessageBox.critical(
@@ -327,14 +469,116 @@ class AvisGUI(QMainWindow):
 
     def load_data(self):
         """Carica i dati dal file Excel esistente"""
-        try:
-            self.df = pd.read_excel(self.file_path)
-            self.table_model.load_data(self.df)
-            self.statusBar().showMessage("File caricato con successo", 3000)
-        except Exception as e:
+        # Se il registro non è cambiato dall'ultima apertura basta la copia binaria
+        start = time.perf_counter()
+        columns = read_sidecar(self.file_path, len(self.table_model.columns))
+        if columns is not None:
+            self.table_model.load_columns(columns)
+            self.load_incomplete = False
+            self.statusBar().showMessage(
+                f"File caricato con successo ({self.table_model.rowCount() - 1} righe "
+                f"in {time.perf_counter() - start:.2f} s, dalla cache)", 3000
+            )
+            return
+
+        # La riga dei nomi delle colonne salvata nel registro non va duplicata
+        self.start_loading(self.file_path, skip_row=list(self.table_model.header))
+
+    def start_loading(self, file_path, expected_header=None, skip_row=None, importing=False):
+        """
+        Avvia la lettura del file in background.
+
+        Le righe arrivano a blocchi e vengono aggiunte alla tabella man mano,
+        quindi i primi soci sono visibili subito e la finestra resta reattiva.
+        """
+        if self.load_worker is not None:
+            self.load_worker.stop()
+
+        self.loading_import = importing
+        self.load_started = time.perf_counter()
+        self.load_worker = RegisterLoadWorker(file_path, expected_header, skip_row)
+        # Il modello viene svuotato solo dopo il controllo dell'intestazione:
+        # un file non valido lascia intatto il registro aperto
+        self.load_worker.header_loaded.connect(self.on_header_loaded)
+        self.load_worker.chunk_loaded.connect(self.on_chunk_loaded)
+        self.load_worker.progress.connect(self.update_load_progress)
+        self.load_worker.load_completed.connect(self.on_load_completed)
+        self.load_worker.load_error.connect(self.on_load_error)
+
+        self.load_progress.setRange(0, 0)
+        self.load_progress.show()
+        self.load_cancel_button.show()
+        self.statusBar().showMessage("Caricamento in corso...")
+        self.load_worker.start()
+
+    def is_current_loader(self):
+        # I segnali di un caricamento interrotto possono essere ancora in coda
+        return self.load_worker is not None and self.sender() is self.load_worker
+
+    def on_header_loaded(self, header):
+        if self.is_current_loader():
+            self.table_model.clear_data()
+
+    def on_chunk_loaded(self, rows):
+        if self.is_current_loader():
+            self.table_model.append_rows(rows)
+
+    def update_load_progress(self, loaded, total):
+        if not self.is_current_loader():
+            return
+        self.load_progress.setRange(0, total)
+        self.load_progress.setValue(loaded)
+
+    def cancel_loading(self):
+        """Interrompe il caricamento: le righe già lette restano visibili"""
+        if self.load_worker is None:
+            return
+        self.load_worker.stop()
+        self.finish_loading()
+        self.load_incomplete = True
+        self.statusBar().showMessage(
+            f"Caricamento interrotto dopo {self.table_model.rowCount() - 1} righe: "
+            "il salvataggio è disabilitato", 5000
+        )
+
+    def finish_loading(self):
+        self.load_worker = None
+        self.load_progress.hide()
+        self.load_cancel_button.hide()
+
+    def on_load_completed(self, rows):
+        if not self.is_current_loader():
+            return
+        elapsed = time.perf_counter() - self.load_started
+        with_header = self.load_worker.skipped_row
+        self.finish_loading()
+        self.load_incomplete = False
+        if self.loading_import:
+            self.statusBar().clearMessage()
+            QMessageBox.information(self, "Successo", f"Dati importati correttamente ({rows} righe)")
+        else:
+            # Le aperture successive del registro non dovranno rileggere l'xlsx
+            self.update_register_cache(with_header)
+            self.statusBar().showMessage(f"File caricato con successo ({rows} righe in {elapsed:.2f} s)", 3000)
+
+    def update_register_cache(self, with_header=True):
+        """Riscrive la copia binaria del registro con le righe presenti nel file"""
+        columns = self.table_model.get_store().columns
+        if with_header:
+            columns = [[name] + values for name, values in zip(self.table_model.header, columns)]
+        write_sidecar(self.file_path, columns)
+
+    def on_load_error(self, message):
+        if not self.is_current_loader():
+            return
+        self.finish_loading()
+        self.statusBar().clearMessage()
+        if self.loading_import:
+            QMessageBox.critical(self, "Errore", f"Errore durante l'importazione: {message}")
+        else:
             QMessageBox.critical(
                 self,
                 "Errore",
-                f"Errore nel caricamento del file: {str(e)}"
+                f"Errore nel caricamento del file: {message}"
             )
             self.close() 
\ No newline at end of file
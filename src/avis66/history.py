@@ -0,0 +1,92 @@
+"""
+Annulla/ripeti per la tabella soci.
+
+Ogni comando conserva solo la differenza prodotta: i valori vecchi e nuovi
+delle celle modificate, oppure la posizione e i valori delle righe inserite
+o eliminate. Il registro non viene mai copiato, nemmeno per eliminazioni
+di migliaia di righe.
+
+Modifiche fatte in rapida successione (es. la stessa cella riscritta più
+volte, o un incolla su più celle) vengono unite in un unico passo; modifiche
+distanti nel tempo restano passi separati, anche sulla stessa cella.
+"""
+
+import time
+from PyQt5.QtWidgets import QUndoCommand
+
+UNDO_LIMIT = 100  # Passi conservati: limita la memoria usata dalla cronologia
+COALESCE_SECONDS = 0.5
+
+_EDIT_COMMAND_ID = 1
+
+
+class EditCellsCommand(QUndoCommand):
+    """Modifica di una o più celle"""
+
+    def __init__(self, model, changes, text="Modifica cella"):
+        """
+        Args:
+            model (AvisTableModel): Modello da modificare
+            changes (dict): (riga, colonna) della tabella -> (valore vecchio, valore nuovo)
+        """
+        super().__init__(text)
+        self.model = model
+        self.changes = changes
+        self.timestamp = time.monotonic()
+
+    def id(self):
+        return _EDIT_COMMAND_ID
+
+    def redo(self):
+        self.model._apply_cells({cell: new for cell, (old, new) in self.changes.items()})
+
+    def undo(self):
+        self.model._apply_cells({cell: old for cell, (old, new) in self.changes.items()})
+
+    def mergeWith(self, other):
+        if other.timestamp - self.timestamp > COALESCE_SECONDS:
+            return False
+        for cell, (old, new) in other.changes.items():
+            if cell in self.changes:
+                old = self.changes[cell][0]
+            self.changes[cell] = (old, new)
+        self.timestamp = other.timestamp
+        if len(self.changes) > 1:
+            self.setText(f"Modifica di {len(self.changes)} celle")
+        # Una cella riportata al valore iniziale non lascia niente da annullare
+        self.setObsolete(all(old == new for old, new in self.changes.values()))
+        return True
+
+
+class InsertRowsCommand(QUndoCommand):
+    """Inserimento di un blocco di righe"""
+
+    def __init__(self, model, position, rows):
+        super().__init__("Nuova riga" if len(rows) == 1 else f"Inserimento di {len(rows)} righe")
+        self.model = model
+        self.position = max(position, 1)
+        self.rows = rows
+
+    def redo(self):
+        self.model._insert_values(self.position, self.rows)
+
+    def undo(self):
+        self.model._remove_ranges([(self.position, len(self.rows))])
+
+
+class RemoveRowsCommand(QUndoCommand):
+    """Eliminazione di un insieme qualsiasi di righe"""
+
+    def __init__(self, model, rows):
+        rows = sorted(set(row for row in rows if row > 0))
+        super().__init__("Elimina riga" if len(rows) == 1 else f"Eliminazione di {len(rows)} righe")
+        self.model = model
+        self.rows = rows
+        self.removed = []  # (prima riga, valori rimossi), dalla più alta alla più bassa
+
+    def redo(self):
+        self.removed = self.model._remove_rows(self.rows)
+
+    def undo(self):
+        # Reinserimento dal basso verso l'alto: ogni blocco torna nella sua posizione
+        self.model._insert_blocks(list(reversed(self.removed)))
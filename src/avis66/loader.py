@@ -0,0 +1,132 @@
+"""
+Caricamento dei registri Excel in background.
+
+Le righe vengono lette a blocchi con openpyxl in modalità read-only (senza
+costruire un DataFrame) da un QThread e aggiunte al modello man mano: la
+prima schermata compare subito e la finestra resta reattiva anche con
+registri di decine di migliaia di soci.
+"""
+
+import os
+import pandas as pd
+from openpyxl import load_workbook
+from PyQt5.QtCore import QThread, pyqtSignal
+
+FIRST_CHUNK_SIZE = 200  # Righe del primo blocco: quanto basta a riempire la schermata
+CHUNK_SIZE = 2000
+
+
+def cell_to_text(value):
+    """Testo mostrato in tabella per il valore di una cella"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Codici e CAP salvati come numero: niente ".0"
+        return str(int(value))
+    return str(value)
+
+
+def iter_excel_chunks(file_path, chunk_size=CHUNK_SIZE, first_chunk_size=FIRST_CHUNK_SIZE):
+    """
+    Legge un file Excel a blocchi di righe.
+
+    Il primo elemento prodotto è la riga di intestazione; seguono liste di
+    righe (ognuna una lista di stringhe). I file .xls, non supportati da
+    openpyxl, vengono letti con pandas e poi suddivisi allo stesso modo.
+
+    Yields:
+        tuple: (intestazione, None, totale righe) poi (None, righe, totale righe)
+    """
+    if os.path.splitext(file_path)[1].lower() == '.xls':
+        df = pd.read_excel(file_path, header=None, dtype=object)
+        rows = df.where(df.notna(), None).values.tolist()
+        total = max(len(rows) - 1, 0)
+        yield ([cell_to_text(v) for v in rows[0]] if rows else []), None, total
+        position, size = 1, first_chunk_size
+        while position < len(rows):
+            yield None, [[cell_to_text(v) for v in row] for row in rows[position:position + size]], total
+            position += size
+            size = chunk_size
+        return
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        total = max((worksheet.max_row or 1) - 1, 0)
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        yield ([cell_to_text(v) for v in header] if header else []), None, total
+
+        chunk = []
+        size = first_chunk_size
+        for row in rows:
+            chunk.append([cell_to_text(v) for v in row])
+            if len(chunk) >= size:
+                yield None, chunk, total
+                chunk = []
+                size = chunk_size
+        if chunk:
+            yield None, chunk, total
+    finally:
+        workbook.close()
+
+
+class RegisterLoadWorker(QThread):
+    """Legge un registro Excel in un thread separato e ne invia le righe a blocchi"""
+    header_loaded = pyqtSignal(list)  # riga di intestazione del file
+    chunk_loaded = pyqtSignal(list)  # righe lette
+    progress = pyqtSignal(int, int)  # righe lette, totale stimato (0 se sconosciuto)
+    load_completed = pyqtSignal(int)  # righe lette in totale
+    load_error = pyqtSignal(str)  # messaggio di errore
+
+    def __init__(self, file_path, expected_header=None, skip_row=None):
+        """
+        Args:
+            file_path (str): File da leggere
+            expected_header (list, optional): Se indicata, la prima riga del file
+                                              deve coincidere, altrimenti errore
+            skip_row (list, optional): Riga da scartare se è la prima dei dati
+                                       (es. i nomi delle colonne già mostrati)
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.expected_header = expected_header
+        self.skip_row = skip_row
+        self.is_running = True
+        self.loaded = 0
+        self.skipped_row = False
+
+    def run(self):
+        try:
+            first = True
+            for header, chunk, total in iter_excel_chunks(self.file_path):
+                if not self.is_running:
+                    return
+                if header is not None:
+                    if self.expected_header is not None and \
+                            header[:len(self.expected_header)] != self.expected_header:
+                        raise ValueError("La struttura del file Excel non corrisponde")
+                    self.header_loaded.emit(header)
+                    continue
+                if first:
+                    first = False
+                    if self.skip_row is not None and chunk and \
+                            chunk[0][:len(self.skip_row)] == self.skip_row:
+                        chunk = chunk[1:]
+                        total -= 1
+                        self.skipped_row = True
+                self.loaded += len(chunk)
+                self.chunk_loaded.emit(chunk)
+                self.progress.emit(self.loaded, max(total, self.loaded))
+            self.load_completed.emit(self.loaded)
+        except Exception as e:
+            if self.is_running:
+                self.load_error.emit(str(e))
+
+    def cancel(self):
+        """Interrompe la lettura dopo il blocco in corso"""
+        self.is_running = False
+
+    def stop(self):
+        self.cancel()
+        self.wait()
@@ -1,38 +1,69 @@
 from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
-import pandas as pd
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QUndoStack
+from .column_store import ColumnStore
+from .history import EditCellsCommand, InsertRowsCommand, RemoveRowsCommand, UNDO_LIMIT
+from .validation import RegisterValidator
 from .settings import avis_settings as settings
 
+# Oltre questo numero di intervalli sparsi, eliminazioni e ripristini
+# ricostruiscono le colonne in un passo solo
+BULK_RANGES = 50
+
+# Sfondo delle celle con dati non validi (semitrasparente, leggibile con entrambi i temi)
+INVALID_CELL_COLOR = QColor(220, 53, 69, 110)
+
 class AvisTableModel(QAbstractTableModel):
     def __init__(self):
         super().__init__()
         self.columns = [chr(65 + i) for i in range(23)]  # A to W
-        
-        # Crea DataFrame con la prima riga contenente i valori predefiniti
-        header_row = {col: settings.get_column_name(col) for col in self.columns}
-        self._data = pd.DataFrame([header_row], columns=self.columns)
+
+        # La prima riga della tabella contiene i nomi delle colonne;
+        # i dati dei soci sono nello store a partire dalla riga 1 della tabella
+        self.header = [settings.get_column_name(col) for col in self.columns]
+        self._store = ColumnStore(self.columns)
+        self.validator = RegisterValidator(self)
+        self.undo_stack = QUndoStack(self)
+        self.undo_stack.setUndoLimit(UNDO_LIMIT)
 
     def rowCount(self, parent=None):
-        return len(self._data)
+        # Modello tabellare: le celle non hanno figli
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self._store) + 1
 
     def columnCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
         return len(self.columns)
 
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
-            
+
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value) if pd.notna(value) else ""
-        elif role == Qt.BackgroundRole and index.row() == 0:
-            return Qt.lightGray
-        
+            row = index.row()
+            if row == 0:
+                return self.header[index.column()]
+            return self._store.columns[index.column()][row - 1]
+        elif role == Qt.BackgroundRole:
+            if index.row() == 0:
+                return Qt.lightGray
+            if self.validator.message(index.row() - 1, index.column()):
+                return INVALID_CELL_COLOR
+        elif role == Qt.ToolTipRole and index.row() > 0:
+            return self.validator.message(index.row() - 1, index.column())
+
         return None
 
     def setData(self, index, value, role=Qt.EditRole):
         if role == Qt.EditRole and index.row() > 0:
-            self._data.iloc[index.row(), index.column()] = value
-            self.dataChanged.emit(index, index)
+            old = self._store.get(index.row() - 1, index.column())
+            new = "" if value is None else str(value)
+            if old != new:
+                self.undo_stack.push(EditCellsCommand(
+                    self, {(index.row(), index.column()): (old, new)}
+                ))
             return True
         return False
 
@@ -45,42 +76,151 @@ class AvisTableModel(QAbstractTableModel):
         return None
 
     def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
         if index.row() == 0:
             return Qt.ItemIsEnabled
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
 
+    def set_row_values(self, row, values):
+        """Sostituisce i valori di un'intera riga con un'unica notifica alla vista"""
+        if row <= 0:
+            return False
+        changes = {}
+        for column, value in enumerate(values[:len(self.columns)]):
+            old = self._store.get(row - 1, column)
+            new = "" if value is None else str(value)
+            if old != new:
+                changes[(row, column)] = (old, new)
+        if changes:
+            self.undo_stack.push(EditCellsCommand(self, changes, "Modifica riga"))
+        return True
+
     def insertRows(self, position, rows, parent=None):
-        if position == 0:
-            position = 1
-            
-        self.beginInsertRows(parent or QModelIndex(), position, position + rows - 1)
-        for i in range(rows):
-            empty_row = pd.DataFrame([[""]*len(self.columns)], columns=self.columns)
-            self._data = pd.concat([
-                self._data.iloc[:position],
-                empty_row,
-                self._data.iloc[position:]
-            ]).reset_index(drop=True)
-        self.endInsertRows()
+        self.undo_stack.push(InsertRowsCommand(
+            self, position, [[""] * len(self.columns) for _ in range(rows)]
+        ))
         return True
 
     def removeRows(self, position, rows, parent=None):
         if position == 0:
             return False
-            
-        self.beginRemoveRows(parent or QModelIndex(), position, position + rows - 1)
-        self._data = pd.concat([
-            self._data.iloc[:position],
-            self._data.iloc[position + rows:]
-        ]).reset_index(drop=True)
-        self.endRemoveRows()
+        self.remove_row_list(range(position, position + rows))
+        return True
+
+    def insert_row_values(self, position, rows):
+        """
+        Inserisce più righe con i relativi valori in un'unica operazione.
+
+        Args:
+            position (int): Riga della tabella da cui inserire (minimo 1)
+            rows (list): Valori delle righe, una lista per riga
+        """
+        if not rows:
+            return False
+        self.undo_stack.push(InsertRowsCommand(self, position, rows))
         return True
 
+    def remove_row_list(self, rows):
+        """
+        Rimuove un insieme qualsiasi di righe della tabella.
+
+        Le righe vengono raggruppate in intervalli contigui: per ciascun
+        intervallo c'è una sola notifica alla vista e una sola modifica per
+        colonna, invece di una per riga.
+
+        Returns:
+            list: Coppie (prima riga, valori rimossi), dalla più alta alla più bassa
+        """
+        command = RemoveRowsCommand(self, rows)
+        if not command.rows:
+            return []
+        self.undo_stack.push(command)
+        return command.removed
+
+    # --- Operazioni elementari, eseguite dai comandi di annulla/ripeti ---
+
+    def _apply_cells(self, values):
+        """Scrive i valori (riga, colonna) -> testo e notifica l'area modificata"""
+        for (row, column), value in values.items():
+            self._store.set(row - 1, column, value)
+        rows = [row for row, _ in values]
+        columns = [column for _, column in values]
+        self.dataChanged.emit(self.index(min(rows), min(columns)), self.index(max(rows), max(columns)))
+
+    def _insert_values(self, position, rows):
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        self._store.insert_rows(position - 1, rows=rows)
+        self.endInsertRows()
+
+    def _remove_ranges(self, ranges):
+        """Rimuove intervalli (prima riga, numero di righe), dal più alto al più basso"""
+        if len(ranges) > BULK_RANGES:
+            # Troppi intervalli sparsi: una sola ricostruzione delle colonne
+            # costa meno di una notifica (e un aggiornamento degli indici) per intervallo
+            self.beginResetModel()
+            removed = self._store.remove_ranges([(position - 1, count) for position, count in ranges])
+            self.endResetModel()
+            return [(position + 1, rows) for position, rows in removed]
+        removed = []
+        for position, count in ranges:
+            self.beginRemoveRows(QModelIndex(), position, position + count - 1)
+            removed.append((position, self._store.remove_rows(position - 1, count)))
+            self.endRemoveRows()
+        return removed
+
+    def _remove_rows(self, rows):
+        return self._remove_ranges(ColumnStore.contiguous_ranges(rows))
+
+    def _insert_blocks(self, blocks):
+        """Reinserisce blocchi (posizione, righe) rimossi da _remove_ranges, dal più basso al più alto"""
+        if len(blocks) > BULK_RANGES:
+            self.beginResetModel()
+            self._store.insert_blocks([(position - 1, rows) for position, rows in blocks])
+            self.endResetModel()
+            return
+        for position, rows in blocks:
+            self._insert_values(position, rows)
+
     def load_data(self, data):
+        """Carica un DataFrame (importazione o apertura di un registro)"""
         self.beginResetModel()
-        header_row = pd.DataFrame([{col: settings.get_column_name(col) for col in self.columns}])
-        self._data = pd.concat([header_row, data]).reset_index(drop=True)
+        self.header = [settings.get_column_name(col) for col in self.columns]
+        self._store = ColumnStore.from_dataframe(data, self.columns)
+        # I registri salvati contengono già la riga dei nomi delle colonne:
+        # non va duplicata a ogni apertura
+        if len(self._store) and self._store.row_values(0) == self.header:
+            self._store.remove_rows(0, 1)
         self.endResetModel()
+        self.undo_stack.clear()
+
+    def load_columns(self, columns):
+        """Carica colonne di stringhe già pronte, con le stesse regole di load_data"""
+        self.beginResetModel()
+        self.header = [settings.get_column_name(col) for col in self.columns]
+        self._store = ColumnStore.from_columns(self.columns, columns)
+        if len(self._store) and self._store.row_values(0) == self.header:
+            self._store.remove_rows(0, 1)
+        self.endResetModel()
+        self.undo_stack.clear()
+
+    def clear_data(self):
+        """Svuota il registro, ad esempio prima di un caricamento a blocchi"""
+        self.beginResetModel()
+        self.header = [settings.get_column_name(col) for col in self.columns]
+        self._store = ColumnStore(self.columns)
+        self.endResetModel()
+        self.undo_stack.clear()
+
+    def append_rows(self, rows):
+        """Aggiunge righe in fondo al registro (un blocco letto dal file, non annullabile)"""
+        if rows:
+            self._insert_values(self.rowCount(), rows)
+        return bool(rows)
 
     def get_data(self):
-        return self._data
\ No newline at end of file
+        """Restituisce i dati come DataFrame, con la riga dei nomi delle colonne in testa"""
+        return self._store.to_dataframe(self.header)
+
+    def get_store(self):
+        return self._store
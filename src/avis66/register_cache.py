@@ -0,0 +1,110 @@
+"""
+Copia binaria dei registri di aViS66.
+
+Accanto a ogni registro .xlsx viene scritto un file nascosto con le stesse
+righe in formato colonnare: per ogni colonna un unico blocco UTF-8 con i
+valori separati da un carattere NUL (che non può comparire in un file
+Excel). La riapertura legge il file con mmap e decodifica un blocco per
+colonna, senza analizzare l'XML del foglio.
+
+La copia è valida solo se dimensione e data di modifica del registro sono
+quelle registrate nell'intestazione: se il file è stato modificato fuori
+dall'applicazione viene ignorata e il registro viene riletto.
+"""
+
+import os
+import mmap
+import struct
+
+MAGIC = b"AVIS66C1"
+HEADER = struct.Struct("<8sqqII")  # magic, mtime_ns, dimensione, righe, colonne
+LENGTH = struct.Struct("<Q")
+SEPARATOR = "\x00"
+
+
+def sidecar_path(file_path):
+    """Percorso della copia binaria di un registro"""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.avis66cache")
+
+
+def write_sidecar(file_path, columns):
+    """
+    Scrive la copia binaria di un registro appena letto o salvato.
+
+    Args:
+        file_path (str): Percorso del registro .xlsx
+        columns (list): Colonne di stringhe, tutte della stessa lunghezza
+
+    Returns:
+        bool: False se la copia non è stata scritta (cartella in sola
+              lettura, valori con caratteri non rappresentabili...)
+    """
+    path = sidecar_path(file_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        stat = os.stat(file_path)
+        rows = len(columns[0]) if columns else 0
+        blocks = []
+        for values in columns:
+            text = SEPARATOR.join(values)
+            if text.count(SEPARATOR) != max(rows - 1, 0):
+                return False
+            blocks.append(text.encode('utf-8'))
+
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, rows, len(blocks)))
+            for block in blocks:
+                f.write(LENGTH.pack(len(block)))
+            for block in blocks:
+                f.write(block)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, UnicodeError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def read_sidecar(file_path, column_count):
+    """
+    Legge la copia binaria di un registro, se ancora valida.
+
+    Args:
+        file_path (str): Percorso del registro .xlsx
+        column_count (int): Numero di colonne attese
+
+    Returns:
+        list: Colonne di stringhe, oppure None se la copia manca o non è aggiornata
+    """
+    path = sidecar_path(file_path)
+    try:
+        stat = os.stat(file_path)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, mtime_ns, size, rows, count = HEADER.unpack_from(data, 0)
+            if (magic != MAGIC or mtime_ns != stat.st_mtime_ns or size != stat.st_size
+                    or count != column_count):
+                return None
+
+            offset = HEADER.size + LENGTH.size * count
+            columns = []
+            for i in range(count):
+                length, = LENGTH.unpack_from(data, HEADER.size + LENGTH.size * i)
+                if rows:
+                    values = data[offset:offset + length].decode('utf-8').split(SEPARATOR)
+                    if len(values) != rows:
+                        return None
+                else:
+                    values = []
+                columns.append(values)
+                offset += length
+            return columns
+    except (OSError, ValueError, struct.error, UnicodeError):
+        return None
+
+
+def remove_sidecar(file_path):
+    try:
+        os.remove(sidecar_path(file_path))
+    except OSError:
+        pass
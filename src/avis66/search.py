@@ -0,0 +1,436 @@
+"""
+Ricerca, filtro e ordinamento della tabella soci.
+
+MemberIndex mantiene indici per colonna sui dati del modello:
+- hash (valore normalizzato -> righe) su CODICEFISCALE e TESSERA
+- ordinato per prefisso su COGNOME e NOME
+
+Gli indici seguono i segnali del modello (dataChanged, rowsInserted,
+rowsAboutToBeRemoved, modelReset) e vengono aggiornati solo per le righe
+coinvolte. Le righe sono identificate da un id stabile, così inserimenti e
+rimozioni non richiedono di rinumerare gli indici.
+
+MemberFilterProxyModel usa gli indici per filtrare e ordinare la tabella
+senza chiamate Python per ogni confronto. La riga dei nomi delle colonne
+resta sempre in cima.
+"""
+
+import bisect
+import unicodedata
+from collections import defaultdict
+from PyQt5.QtCore import Qt, QAbstractProxyModel, QModelIndex
+
+# Colonne del registro (lettere di AvisTableModel.columns)
+COLUMN_COGNOME = "C"
+COLUMN_NOME = "D"
+COLUMN_CODICEFISCALE = "G"
+COLUMN_TESSERA = "T"
+
+HASH_COLUMNS = (COLUMN_CODICEFISCALE, COLUMN_TESSERA)
+PREFIX_COLUMNS = (COLUMN_COGNOME, COLUMN_NOME)
+
+# Carattere più alto del piano base, per chiudere gli intervalli di prefisso
+_PREFIX_END = "\uffff"
+
+
+def normalize(value):
+    """Chiave di ricerca: maiuscolo, senza accenti e spazi superflui"""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value.strip().upper())
+    if value.isascii():
+        return value
+    return "".join(ch for ch in value if not unicodedata.combining(ch))
+
+
+class MemberIndex:
+    """Indici per colonna sulle righe dei soci di un AvisTableModel"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = []  # riga dello store -> id
+        self._next_id = 0
+        self._positions = None  # id -> riga dello store, ricostruito solo quando serve
+        self.hash_indexes = {}
+        self.prefix_indexes = {}
+        self.keys = {}  # colonna -> {id: chiave indicizzata}
+
+        model.modelReset.connect(self.rebuild)
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        self.rebuild()
+
+    def _column(self, key):
+        return self.model.columns.index(key)
+
+    def rebuild(self):
+        """Ricostruisce tutti gli indici (caricamento di un nuovo registro)"""
+        store = self.model.get_store()
+        count = len(store)
+        self.ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        self._positions = None
+
+        for key in HASH_COLUMNS + PREFIX_COLUMNS:
+            values = store.columns[self._column(key)]
+            keys = dict(zip(self.ids, map(normalize, values)))
+            self.keys[key] = keys
+            if key in HASH_COLUMNS:
+                index = defaultdict(set)
+                for row_id, value in keys.items():
+                    if value:
+                        index[value].add(row_id)
+                self.hash_indexes[key] = index
+            else:
+                self.prefix_indexes[key] = sorted(
+                    (value, row_id) for row_id, value in keys.items() if value
+                )
+
+    def _add(self, key, row_id, value):
+        self.keys[key][row_id] = value
+        if not value:
+            return
+        if key in HASH_COLUMNS:
+            self.hash_indexes[key][value].add(row_id)
+        else:
+            bisect.insort(self.prefix_indexes[key], (value, row_id))
+
+    def _discard(self, key, row_id):
+        value = self.keys[key].pop(row_id, "")
+        if not value:
+            return
+        if key in HASH_COLUMNS:
+            rows = self.hash_indexes[key].get(value)
+            if rows is not None:
+                rows.discard(row_id)
+                if not rows:
+                    del self.hash_indexes[key][value]
+        else:
+            entries = self.prefix_indexes[key]
+            position = bisect.bisect_left(entries, (value, row_id))
+            if position < len(entries) and entries[position] == (value, row_id):
+                del entries[position]
+
+    def _on_data_changed(self, top_left, bottom_right, roles=None):
+        store = self.model.get_store()
+        first = max(top_left.row(), 1) - 1
+        last = bottom_right.row() - 1
+        for key in HASH_COLUMNS + PREFIX_COLUMNS:
+            column = self._column(key)
+            if not top_left.column() <= column <= bottom_right.column():
+                continue
+            values = store.columns[column]
+            keys = self.keys[key]
+            for row in range(first, last + 1):
+                row_id = self.ids[row]
+                value = normalize(values[row])
+                if keys.get(row_id, "") != value:
+                    self._discard(key, row_id)
+                    self._add(key, row_id, value)
+
+    def _on_rows_inserted(self, parent, first, last):
+        # Le righe della tabella partono da 1: la riga 0 è quella dei nomi
+        start = first - 1
+        count = last - first + 1
+        new_ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        self.ids[start:start] = new_ids
+        self._positions = None
+
+        store = self.model.get_store()
+        for key in HASH_COLUMNS + PREFIX_COLUMNS:
+            values = store.columns[self._column(key)]
+            for offset, row_id in enumerate(new_ids):
+                self._add(key, row_id, normalize(values[start + offset]))
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        start = first - 1
+        removed = self.ids[start:last]
+        for key in HASH_COLUMNS + PREFIX_COLUMNS:
+            for row_id in removed:
+                self._discard(key, row_id)
+        del self.ids[start:last]
+        self._positions = None
+
+    def lookup(self, key, text):
+        """
+        Cerca un valore in una colonna.
+
+        Sulle colonne con indice hash la ricerca è per valore esatto, su
+        quelle con indice ordinato per prefisso; sulle altre colonne, o se
+        un codice non è completo, viene cercato il testo all'interno del valore.
+
+        Returns:
+            set: Id delle righe trovate
+        """
+        needle = normalize(text)
+        if key in HASH_COLUMNS and needle in self.hash_indexes[key]:
+            return set(self.hash_indexes[key][needle])
+        if key in PREFIX_COLUMNS:
+            entries = self.prefix_indexes[key]
+            start = bisect.bisect_left(entries, (needle,))
+            end = bisect.bisect_left(entries, (needle + _PREFIX_END,), start)
+            return {row_id for _, row_id in entries[start:end]}
+        if key in HASH_COLUMNS:
+            keys = self.keys[key]
+            return {row_id for row_id in self.ids if needle in keys[row_id]}
+        values = self.model.get_store().columns[self._column(key)]
+        return {row_id for row_id, value in zip(self.ids, values) if needle in normalize(value)}
+
+    def search(self, filters):
+        """
+        Applica più filtri in AND.
+
+        Args:
+            filters (dict): Colonna (lettera) -> testo cercato
+
+        Returns:
+            list: Righe dello store che soddisfano tutti i filtri, in ordine
+        """
+        result = None
+        # Prima i filtri più selettivi: gli indici hash restringono subito il risultato
+        for key, text in sorted(filters.items(), key=lambda item: item[0] not in HASH_COLUMNS):
+            if not text:
+                continue
+            found = self.lookup(key, text)
+            result = found if result is None else result & found
+            if not result:
+                return []
+        if result is None:
+            return list(range(len(self.ids)))
+        return sorted(self.positions()[row_id] for row_id in result)
+
+    def positions(self):
+        """Mappa id -> riga dello store, ricostruita solo dopo inserimenti o rimozioni"""
+        if self._positions is None:
+            self._positions = dict(zip(self.ids, range(len(self.ids))))
+        return self._positions
+
+    def sorted_rows(self, key, rows=None, descending=False):
+        """
+        Ordina le righe dello store per colonna.
+
+        Per COGNOME e NOME usa l'indice già ordinato; le righe con valore
+        vuoto vanno in fondo.
+        """
+        if rows is None:
+            rows = range(len(self.ids))
+        if key in PREFIX_COLUMNS:
+            positions = self.positions()
+            selected = set(rows)
+            ordered = [positions[row_id] for _, row_id in self.prefix_indexes[key]]
+            ordered = [row for row in ordered if row in selected]
+            if descending:
+                ordered.reverse()
+            ordered_set = set(ordered)
+            return ordered + [row for row in rows if row not in ordered_set]
+        values = self.model.get_store().columns[self._column(key)]
+        return sorted(rows, key=values.__getitem__, reverse=descending)
+
+
+class MemberFilterProxyModel(QAbstractProxyModel):
+    """
+    Vista filtrata e ordinata di un AvisTableModel.
+
+    Senza filtri né ordinamento il proxy è trasparente: righe e segnali
+    passano uno a uno, senza tabelle di corrispondenza da mantenere.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index_ = None
+        self.filters = {}
+        self.sort_key = None
+        self.sort_order = Qt.AscendingOrder
+        self._rows = None  # riga del proxy -> riga della sorgente (None = identità)
+        self._proxy_rows = None  # riga della sorgente -> riga del proxy
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        old = self.sourceModel()
+        if old is not None:
+            old.dataChanged.disconnect(self._on_data_changed)
+            old.rowsAboutToBeInserted.disconnect(self._on_rows_about_to_be_inserted)
+            old.rowsInserted.disconnect(self._on_rows_inserted)
+            old.rowsAboutToBeRemoved.disconnect(self._on_rows_about_to_be_removed)
+            old.rowsRemoved.disconnect(self._on_rows_removed)
+            old.modelAboutToBeReset.disconnect(self.beginResetModel)
+            old.modelReset.disconnect(self._on_model_reset)
+        super().setSourceModel(model)
+        # L'indice si collega ai segnali prima del proxy, così è già aggiornato
+        self.index_ = MemberIndex(model)
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsAboutToBeInserted.connect(self._on_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._on_rows_removed)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_model_reset)
+        self._compute()
+        self.endResetModel()
+
+    # --- Filtri e ordinamento ---
+
+    def set_filters(self, filters):
+        """
+        Imposta i filtri (colonna -> testo, in AND) e aggiorna la vista.
+        Con un dizionario vuoto mostra tutte le righe.
+        """
+        self.filters = {key: text for key, text in filters.items() if text}
+        self.beginResetModel()
+        self._compute()
+        self.endResetModel()
+
+    def clear_filters(self):
+        self.set_filters({})
+
+    def is_filtered(self):
+        return bool(self.filters)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            self.sort_key = None
+        else:
+            self.sort_key = self.sourceModel().columns[column]
+        self.sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self.mapToSource(index) for index in persistent]
+        self._compute()
+        self.changePersistentIndexList(persistent, [self.mapFromSource(s) for s in sources])
+        self.layoutChanged.emit()
+
+    def _on_model_reset(self):
+        self._compute()
+        self.endResetModel()
+
+    def _compute(self):
+        if self.index_ is None or (not self.filters and self.sort_key is None):
+            self._rows = None
+            self._proxy_rows = None
+            return
+        rows = self.index_.search(self.filters) if self.filters else None
+        if self.sort_key is not None:
+            rows = self.index_.sorted_rows(
+                self.sort_key, rows, self.sort_order == Qt.DescendingOrder
+            )
+        # Righe dello store -> righe della sorgente (la riga 0 è quella dei nomi)
+        self._rows = [0] + [row + 1 for row in rows]
+        self._rebuild_proxy_rows()
+
+    def _rebuild_proxy_rows(self):
+        self._proxy_rows = dict(zip(self._rows, range(len(self._rows))))
+
+    def source_row(self, row):
+        """Riga della sorgente corrispondente a una riga del proxy"""
+        return row if self._rows is None else self._rows[row]
+
+    # --- Mappatura ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def hasChildren(self, parent=QModelIndex()):
+        return not parent.isValid() and self.rowCount() > 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        if self._rows is None:
+            return self.sourceModel().rowCount()
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return self.sourceModel().columnCount() if self.sourceModel() else 0
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or proxy_index.row() >= self.rowCount():
+            return QModelIndex()
+        return self.sourceModel().index(self.source_row(proxy_index.row()), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._rows is None:
+            return self.createIndex(source_index.row(), source_index.column())
+        row = self._proxy_rows.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.createIndex(row, source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        # I numeri di riga restano quelli del registro, anche filtrando
+        if orientation == Qt.Vertical and 0 <= section < self.rowCount():
+            return self.sourceModel().headerData(self.source_row(section), orientation, role)
+        return self.sourceModel().headerData(section, orientation, role)
+
+    # --- Segnali della sorgente ---
+
+    def _on_data_changed(self, top_left, bottom_right, roles=None):
+        if self._rows is None:
+            self.dataChanged.emit(
+                self.createIndex(top_left.row(), top_left.column()),
+                self.createIndex(bottom_right.row(), bottom_right.column())
+            )
+            return
+        # Le righe modificate restano visibili anche se non soddisfano più i filtri
+        rows = [self._proxy_rows[row] for row in range(top_left.row(), bottom_right.row() + 1)
+                if row in self._proxy_rows]
+        if rows:
+            self.dataChanged.emit(
+                self.createIndex(min(rows), top_left.column()),
+                self.createIndex(max(rows), bottom_right.column())
+            )
+
+    def _on_rows_about_to_be_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.endInsertRows()
+            return
+        count = last - first + 1
+        # Le nuove righe vengono mostrate subito dopo la riga che le precede
+        # nella sorgente, anche quando sono attivi filtri o ordinamento
+        previous = self._proxy_rows.get(first - 1)
+        position = previous + 1 if previous is not None else len(self._rows)
+        shifted = [row + count if row >= first else row for row in self._rows]
+        self.beginInsertRows(QModelIndex(), position, position + count - 1)
+        shifted[position:position] = range(first, last + 1)
+        self._rows = shifted
+        self._rebuild_proxy_rows()
+        self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        if self._rows is None:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            return
+        removed = sorted(self._proxy_rows[row] for row in range(first, last + 1)
+                         if row in self._proxy_rows)
+        # Una notifica per ogni blocco contiguo di righe del proxy, dal basso
+        ranges = []
+        for row in reversed(removed):
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1] = (row, ranges[-1][1])
+            else:
+                ranges.append((row, row))
+        for start, end in ranges:
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._rows[start:end + 1]
+            self._rebuild_proxy_rows()
+            self.endRemoveRows()
+
+    def _on_rows_removed(self, parent, first, last):
+        if self._rows is None:
+            self.endRemoveRows()
+            return
+        count = last - first + 1
+        self._rows = [row - count if row > last else row for row in self._rows]
+        self._rebuild_proxy_rows()
@@ -0,0 +1,280 @@
+"""
+Controllo dei dati dei soci prima dell'invio al SIAN.
+
+I controlli lavorano per colonna su tutto il registro con le operazioni
+vettoriali di pandas/numpy (espressioni regolari, conversione delle date,
+checksum del codice fiscale su una matrice di byte), senza codice Python
+per ogni riga.
+
+RegisterValidator tiene i messaggi di errore allineati alle righe dello
+store e segue i segnali del modello: dopo una modifica vengono ricontrollate
+solo le righe coinvolte.
+"""
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt
+
+# Colonne del registro (lettere di AvisTableModel.columns)
+COLUMN_DATANASCITA = "E"
+COLUMN_GENERE = "F"
+COLUMN_CODICEFISCALE = "G"
+COLUMN_PROVNASCITA = "I"
+COLUMN_PROVINCIA = "L"
+COLUMN_CAP = "M"
+COLUMN_CELLULARE = "O"
+COLUMN_EMAIL = "Q"
+COLUMN_PEC = "R"
+COLUMN_DATAISCRIZIONE = "S"
+COLUMN_DATACESSAZIONE = "V"
+
+VALIDATED_COLUMNS = (
+    COLUMN_DATANASCITA, COLUMN_GENERE, COLUMN_CODICEFISCALE, COLUMN_PROVNASCITA,
+    COLUMN_PROVINCIA, COLUMN_CAP, COLUMN_CELLULARE, COLUMN_EMAIL, COLUMN_PEC,
+    COLUMN_DATAISCRIZIONE, COLUMN_DATACESSAZIONE
+)
+DATE_COLUMNS = (COLUMN_DATANASCITA, COLUMN_DATAISCRIZIONE, COLUMN_DATACESSAZIONE)
+
+# Cifre del codice fiscale sostituibili da lettere in caso di omocodia
+_OMOCODIA = "0-9LMNPQRSTUV"
+CF_PATTERN = (rf"[A-Z]{{6}}[{_OMOCODIA}]{{2}}[ABCDEHLMPRST][{_OMOCODIA}]{{2}}"
+              rf"[A-Z][{_OMOCODIA}]{{3}}[A-Z]")
+_OMOCODIA_DIGITS = str.maketrans("LMNPQRSTUV", "0123456789")
+_CF_MONTHS = {letter: month for month, letter in enumerate("ABCDEHLMPRST", start=1)}
+
+PATTERNS = {
+    COLUMN_GENERE: (r"[MF]", "Genere non valido (M o F)"),
+    COLUMN_PROVNASCITA: (r"[A-Z]{2}", "Sigla della provincia non valida"),
+    COLUMN_PROVINCIA: (r"[A-Z]{2}", "Sigla della provincia non valida"),
+    COLUMN_CAP: (r"\d{5}", "CAP non valido (5 cifre)"),
+    COLUMN_CELLULARE: (r"(\+|00)?\d[\d ]{5,14}", "Numero di cellulare non valido"),
+    COLUMN_EMAIL: (r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}", "Indirizzo email non valido"),
+    COLUMN_PEC: (r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}", "Indirizzo PEC non valido"),
+}
+
+
+def _checksum_tables():
+    """Valori dei caratteri in posizione dispari e pari per il carattere di controllo"""
+    odd_values = [1, 0, 5, 7, 9, 13, 15, 17, 19, 21, 2, 4, 18, 20, 11, 3, 6, 8, 12, 14,
+                  16, 10, 22, 25, 24, 23]
+    odd = np.zeros(128, dtype=np.int64)
+    even = np.zeros(128, dtype=np.int64)
+    for i in range(10):
+        odd[ord("0") + i] = odd_values[i]
+        even[ord("0") + i] = i
+    for i in range(26):
+        odd[ord("A") + i] = odd_values[i]
+        even[ord("A") + i] = i
+    return odd, even
+
+
+_CF_ODD, _CF_EVEN = _checksum_tables()
+
+
+def cf_checksum_ok(codes):
+    """
+    Verifica il carattere di controllo di codici fiscali già ben formati.
+
+    Args:
+        codes (list): Codici di 16 caratteri ASCII maiuscoli
+
+    Returns:
+        numpy.ndarray: True per i codici con carattere di controllo corretto
+    """
+    if not codes:
+        return np.zeros(0, dtype=bool)
+    chars = np.frombuffer("".join(codes).encode("ascii"), dtype=np.uint8).reshape(-1, 16)
+    total = _CF_ODD[chars[:, 0:15:2]].sum(axis=1) + _CF_EVEN[chars[:, 1:15:2]].sum(axis=1)
+    return (total % 26 + ord("A")) == chars[:, 15]
+
+
+def parse_dates(series):
+    """
+    Converte una colonna di date (gg/mm/aaaa oppure aaaa-mm-gg, eventualmente
+    con l'ora a zero come nei file letti da Excel). NaT per i valori non validi.
+    """
+    iso = series.str.fullmatch(r"\d{4}-\d{2}-\d{2}( 00:00:00)?")
+    italian = series.str.fullmatch(r"\d{2}/\d{2}/\d{4}")
+    dates = pd.to_datetime(series.where(iso).str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+    dates = dates.fillna(pd.to_datetime(series.where(italian), format="%d/%m/%Y", errors="coerce"))
+    return dates
+
+
+class _Result:
+    """Messaggi di una colonna: per ogni cella vale il primo errore trovato"""
+
+    def __init__(self, rows):
+        self.messages = np.full(rows, None, dtype=object)
+        self.flagged = np.zeros(rows, dtype=bool)
+
+    def flag(self, mask, message):
+        mask = np.asarray(mask, dtype=bool) & ~self.flagged
+        self.messages[mask] = message
+        self.flagged |= mask
+
+
+def validate_columns(columns):
+    """
+    Controlla un insieme di righe del registro.
+
+    Le celle vuote non vengono segnalate: molti campi sono facoltativi e le
+    righe appena aggiunte non devono comparire come errori.
+
+    Args:
+        columns (dict): Lettera della colonna -> valori (liste della stessa lunghezza)
+
+    Returns:
+        dict: Lettera della colonna -> lista di messaggi (None per le celle valide)
+    """
+    rows = len(next(iter(columns.values()))) if columns else 0
+    series = {key: pd.Series(columns[key], dtype=object).str.strip() for key in VALIDATED_COLUMNS}
+    filled = {key: (values != "").to_numpy() for key, values in series.items()}
+    results = {key: _Result(rows) for key in VALIDATED_COLUMNS}
+
+    for key, (pattern, message) in PATTERNS.items():
+        valid = series[key].str.fullmatch(pattern).to_numpy(dtype=bool)
+        results[key].flag(filled[key] & ~valid, message)
+
+    # Date
+    dates = {}
+    today = pd.Timestamp.today().normalize()
+    for key in DATE_COLUMNS:
+        dates[key] = parse_dates(series[key])
+        missing = dates[key].isna().to_numpy()
+        results[key].flag(filled[key] & missing, "Data non valida (gg/mm/aaaa)")
+        out_of_range = ((dates[key] < pd.Timestamp(1900, 1, 1)) | (dates[key] > today)).to_numpy()
+        results[key].flag(out_of_range, "Data fuori dall'intervallo ammesso")
+
+    # Codice fiscale: struttura e carattere di controllo
+    cf = series[COLUMN_CODICEFISCALE].str.upper()
+    well_formed = cf.str.fullmatch(CF_PATTERN).to_numpy(dtype=bool)
+    results[COLUMN_CODICEFISCALE].flag(
+        filled[COLUMN_CODICEFISCALE] & ~well_formed, "Codice fiscale non valido"
+    )
+    positions = np.flatnonzero(well_formed)
+    checksum = np.zeros(rows, dtype=bool)
+    checksum[positions] = cf_checksum_ok(cf.iloc[positions].tolist())
+    results[COLUMN_CODICEFISCALE].flag(
+        well_formed & ~checksum, "Carattere di controllo del codice fiscale errato"
+    )
+
+    # Coerenza tra i campi
+    birth = dates[COLUMN_DATANASCITA]
+    cf_year = cf.str.slice(6, 8).str.translate(_OMOCODIA_DIGITS)
+    cf_month = cf.str.slice(8, 9).map(_CF_MONTHS)
+    cf_day = pd.to_numeric(cf.str.slice(9, 11).str.translate(_OMOCODIA_DIGITS), errors="coerce")
+    cf_female = (cf_day > 40).to_numpy()
+    birth_known = well_formed & birth.notna().to_numpy()
+    same_birth = (
+        (pd.to_numeric(cf_year, errors="coerce") == birth.dt.year % 100)
+        & (cf_month == birth.dt.month)
+        & (cf_day.where(cf_day <= 40, cf_day - 40) == birth.dt.day)
+    ).to_numpy()
+    results[COLUMN_CODICEFISCALE].flag(
+        birth_known & ~same_birth, "Codice fiscale non coerente con la data di nascita"
+    )
+    gender = series[COLUMN_GENERE].str.upper()
+    gender_known = well_formed & gender.isin(["M", "F"]).to_numpy()
+    results[COLUMN_CODICEFISCALE].flag(
+        gender_known & (cf_female != (gender == "F").to_numpy()),
+        "Codice fiscale non coerente con il genere"
+    )
+
+    joined, ceased = dates[COLUMN_DATAISCRIZIONE], dates[COLUMN_DATACESSAZIONE]
+    results[COLUMN_DATAISCRIZIONE].flag(
+        (joined < birth).to_numpy(), "Data di iscrizione precedente alla nascita"
+    )
+    results[COLUMN_DATACESSAZIONE].flag(
+        (ceased < joined).to_numpy(), "Data di cessazione precedente all'iscrizione"
+    )
+
+    return {key: result.messages.tolist() for key, result in results.items()}
+
+
+class RegisterValidator:
+    """Messaggi di errore per le celle di un AvisTableModel, aggiornati a ogni modifica"""
+
+    def __init__(self, model):
+        self.model = model
+        self.messages = {}  # indice della colonna -> messaggi allineati alle righe dello store
+
+        model.modelReset.connect(self.revalidate)
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsRemoved.connect(self._on_rows_removed)
+        self.revalidate()
+
+    def _columns_for(self, rows=None):
+        store = self.model.get_store()
+        columns = {}
+        for key in VALIDATED_COLUMNS:
+            values = store.columns[self.model.columns.index(key)]
+            columns[key] = values if rows is None else values[rows.start:rows.stop]
+        return columns
+
+    def revalidate(self):
+        """Controlla l'intero registro"""
+        results = validate_columns(self._columns_for())
+        self.messages = {self.model.columns.index(key): values for key, values in results.items()}
+
+    def validate_rows(self, first, last):
+        """
+        Ricontrolla le righe dello store da first a last comprese.
+
+        Returns:
+            bool: True se almeno un messaggio è cambiato
+        """
+        rows = slice(first, last + 1)
+        results = validate_columns(self._columns_for(rows))
+        changed = False
+        for key, values in results.items():
+            messages = self.messages[self.model.columns.index(key)]
+            if messages[rows] != values:
+                messages[rows] = values
+                changed = True
+        return changed
+
+    def message(self, row, column):
+        """Messaggio di errore della cella (riga dello store), None se valida"""
+        messages = self.messages.get(column)
+        return messages[row] if messages is not None else None
+
+    def error_count(self):
+        return sum(len(messages) - messages.count(None) for messages in self.messages.values())
+
+    def errors_by_column(self):
+        """Numero di celle non valide per colonna (solo le colonne con errori)"""
+        counts = {}
+        for column, messages in self.messages.items():
+            count = len(messages) - messages.count(None)
+            if count:
+                counts[self.model.columns[column]] = count
+        return counts
+
+    def _on_data_changed(self, top_left, bottom_right, roles=None):
+        # Le notifiche di sola evidenziazione sono emesse da qui
+        if roles and not ({Qt.DisplayRole, Qt.EditRole} & set(roles)):
+            return
+        first = max(top_left.row(), 1) - 1
+        last = bottom_right.row() - 1
+        if last < first:
+            return
+        if self.validate_rows(first, last):
+            # Un controllo incrociato può cambiare l'esito di altre celle della riga
+            self.model.dataChanged.emit(
+                self.model.index(first + 1, 0),
+                self.model.index(last + 1, self.model.columnCount() - 1),
+                [Qt.BackgroundRole, Qt.ToolTipRole]
+            )
+
+    def _on_rows_inserted(self, parent, first, last):
+        # Le righe della tabella partono da 1: la riga 0 è quella dei nomi
+        start = first - 1
+        count = last - first + 1
+        for messages in self.messages.values():
+            messages[start:start] = [None] * count
+        self.validate_rows(start, start + count - 1)
+
+    def _on_rows_removed(self, parent, first, last):
+        for messages in self.messages.values():
+            del messages[first - 1:last]
@@ -1,79 +1,564 @@
+"""
+Motore delle formule di CBP.
+
+Le formule (=SUM(B1:B10)*2, =ROUND(B3/3;2)...) vengono analizzate una sola
+volta e trasformate in un albero sintattico, conservato per cella. Il motore
+tiene un grafo delle dipendenze tra le celle: quando una cella cambia vengono
+ricalcolate solo le celle che ne dipendono, in ordine topologico. I
+riferimenti circolari vengono individuati e segnalati come errore.
+
+Non viene mai usato eval: l'albero è valutato direttamente. I valori delle
+celle sono in una matrice numpy, quindi le funzioni sugli intervalli
+lavorano su una fetta della matrice senza cicli Python.
+
+Le somme (SUM e i totali di colonna) sono fatte in centesimi interi, quindi
+sono esatte anche su migliaia di righe.
+"""
+
 import re
 import numpy as np
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from ..money import float_to_cents, to_cents_array, sum_cents, cents_to_decimal
+
+ERROR_SYNTAX = "#ERRORE!"
+ERROR_CYCLE = "#CICLO!"
+ERROR_DIV_ZERO = "#DIV/0!"
+ERROR_NAME = "#NOME?"
+ERROR_VALUE = "#VALORE!"
+
+RANGE_BLOCK_ROWS = 64  # Righe per blocco nell'indice degli intervalli
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?|\.\d+)
+      | (?P<range>\$?[A-Z]+\$?\d+:\$?[A-Z]+\$?\d+)
+      | (?P<ref>\$?[A-Z]+\$?\d+)
+      | (?P<name>[A-Z_][A-Z0-9_.]*)
+      | (?P<op>[-+*/^(),;%])
+    )""", re.VERBOSE | re.IGNORECASE)
+_REF = re.compile(r"\$?([A-Z]+)\$?(\d+)", re.IGNORECASE)
+
+
+class FormulaError(Exception):
+    """Errore di una formula: code è il testo mostrato nella cella"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+def column_index(letters):
+    """Lettere della colonna (A, B, ..., AA) -> indice da 0"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def parse_ref(text):
+    """Riferimento (es. B12) -> (riga, colonna) da 0"""
+    match = _REF.fullmatch(text)
+    return int(match.group(2)) - 1, column_index(match.group(1))
+
+
+def parse_number(text):
+    """Valore numerico di una cella non formula; None se vuota, FormulaError se non numerica"""
+    text = text.replace("€", "").replace(",", "").strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        raise FormulaError(ERROR_VALUE)
+
+
+# --- Analisi sintattica ---
+#
+# Nodi dell'albero (tuple):
+#   ("num", valore)
+#   ("ref", riga, colonna)
+#   ("range", riga1, colonna1, riga2, colonna2)
+#   ("neg", nodo)  ("pct", nodo)
+#   ("bin", operatore, sinistro, destro)
+#   ("call", nome, [argomenti])
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                raise FormulaError(ERROR_SYNTAX)
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        kind, text = self.peek()
+        if kind is None or (value is not None and text != value):
+            raise FormulaError(ERROR_SYNTAX)
+        self.position += 1
+        return kind, text
+
+    def parse(self):
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise FormulaError(ERROR_SYNTAX)
+        return node
+
+    def expression(self):
+        node = self.term()
+        while self.peek()[1] in ("+", "-"):
+            _, op = self.take()
+            node = ("bin", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.power()
+        while self.peek()[1] in ("*", "/"):
+            _, op = self.take()
+            node = ("bin", op, node, self.power())
+        return node
+
+    def power(self):
+        node = self.unary()
+        if self.peek()[1] == "^":
+            self.take()
+            node = ("bin", "^", node, self.power())
+        return node
+
+    def unary(self):
+        if self.peek()[1] == "-":
+            self.take()
+            return ("neg", self.unary())
+        if self.peek()[1] == "+":
+            self.take()
+            return self.unary()
+        node = self.primary()
+        while self.peek()[1] == "%":
+            self.take()
+            node = ("pct", node)
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "number":
+            return ("num", float(text))
+        if kind == "ref":
+            return ("ref",) + parse_ref(text)
+        if kind == "range":
+            start, end = text.split(":")
+            (r1, c1), (r2, c2) = parse_ref(start), parse_ref(end)
+            return ("range", min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+        if kind == "name":
+            name = text.upper()
+            self.take("(")
+            args = []
+            if self.peek()[1] != ")":
+                args.append(self.expression())
+                while self.peek()[1] in (",", ";"):
+                    self.take()
+                    args.append(self.expression())
+            self.take(")")
+            if name not in FUNCTIONS:
+                raise FormulaError(ERROR_NAME)
+            return ("call", name, args)
+        if text == "(":
+            node = self.expression()
+            self.take(")")
+            return node
+        raise FormulaError(ERROR_SYNTAX)
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(text):
+    """
+    Analizza una formula (con o senza "=" iniziale).
+
+    Il risultato è memorizzato: formule uguali in celle diverse vengono
+    analizzate una volta sola.
+
+    Returns:
+        tuple: Albero sintattico
+
+    Raises:
+        FormulaError: Formula non valida
+    """
+    return _Parser(text[1:] if text.startswith("=") else text).parse()
+
+
+def formula_references(node, refs=None, ranges=None):
+    """Celle e intervalli usati da una formula"""
+    if refs is None:
+        refs, ranges = set(), set()
+    kind = node[0]
+    if kind == "ref":
+        refs.add((node[1], node[2]))
+    elif kind == "range":
+        ranges.add(node[1:])
+    elif kind in ("neg", "pct"):
+        formula_references(node[1], refs, ranges)
+    elif kind == "bin":
+        formula_references(node[2], refs, ranges)
+        formula_references(node[3], refs, ranges)
+    elif kind == "call":
+        for arg in node[2]:
+            formula_references(arg, refs, ranges)
+    return refs, ranges
+
+
+# --- Funzioni ---
+# Ricevono gli argomenti già valutati: numeri oppure array numpy (intervalli),
+# con NaN per le celle vuote.
+
+def _flatten(args):
+    arrays = [np.ravel(arg) for arg in args]
+    return np.concatenate(arrays) if arrays else np.zeros(0)
+
+
+def _sum(args):
+    # Somma in centesimi: il risultato non accumula errori di arrotondamento
+    return sum_cents(to_cents_array(_flatten(args))) / 100
+
+
+def _avg(args):
+    values = _flatten(args)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        raise FormulaError(ERROR_DIV_ZERO)
+    return float(values.mean())
+
+
+def _min(args):
+    values = _flatten(args)
+    return float(np.nanmin(values)) if np.any(~np.isnan(values)) else 0.0
+
+
+def _max(args):
+    values = _flatten(args)
+    return float(np.nanmax(values)) if np.any(~np.isnan(values)) else 0.0
+
+
+def _count(args):
+    return float(np.count_nonzero(~np.isnan(_flatten(args))))
+
+
+def _round(args):
+    if not 1 <= len(args) <= 2 or any(np.ndim(arg) for arg in args):
+        raise FormulaError(ERROR_VALUE)
+    digits = int(args[1]) if len(args) == 2 else 0
+    # Metà arrotondata lontano da zero, come Excel (np.round arrotonda al pari)
+    value = Decimal(repr(float(args[0])))
+    if not value.is_finite() or value.as_tuple().exponent >= -digits:
+        return float(value)  # Già con al più i decimali richiesti
+    return float(value.quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+FUNCTIONS = {
+    'SUM': _sum,
+    'AVG': _avg,
+    'MIN': _min,
+    'MAX': _max,
+    'COUNT': _count,
+    'ROUND': _round,
+}
+
+
+class FormulaEngine:
+    """
+    Celle di una tabella con il relativo grafo delle dipendenze.
+
+    Le celle sono identificate da (riga, colonna) a partire da 0; nelle
+    formule si usano i riferimenti in stile Excel (B1 = riga 0, colonna 1).
+    """
 
-class FormulaCalculator:
     def __init__(self):
-        self.functions = {
-            'SUM': np.sum,
-            'AVG': np.mean,
-            'MIN': np.min,
-            'MAX': np.max,
-            'COUNT': len,
-            'ROUND': np.round
-        }
-    
-    def evaluate(self, formula, table):
-        """Valuta una formula Excel-like"""
-        if not formula.startswith("="):
-            return float(formula)
-            
-        # Rimuovi il segno =
-        formula = formula[1:]
-        
-        # Trova tutte le referenze alle celle (es. B2:B10)
-        cell_refs = re.findall(r'([A-Z]+[0-9]+(?::[A-Z]+[0-9]+)?)', formula)
-        
-        for ref in cell_refs:
-            if ":" in ref:
-                # Range di celle
-                start, end = ref.split(":")
-                values = self.get_range_values(start, end, table)
-                formula = formula.replace(ref, str(values))
-            else:
-                # Singola cella
-                value = self.get_cell_value(ref, table)
-                formula = formula.replace(ref, str(value))
-        
-        # Sostituisci le funzioni Excel con le funzioni numpy
-        for excel_func, np_func in self.functions.items():
-            if excel_func in formula:
-                formula = formula.replace(excel_func, "np_func")
-        
-        try:
-            return eval(formula, {"np_func": self.functions}, {})
-        except:
-            return 0
-    
-    def get_cell_value(self, ref, table):
-        """Ottiene il valore di una cella"""
-        col = ord(ref[0]) - ord('A')
-        row = int(ref[1:]) - 1
-        
-        item = table.item(row, col)
-        if item and item.text():
+        self.raw = {}  # (riga, colonna) -> testo inserito
+        self.formulas = {}  # (riga, colonna) -> albero sintattico
+        self.errors = {}  # (riga, colonna) -> codice di errore
+        self.values = np.full((64, 8), np.nan)  # valori calcolati, NaN per le celle vuote
+        self.error_mask = np.zeros((64, 8), dtype=bool)  # True per le celle in errore
+        self.precedents = {}  # formula -> (celle, intervalli) da cui dipende
+        self.dependents = {}  # cella -> formule che la usano direttamente
+        self.range_dependents = {}  # intervallo -> formule che lo usano
+        self.range_blocks = {}  # (colonna, blocco di righe) -> intervalli che lo toccano
+        self.totals = {}  # colonna -> somma corrente in centesimi, aggiornata a ogni modifica
+
+    # --- Contenuto delle celle ---
+
+    def clear(self):
+        self.__init__()
+
+    def load(self, cells):
+        """
+        Carica tutte le celle e calcola tutte le formule.
+
+        Args:
+            cells (dict): (riga, colonna) -> testo o numero
+        """
+        self.clear()
+        for cell, text in cells.items():
+            self._store(cell, text)
+        self._recalculate(set(self.formulas))
+        # Somme ricalcolate da zero, per colonna intera
+        self.totals = {column: sum_cents(to_cents_array(self.values[:, column]))
+                       for column in range(self.values.shape[1])}
+
+    def set_cell(self, row, column, text):
+        """
+        Modifica una cella e ricalcola solo le formule che ne dipendono.
+
+        Returns:
+            set: Celle il cui valore è stato ricalcolato (compresa quella modificata)
+        """
+        cell = (row, column)
+        self._store(cell, "" if text is None else text)
+        dirty = self._affected({cell})
+        self._recalculate(dirty | ({cell} if cell in self.formulas else set()))
+        return dirty | {cell}
+
+    def value(self, row, column):
+        """Valore di una cella: numero, None se vuota, oppure codice di errore"""
+        cell = (row, column)
+        if cell in self.errors:
+            return self.errors[cell]
+        if row >= self.values.shape[0] or column >= self.values.shape[1]:
+            return None
+        value = self.values[row, column]
+        return None if np.isnan(value) else float(value)
+
+    def column_values(self, column):
+        """Valori numerici di una colonna (NaN per le celle vuote o in errore)"""
+        if column >= self.values.shape[1]:
+            return np.zeros(0)
+        return self.values[:, column]
+
+    def column_total(self, column):
+        """Somma esatta (Decimal) dei valori di una colonna, senza scorrere le righe"""
+        return cents_to_decimal(self.totals.get(column, 0))
+
+    def _set_value(self, cell, value):
+        """Scrive il valore di una cella aggiornando la somma della sua colonna"""
+        old = self.values[cell]
+        delta = (0 if np.isnan(value) else float_to_cents(value)) - \
+            (0 if np.isnan(old) else float_to_cents(old))
+        if delta:
+            self.totals[cell[1]] = self.totals.get(cell[1], 0) + delta
+        self.values[cell] = value
+
+    def _ensure(self, row, column):
+        rows, columns = self.values.shape
+        if row < rows and column < columns:
+            return
+        grown = np.full((max(rows, (row + 1) * 2), max(columns, column + 1)), np.nan)
+        grown[:rows, :columns] = self.values
+        self.values = grown
+        mask = np.zeros(grown.shape, dtype=bool)
+        mask[:rows, :columns] = self.error_mask
+        self.error_mask = mask
+
+    def _set_error(self, cell, code):
+        self.errors[cell] = code
+        self.error_mask[cell] = True
+
+    def _clear_error(self, cell):
+        if self.errors.pop(cell, None) is not None:
+            self.error_mask[cell] = False
+
+    def _store(self, cell, text):
+        """
+        Registra il contenuto di una cella e aggiorna il grafo (senza ricalcolare).
+
+        Il contenuto può essere testo (numero, formula) oppure un numero già
+        convertito, che non viene analizzato di nuovo.
+        """
+        self._unlink(cell)
+        self.formulas.pop(cell, None)
+        self._ensure(*cell)
+        self._clear_error(cell)
+        self._set_value(cell, np.nan)
+
+        if isinstance(text, (int, float)):
+            self.raw[cell] = text
+            self._set_value(cell, float(text))
+            return
+
+        text = text.strip()
+        if text:
+            self.raw[cell] = text
+        else:
+            self.raw.pop(cell, None)
+            return
+
+        if text.startswith("="):
             try:
-                return float(item.text().replace("€", "").replace(",", ""))
-            except:
-                return 0
-        return 0
-    
-    def get_range_values(self, start, end, table):
-        """Ottiene i valori da un range di celle"""
-        start_col = ord(start[0]) - ord('A')
-        start_row = int(start[1:]) - 1
-        end_col = ord(end[0]) - ord('A')
-        end_row = int(end[1:]) - 1
-        
-        values = []
-        for row in range(start_row, end_row + 1):
-            for col in range(start_col, end_col + 1):
-                item = table.item(row, col)
-                if item and item.text():
-                    try:
-                        values.append(float(item.text().replace("€", "").replace(",", "")))
-                    except:
-                        values.append(0)
-                else:
-                    values.append(0)
-        
-        return values 
\ No newline at end of file
+                node = parse_formula(text)
+            except FormulaError as e:
+                self._set_error(cell, e.code)
+                return
+            self.formulas[cell] = node
+            refs, ranges = formula_references(node)
+            self.precedents[cell] = (refs, ranges)
+            for ref in refs:
+                self.dependents.setdefault(ref, set()).add(cell)
+            for cells in ranges:
+                if cells not in self.range_dependents:
+                    self.range_dependents[cells] = set()
+                    for block in self._range_blocks(cells):
+                        self.range_blocks.setdefault(block, set()).add(cells)
+                self.range_dependents[cells].add(cell)
+                self._ensure(cells[2], cells[3])
+            return
+
+        try:
+            number = parse_number(text)
+        except FormulaError as e:
+            self._set_error(cell, e.code)
+            return
+        self._set_value(cell, np.nan if number is None else number)
+
+    def _unlink(self, cell):
+        refs, ranges = self.precedents.pop(cell, ((), ()))
+        for ref in refs:
+            users = self.dependents.get(ref)
+            if users:
+                users.discard(cell)
+                if not users:
+                    del self.dependents[ref]
+        for cells in ranges:
+            users = self.range_dependents.get(cells)
+            if users:
+                users.discard(cell)
+                if not users:
+                    del self.range_dependents[cells]
+                    for block in self._range_blocks(cells):
+                        blocked = self.range_blocks[block]
+                        blocked.discard(cells)
+                        if not blocked:
+                            del self.range_blocks[block]
+
+    # --- Grafo delle dipendenze ---
+
+    @staticmethod
+    def _range_blocks(cells):
+        """Blocchi (colonna, blocco di righe) coperti da un intervallo"""
+        r1, c1, r2, c2 = cells
+        for column in range(c1, c2 + 1):
+            for block in range(r1 // RANGE_BLOCK_ROWS, r2 // RANGE_BLOCK_ROWS + 1):
+                yield column, block
+
+    def _direct_dependents(self, cell):
+        row, column = cell
+        users = set(self.dependents.get(cell, ()))
+        # Solo gli intervalli registrati nel blocco della cella, non tutti
+        for cells in self.range_blocks.get((column, row // RANGE_BLOCK_ROWS), ()):
+            if cells[0] <= row <= cells[2]:
+                users |= self.range_dependents[cells]
+        return users
+
+    def _affected(self, cells):
+        """Formule che dipendono, anche indirettamente, dalle celle indicate"""
+        affected = set()
+        pending = list(cells)
+        while pending:
+            for user in self._direct_dependents(pending.pop()):
+                if user not in affected:
+                    affected.add(user)
+                    pending.append(user)
+        return affected
+
+    def _recalculate(self, dirty):
+        """Ricalcola le formule indicate in ordine topologico (algoritmo di Kahn)"""
+        if not dirty:
+            return
+        waiting = {}
+        users_of = {}
+        for cell in dirty:
+            users = self._direct_dependents(cell) & dirty
+            users_of[cell] = users
+            for user in users:
+                waiting[user] = waiting.get(user, 0) + 1
+
+        ready = [cell for cell in dirty if not waiting.get(cell)]
+        done = set()
+        while ready:
+            cell = ready.pop()
+            done.add(cell)
+            self._evaluate_cell(cell)
+            for user in users_of[cell]:
+                waiting[user] -= 1
+                if not waiting[user]:
+                    ready.append(user)
+
+        # Le formule rimaste hanno un riferimento circolare (o dipendono da uno)
+        for cell in dirty - done:
+            self._set_value(cell, np.nan)
+            self._set_error(cell, ERROR_CYCLE)
+
+    def _evaluate_cell(self, cell):
+        self._clear_error(cell)
+        try:
+            value = self._evaluate(self.formulas[cell])
+            if np.ndim(value):
+                raise FormulaError(ERROR_VALUE)
+            if not np.isfinite(value):
+                raise FormulaError(ERROR_DIV_ZERO if np.isinf(value) else ERROR_VALUE)
+            self._set_value(cell, value)
+        except FormulaError as e:
+            self._set_value(cell, np.nan)
+            self._set_error(cell, e.code)
+        except (ArithmeticError, ValueError, TypeError):
+            # Es. potenze enormi o radici di numeri negativi
+            self._set_value(cell, np.nan)
+            self._set_error(cell, ERROR_VALUE)
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == "num":
+            return node[1]
+        if kind == "ref":
+            cell = (node[1], node[2])
+            if cell in self.errors:
+                raise FormulaError(self.errors[cell])
+            value = self.value(*cell)
+            return 0.0 if value is None else value
+        if kind == "range":
+            r1, c1, r2, c2 = node[1:]
+            # Solo le celle dell'intervallo, tramite la maschera degli errori
+            errors = np.argwhere(self.error_mask[r1:r2 + 1, c1:c2 + 1])
+            if len(errors):
+                row, column = errors[0]
+                raise FormulaError(self.errors[(r1 + int(row), c1 + int(column))])
+            return self.values[r1:r2 + 1, c1:c2 + 1]
+        if kind == "neg":
+            return -self._scalar(node[1])
+        if kind == "pct":
+            return self._scalar(node[1]) / 100
+        if kind == "call":
+            return FUNCTIONS[node[1]]([self._evaluate(arg) for arg in node[2]])
+
+        op, left, right = node[1], self._scalar(node[2]), self._scalar(node[3])
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if op == "/":
+            if right == 0:
+                raise FormulaError(ERROR_DIV_ZERO)
+            return left / right
+        return left ** right
+
+    def _scalar(self, node):
+        value = self._evaluate(node)
+        if np.ndim(value):
+            raise FormulaError(ERROR_VALUE)
+        return value
@@ -62,11 +62,8 @@ class FilterDialog(QDialog):
     
     def populate_filter_list(self, table, column, list_widget):
         """Popola la lista con i valori unici dalla colonna"""
-        values = set()
-        for row in range(table.rowCount()):
-            item = table.item(row, column)
-            if item and item.text():
-                values.add(item.text())
+        values = set(table.model().column_texts(column))
+        values.discard("")
         
         for value in sorted(values):
             item = QListWidgetItem(value)
@@ -97,6 +94,5 @@ class FilterDialog(QDialog):
     def clear_filters(self):
         """Rimuove tutti i filtri"""
         for table in [self.parent.entrate_table, self.parent.uscite_table]:
-            for row in range(table.rowCount()):
-                table.setRowHidden(row, False)
+            self.parent.show_rows(table, None)
         self.accept() 
\ No newline at end of file
@@ -1,14 +1,15 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QTableWidget, QTableWidgetItem, QPushButton, QLabel,
+    QTableView, QPushButton, QLabel,
     QMessageBox, QFileDialog, QMenu, QAction, QInputDialog,
     QHeaderView, QDialog
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QIcon
 import pandas as pd
 import numpy as np
-from .calculator import FormulaCalculator
+from .calculator import FormulaError, parse_formula
+from .models import CbpTableModel, AMOUNT_COLUMN
 from .settings import cbp_settings
 from .startup_dialog import StartupDialog
 from .filter_dialog import FilterDialog
@@ -23,7 +24,12 @@ class CbpGUI(QMainWindow):
     def __init__(self, app=None):
         super().__init__()
         self.app = app
-        self.calculator = FormulaCalculator()
+
+        # Più modifiche ravvicinate (incolla, caricamento) producono un solo aggiornamento dei totali
+        self.totals_timer = QTimer(self)
+        self.totals_timer.setSingleShot(True)
+        self.totals_timer.setInterval(0)
+        self.totals_timer.timeout.connect(self.calculate_totals)
         self.logic_manager = LogicManager(self)
         
         # Mostra il dialogo di avvio
@@ -69,7 +75,7 @@ class CbpGUI(QMainWindow):
         entrate_label.setStyleSheet("font-weight: bold; font-size: 14px;")
         entrate_layout.addWidget(entrate_label)
         
-        self.entrate_table = QTableWidget()
+        self.entrate_table = QTableView()
         self.setup_table(self.entrate_table, "entrate")
         entrate_layout.addWidget(self.entrate_table)
         
@@ -85,7 +91,7 @@ class CbpGUI(QMainWindow):
         uscite_label.setStyleSheet("font-weight: bold; font-size: 14px;")
         uscite_layout.addWidget(uscite_label)
         
-        self.uscite_table = QTableWidget()
+        self.uscite_table = QTableView()
         self.setup_table(self.uscite_table, "uscite")
         uscite_layout.addWidget(self.uscite_table)
         
@@ -109,17 +115,19 @@ class CbpGUI(QMainWindow):
         
         layout.addLayout(saldo_layout)
         
-        # Connessioni
-        self.entrate_table.itemChanged.connect(self.calculate_totals)
-        self.uscite_table.itemChanged.connect(self.calculate_totals)
+        # Connessioni: ogni modifica dei modelli aggiorna i totali (una volta sola)
+        for table in (self.entrate_table, self.uscite_table):
+            model = table.model()
+            model.dataChanged.connect(self.totals_timer.start)
+            model.rowsInserted.connect(self.totals_timer.start)
+            model.rowsRemoved.connect(self.totals_timer.start)
+            model.modelReset.connect(self.totals_timer.start)
 
     def setup_table(self, table, table_type):
         """Imposta la struttura della tabella"""
         # Imposta le colonne dalla configurazione
         columns = cbp_settings.current_settings["columns"][table_type]
-        table.setColumnCount(len(columns))
-        table.setHorizontalHeaderLabels(columns)
-        table.setRowCount(20)  # Righe iniziali
+        table.setModel(CbpTableModel(columns, table))  # Con le righe iniziali vuote
         
         # Imposta le proprietà della tabella
         header = table.horizontalHeader()
@@ -152,6 +160,7 @@ class CbpGUI(QMainWindow):
             self.add_formula(table)
     
     def calculate_totals(self):
+        # Le somme delle colonne sono mantenute dal motore: nessuna scansione delle righe
         # Calcola totale entrate
         entrate_total = self.calculate_table_total(self.entrate_table)
         self.totale_entrate_label.setText(f"Totale: € {entrate_total:,.2f}")
@@ -167,21 +176,8 @@ class CbpGUI(QMainWindow):
         self.saldo_value.setText(f"€ {saldo:,.2f}")
     
     def calculate_table_total(self, table):
-        total = 0
-        for row in range(table.rowCount()):
-            item = table.item(row, 1)  # Colonna importo
-            if item and item.text():
-                try:
-                    if item.text().startswith("="):
-                        # È una formula
-                        value = self.calculator.evaluate(item.text(), table)
-                    else:
-                        # È un numero
-                        value = float(item.text().replace("€", "").replace(",", ""))
-                    total += value
-                except:
-                    pass
-        return total 
+        # Colonna importo: i valori (anche quelli delle formule) sono già calcolati dal motore
+        return table.model().total()
 
     def setup_toolbar(self):
         """Imposta la toolbar"""
@@ -292,16 +288,42 @@ class CbpGUI(QMainWindow):
 
     def insert_row(self, table):
         """Inserisce una nuova riga nella tabella"""
-        current_row = table.currentRow()
-        table.insertRow(current_row + 1)
+        current_row = table.currentIndex().row()
+        table.model().insertRows(current_row + 1, 1)
 
     def delete_row(self, table):
         """Elimina la riga selezionata"""
-        current_row = table.currentRow()
+        current_row = table.currentIndex().row()
         if current_row >= 0:
-            table.removeRow(current_row)
+            table.model().removeRows(current_row, 1)
             self.calculate_totals()
 
+    def add_formula(self, table):
+        """Inserisce una formula nella cella corrente (es. =SUM(B1:B10))"""
+        row = table.currentIndex().row()
+        if row < 0:
+            return
+        # Le formule sono ammesse solo nella colonna Importo
+        index = table.model().index(row, AMOUNT_COLUMN)
+        text = index.data(Qt.EditRole)
+        current = text if text.startswith("=") else "="
+        formula, ok = QInputDialog.getText(
+            self, "Aggiungi Formula",
+            "Formula (SUM, AVG, MIN, MAX, COUNT, ROUND; es. =SUM(B1:B10)):",
+            text=current
+        )
+        if not ok or not formula.strip():
+            return
+        formula = formula.strip()
+        if not formula.startswith("="):
+            formula = "=" + formula
+        try:
+            parse_formula(formula)
+        except FormulaError as e:
+            QMessageBox.warning(self, "Formula non valida", f"Errore nella formula: {e.code}")
+            return
+        table.model().setData(index, formula)
+
     def show_settings(self):
         """Mostra la finestra delle impostazioni"""
         from .settings import SettingsDialog
@@ -344,20 +366,28 @@ class CbpGUI(QMainWindow):
         """Mostra la barra di ricerca"""
         search_dialog = SearchDialog(self)
         if search_dialog.exec_() == QDialog.Accepted:
-            search_text = search_dialog.search_text.lower()
-            self.apply_search(search_text)
+            self.apply_search(search_dialog.search_text.text())
 
     def apply_search(self, search_text):
-        """Applica la ricerca alle tabelle"""
+        """Applica la ricerca alle tabelle (parole come prefissi, tutte presenti nella riga)"""
         for table in [self.entrate_table, self.uscite_table]:
-            for row in range(table.rowCount()):
-                row_visible = False
-                for col in range(table.columnCount()):
-                    item = table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        row_visible = True
-                        break
-                table.setRowHidden(row, not row_visible)
+            self.show_rows(table, table.model().search_index.search(search_text))
+
+    def show_rows(self, table, rows):
+        """
+        Mostra solo le righe indicate (tutte se rows è None), in un solo
+        passaggio: vengono toccate solo le righe che cambiano stato e la
+        vista si ridisegna una volta sola alla fine.
+        """
+        visible = None if rows is None else set(rows)
+        table.setUpdatesEnabled(False)
+        try:
+            for row in range(table.model().rowCount()):
+                hidden = visible is not None and row not in visible
+                if table.isRowHidden(row) != hidden:
+                    table.setRowHidden(row, hidden)
+        finally:
+            table.setUpdatesEnabled(True)
 
     def show_filters(self):
         """Mostra il dialog dei filtri"""
@@ -366,7 +396,7 @@ class CbpGUI(QMainWindow):
 
     def apply_filter(self, table, column, values):
         """Applica il filtro alla tabella"""
-        for row in range(table.rowCount()):
-            item = table.item(row, column)
-            if item:
-                table.setRowHidden(row, item.text() not in values) 
\ No newline at end of file
+        values = set(values)
+        texts = table.model().column_texts(column)
+        # Le righe vuote restano visibili
+        self.show_rows(table, [row for row, text in enumerate(texts) if not text or text in values])
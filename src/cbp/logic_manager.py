@@ -1,34 +1,29 @@
-import pandas as pd
 import os
-from datetime import datetime
-from PyQt5.QtWidgets import QTableWidgetItem, QMessageBox
+import xlsxwriter
+from openpyxl import load_workbook
+from PyQt5.QtWidgets import QMessageBox
+from .models import AMOUNT_COLUMN
+
+SHEETS = (('Entrate', 'entrate_table'), ('Uscite', 'uscite_table'))
+
 
 class LogicManager:
     def __init__(self, gui):
         self.gui = gui
-        self.df_entrate = None
-        self.df_uscite = None
-    
+
     def create_new_file(self):
         """Crea un nuovo file Excel con la struttura predefinita"""
         try:
-            # Crea DataFrame vuoti con le colonne predefinite
-            self.df_entrate = pd.DataFrame(columns=["Descrizione", "Importo", "Note"])
-            self.df_uscite = pd.DataFrame(columns=["Descrizione", "Importo", "Note"])
-            
-            # Crea il file Excel con due fogli
-            with pd.ExcelWriter(self.gui.file_path, engine='openpyxl') as writer:
-                self.df_entrate.to_excel(writer, sheet_name='Entrate', index=False)
-                self.df_uscite.to_excel(writer, sheet_name='Uscite', index=False)
-            
-            # Pulisci e prepara le tabelle
-            self.setup_tables()
-            
+            # Tabelle vuote, salvate subito con le sole intestazioni
+            for _, table_name in SHEETS:
+                getattr(self.gui, table_name).model().load_rows([])
+            self.write_file(self.gui.file_path)
+
             # Aggiorna i totali
             self.gui.calculate_totals()
-            
+
             return True
-            
+
         except Exception as e:
             QMessageBox.critical(
                 self.gui,
@@ -36,22 +31,34 @@ class LogicManager:
                 f"Errore nella creazione del file: {str(e)}"
             )
             return False
-    
+
     def load_file(self):
         """Carica i dati da un file Excel esistente"""
         try:
-            # Leggi i fogli Excel
-            self.df_entrate = pd.read_excel(self.gui.file_path, sheet_name='Entrate')
-            self.df_uscite = pd.read_excel(self.gui.file_path, sheet_name='Uscite')
-            
-            # Carica i dati nelle tabelle
-            self.setup_tables()
-            
+            # Lettura diretta dei fogli nei modelli, senza DataFrame né celle Qt;
+            # le formule vengono lette come testo (data_only=False)
+            workbook = load_workbook(self.gui.file_path, read_only=True, data_only=False)
+            try:
+                sheets = {}
+                for sheet_name, table_name in SHEETS:
+                    if sheet_name not in workbook.sheetnames:
+                        raise ValueError(f"Foglio '{sheet_name}' non trovato")
+                    sheets[table_name] = list(
+                        workbook[sheet_name].iter_rows(min_row=2, values_only=True)
+                    )
+            finally:
+                workbook.close()
+
+            for table_name, rows in sheets.items():
+                getattr(self.gui, table_name).model().load_rows(
+                    row for row in rows if any(value is not None for value in row)
+                )
+
             # Aggiorna i totali
             self.gui.calculate_totals()
-            
+
             return True
-            
+
         except Exception as e:
             QMessageBox.critical(
                 self.gui,
@@ -59,38 +66,13 @@ class LogicManager:
                 f"Errore nel caricamento del file: {str(e)}"
             )
             return False
-    
-    def setup_tables(self):
-        """Imposta le tabelle con i dati dei DataFrame"""
-        # Configura tabella Entrate
-        self.gui.entrate_table.setRowCount(max(20, len(self.df_entrate) + 5))
-        self.populate_table(self.gui.entrate_table, self.df_entrate)
-        
-        # Configura tabella Uscite
-        self.gui.uscite_table.setRowCount(max(20, len(self.df_uscite) + 5))
-        self.populate_table(self.gui.uscite_table, self.df_uscite)
-    
-    def populate_table(self, table, df):
-        """Popola una tabella con i dati di un DataFrame"""
-        for i, row in df.iterrows():
-            for j, value in enumerate(row):
-                item = QTableWidgetItem(str(value) if pd.notna(value) else "")
-                table.setItem(i, j, item)
-    
+
     def save_file(self):
         """Salva i dati correnti nel file Excel"""
         try:
-            # Converti le tabelle in DataFrame
-            self.df_entrate = self.table_to_df(self.gui.entrate_table)
-            self.df_uscite = self.table_to_df(self.gui.uscite_table)
-            
-            # Salva nel file Excel
-            with pd.ExcelWriter(self.gui.file_path, engine='openpyxl') as writer:
-                self.df_entrate.to_excel(writer, sheet_name='Entrate', index=False)
-                self.df_uscite.to_excel(writer, sheet_name='Uscite', index=False)
-            
+            self.write_file(self.gui.file_path)
             return True
-            
+
         except Exception as e:
             QMessageBox.critical(
                 self.gui,
@@ -98,18 +80,38 @@ class LogicManager:
                 f"Errore nel salvataggio del file: {str(e)}"
             )
             return False
-    
-    def table_to_df(self, table):
-        """Converte una tabella in DataFrame"""
-        data = []
-        for row in range(table.rowCount()):
-            row_data = []
-            for col in range(table.columnCount()):
-                item = table.item(row, col)
-                value = item.text() if item else ""
-                row_data.append(value)
-            if any(row_data):  # Includi solo righe non vuote
-                data.append(row_data)
-        
-        return pd.DataFrame(data, columns=[table.horizontalHeaderItem(i).text() 
-                                         for i in range(table.columnCount())]) 
\ No newline at end of file
+
+    def write_file(self, file_path):
+        """
+        Scrive i due fogli direttamente dai modelli.
+
+        Gli importi sono scritti come numeri (formato a due decimali), le
+        formule come formule. Il file viene prima scritto accanto
+        all'originale e poi lo sostituisce.
+        """
+        directory, name = os.path.split(os.path.abspath(file_path))
+        tmp_path = os.path.join(directory, f".~{name}.{os.getpid()}.tmp")
+        try:
+            workbook = xlsxwriter.Workbook(tmp_path)
+            money = workbook.add_format({'num_format': '#,##0.00'})
+            for sheet_name, table_name in SHEETS:
+                model = getattr(self.gui, table_name).model()
+                worksheet = workbook.add_worksheet(sheet_name)
+                worksheet.write_row(0, 0, model.headers)
+                for row, values in enumerate(model.filled_rows(), start=1):
+                    for col, value in enumerate(values):
+                        if col == AMOUNT_COLUMN and value is not None:
+                            if str(value).startswith("="):
+                                worksheet.write_formula(row, col, value, money)
+                            elif isinstance(value, str):
+                                worksheet.write_string(row, col, value)
+                            else:
+                                worksheet.write_number(row, col, float(value), money)
+                        elif value:
+                            worksheet.write_string(row, col, value)
+            workbook.close()
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,273 @@
+"""
+Modello dati delle tabelle di CBP (Entrate e Uscite).
+
+Le colonne di testo sono liste di stringhe; la colonna Importo è una lista
+di centesimi interi, convertiti una sola volta quando la cella viene
+modificata o letta dal file. Le formule (e gli importi non riconosciuti)
+restano come testo a parte e vengono calcolate dal FormulaEngine.
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from .calculator import FormulaEngine
+from .search import TextIndex
+from ..money import parse_cents, to_cents, cents_to_decimal, format_cents
+
+AMOUNT_COLUMN = 1  # Colonna Importo
+MIN_ROWS = 20  # Righe mostrate anche in un file vuoto
+SPARE_ROWS = 5  # Righe vuote lasciate dopo i dati
+
+
+class CbpStore:
+    """Righe di una tabella CBP, memorizzate per colonna"""
+
+    def __init__(self, column_count, rows=0):
+        self.column_count = column_count
+        self.texts = [[""] * rows if col != AMOUNT_COLUMN else None for col in range(column_count)]
+        self.amounts = [None] * rows  # centesimi
+        self.amount_texts = [None] * rows  # formula o importo non riconosciuto
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def text(self, row, column):
+        return self.texts[column][row]
+
+    def set_text(self, row, column, value):
+        self.texts[column][row] = value
+
+    def set_amount(self, row, value):
+        """
+        Imposta l'importo di una riga da testo o numero.
+
+        Returns:
+            bool: True se il valore è un numero valido o vuoto
+        """
+        self.amounts[row] = None
+        self.amount_texts[row] = None
+        if value is None:
+            return True
+        if isinstance(value, (int, float)):
+            self.amounts[row] = to_cents(value)
+            return True
+        value = str(value).strip()
+        if value.startswith("="):
+            self.amount_texts[row] = value
+            return True
+        try:
+            self.amounts[row] = parse_cents(value)
+            return True
+        except ValueError:
+            self.amount_texts[row] = value
+            return False
+
+    def engine_content(self, row):
+        """Contenuto della cella Importo per il motore delle formule"""
+        if self.amount_texts[row] is not None:
+            return self.amount_texts[row]
+        if self.amounts[row] is not None:
+            return self.amounts[row] / 100
+        return ""
+
+    def is_empty(self, row):
+        return (self.amounts[row] is None and self.amount_texts[row] is None
+                and not any(values[row] for values in self.texts if values is not None))
+
+    def insert_rows(self, position, count):
+        for values in self.texts:
+            if values is not None:
+                values[position:position] = [""] * count
+        self.amounts[position:position] = [None] * count
+        self.amount_texts[position:position] = [None] * count
+
+    def remove_rows(self, position, count):
+        for values in self.texts:
+            if values is not None:
+                del values[position:position + count]
+        del self.amounts[position:position + count]
+        del self.amount_texts[position:position + count]
+
+    def append_row(self, values):
+        """Aggiunge una riga letta dal file (valori nell'ordine delle colonne)"""
+        row = len(self)
+        self.insert_rows(row, 1)
+        for col in range(self.column_count):
+            value = values[col] if col < len(values) else None
+            if col == AMOUNT_COLUMN:
+                self.set_amount(row, value)
+            else:
+                self.texts[col][row] = cell_text(value)
+
+    def row_values(self, row):
+        """
+        Valori tipizzati di una riga per il salvataggio: testo per le colonne
+        di testo, Decimal (o la formula) per l'importo.
+        """
+        values = []
+        for col in range(self.column_count):
+            if col != AMOUNT_COLUMN:
+                values.append(self.texts[col][row])
+            elif self.amount_texts[row] is not None:
+                values.append(self.amount_texts[row])
+            elif self.amounts[row] is not None:
+                values.append(cents_to_decimal(self.amounts[row]))
+            else:
+                values.append(None)
+        return values
+
+
+def cell_text(value):
+    """Testo di una cella letta da Excel"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class CbpTableModel(QAbstractTableModel):
+    """Tabella Entrate o Uscite, con importi numerici e formule calcolate"""
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.store = CbpStore(len(self.headers), MIN_ROWS)
+        self.engine = FormulaEngine()
+        self.search_index = TextIndex(self)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+
+        if role == Qt.DisplayRole or role == Qt.EditRole:
+            if col != AMOUNT_COLUMN:
+                return self.store.text(row, col)
+            return self.amount_text(row, role == Qt.EditRole)
+        if role == Qt.TextAlignmentRole and col == AMOUNT_COLUMN:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def amount_text(self, row, editing=False):
+        """Testo della cella Importo: il valore calcolato, oppure la formula in modifica"""
+        special = self.store.amount_texts[row]
+        if special is not None:
+            if editing or not special.startswith("="):
+                return special
+            value = self.engine.value(row, AMOUNT_COLUMN)
+            if isinstance(value, str):
+                return value
+            return "" if value is None else f"{value:,.2f}"
+        cents = self.store.amounts[row]
+        if cents is None:
+            return ""
+        return str(cents_to_decimal(cents)) if editing else format_cents(cents)
+
+    def display_text(self, row, column):
+        return self.data(self.index(row, column))
+
+    def column_texts(self, column):
+        """Testi mostrati in una colonna, riga per riga"""
+        if column != AMOUNT_COLUMN:
+            return self.store.texts[column]
+        return [self.amount_text(row) for row in range(len(self.store))]
+
+    def row_text(self, row):
+        """Testo di tutta la riga, per l'indice di ricerca"""
+        texts = [self.store.text(row, col) if col != AMOUNT_COLUMN else self.amount_text(row)
+                 for col in range(len(self.headers))]
+        return " ".join(text for text in texts if text)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        row, col = index.row(), index.column()
+        value = "" if value is None else str(value)
+
+        if col != AMOUNT_COLUMN:
+            self.store.set_text(row, col, value)
+            self.dataChanged.emit(index, index)
+            return True
+
+        # L'importo viene convertito qui, una volta sola
+        self.store.set_amount(row, value)
+        changed = self.engine.set_cell(row, AMOUNT_COLUMN, self.store.engine_content(row))
+        rows = [cell[0] for cell in changed if cell[1] == AMOUNT_COLUMN]
+        self.dataChanged.emit(
+            self.index(min(rows), AMOUNT_COLUMN), self.index(max(rows), AMOUNT_COLUMN)
+        )
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def insertRows(self, position, rows, parent=QModelIndex()):
+        position = max(0, min(position, len(self.store)))
+        self.beginInsertRows(QModelIndex(), position, position + rows - 1)
+        self.store.insert_rows(position, rows)
+        self.endInsertRows()
+        self.reload_engine()
+        return True
+
+    def removeRows(self, position, rows, parent=QModelIndex()):
+        if not 0 <= position < len(self.store):
+            return False
+        rows = min(rows, len(self.store) - position)
+        self.beginRemoveRows(QModelIndex(), position, position + rows - 1)
+        self.store.remove_rows(position, rows)
+        self.endRemoveRows()
+        self.reload_engine()
+        return True
+
+    def reload_engine(self):
+        """
+        Ricarica il motore delle formule dopo uno spostamento di righe: i
+        riferimenti delle formule sono per posizione, quindi i valori cambiano.
+        """
+        self.engine.load(self._engine_cells())
+        if len(self.store):
+            self.dataChanged.emit(
+                self.index(0, AMOUNT_COLUMN), self.index(len(self.store) - 1, AMOUNT_COLUMN)
+            )
+
+    def _engine_cells(self):
+        cells = {}
+        for row in range(len(self.store)):
+            content = self.store.engine_content(row)
+            if content != "":
+                cells[(row, AMOUNT_COLUMN)] = content
+        return cells
+
+    def load_rows(self, rows):
+        """Carica le righe lette dal file (valori nell'ordine delle colonne)"""
+        self.beginResetModel()
+        self.store = CbpStore(len(self.headers))
+        for values in rows:
+            self.store.append_row(values)
+        # Righe vuote a disposizione per l'inserimento, come nel foglio originale
+        self.store.insert_rows(len(self.store), max(MIN_ROWS - len(self.store), SPARE_ROWS))
+        self.engine.load(self._engine_cells())
+        self.endResetModel()
+
+    def filled_rows(self):
+        """Valori delle righe non vuote, per il salvataggio"""
+        return [self.store.row_values(row) for row in range(len(self.store))
+                if not self.store.is_empty(row)]
+
+    def total(self):
+        """Totale della colonna Importo (formule comprese), senza scorrere le righe"""
+        return self.engine.column_total(AMOUNT_COLUMN)
@@ -0,0 +1,145 @@
+"""
+Ricerca nel testo delle tabelle di CBP.
+
+TextIndex è un indice invertito (termine -> righe) sul testo mostrato nelle
+righe di un CbpTableModel: descrizioni, note e importi. Viene costruito al
+caricamento e aggiornato, riga per riga, seguendo i segnali del modello
+(dataChanged, rowsInserted, rowsAboutToBeRemoved, modelReset).
+
+Ogni parola della ricerca è un prefisso ("quo" trova "Quote"); più parole
+vanno tutte trovate nella stessa riga. I termini sono tenuti anche in un
+vocabolario ordinato, quindi un prefisso si risolve con una ricerca binaria
+invece di scorrere le righe.
+"""
+
+import re
+import bisect
+import unicodedata
+from collections import defaultdict
+
+# Parole e numeri, compresi i separatori interni (es. 1,234.50)
+_TERM = re.compile(r"\w+(?:[.,']\w+)*")
+
+# Carattere più alto del piano base, per chiudere gli intervalli di prefisso
+_PREFIX_END = "\uffff"
+
+
+def normalize(text):
+    """Testo per la ricerca: minuscolo e senza accenti"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    if text.isascii():
+        return text
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Termini indicizzati di un testo"""
+    return set(_TERM.findall(normalize(text))) if text else set()
+
+
+class TextIndex:
+    """Indice invertito sulle righe di un CbpTableModel"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = []  # riga -> id stabile
+        self._next_id = 0
+        self._positions = None  # id -> riga, ricostruito solo quando serve
+        self.postings = defaultdict(set)  # termine -> id delle righe
+        self.terms = []  # vocabolario ordinato
+        self.row_terms = {}  # id -> termini della riga
+
+        model.modelReset.connect(self.rebuild)
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        self.rebuild()
+
+    def rebuild(self):
+        """Ricostruisce l'indice (caricamento di un nuovo file)"""
+        count = self.model.rowCount()
+        self.ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        self._positions = None
+        self.postings = defaultdict(set)
+        self.row_terms = {}
+        for row, row_id in enumerate(self.ids):
+            terms = tokenize(self.model.row_text(row))
+            self.row_terms[row_id] = terms
+            for term in terms:
+                self.postings[term].add(row_id)
+        self.terms = sorted(self.postings)
+
+    def _index_row(self, row_id, terms):
+        old = self.row_terms.get(row_id, set())
+        for term in old - terms:
+            rows = self.postings[term]
+            rows.discard(row_id)
+            if not rows:
+                del self.postings[term]
+                position = bisect.bisect_left(self.terms, term)
+                del self.terms[position]
+        for term in terms - old:
+            if term not in self.postings:
+                bisect.insort(self.terms, term)
+            self.postings[term].add(row_id)
+        if terms:
+            self.row_terms[row_id] = terms
+        else:
+            self.row_terms.pop(row_id, None)
+
+    def _on_data_changed(self, top_left, bottom_right, roles=None):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self._index_row(self.ids[row], tokenize(self.model.row_text(row)))
+
+    def _on_rows_inserted(self, parent, first, last):
+        count = last - first + 1
+        new_ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        self.ids[first:first] = new_ids
+        self._positions = None
+        for offset, row_id in enumerate(new_ids):
+            self._index_row(row_id, tokenize(self.model.row_text(first + offset)))
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        for row_id in self.ids[first:last + 1]:
+            self._index_row(row_id, set())
+        del self.ids[first:last + 1]
+        self._positions = None
+
+    def positions(self):
+        """Mappa id -> riga, ricostruita solo dopo inserimenti o rimozioni"""
+        if self._positions is None:
+            self._positions = dict(zip(self.ids, range(len(self.ids))))
+        return self._positions
+
+    def lookup(self, prefix):
+        """Id delle righe con almeno un termine che inizia per prefix"""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + _PREFIX_END, start)
+        if end - start == 1:
+            return set(self.postings[self.terms[start]])
+        found = set()
+        for term in self.terms[start:end]:
+            found |= self.postings[term]
+        return found
+
+    def search(self, query):
+        """
+        Cerca le righe che contengono tutte le parole della ricerca (come prefissi).
+
+        Returns:
+            list: Righe trovate, in ordine; None se la ricerca è vuota
+        """
+        prefixes = _TERM.findall(normalize(query))
+        if not prefixes:
+            return None
+        result = None
+        # Prima i prefissi più lunghi, di solito i più selettivi
+        for prefix in sorted(set(prefixes), key=len, reverse=True):
+            found = self.lookup(prefix)
+            result = found if result is None else result & found
+            if not result:
+                return []
+        positions = self.positions()
+        return sorted(positions[row_id] for row_id in result)
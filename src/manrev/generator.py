@@ -7,9 +7,16 @@ from win32 import win32print
 from PyQt5.QtWidgets import QMessageBox, QFileDialog
 from .settings import manrev_settings
 from .layout_man_rev import DocumentLayout
+from ..money import to_cents, split_cents, cents_to_decimal
 
 def number_to_words_it(number):
-    """Converte un numero in parole in italiano"""
+    """
+    Converte un importo in parole in italiano.
+
+    L'importo (testo con la virgola decimale, numero o Decimal) viene
+    convertito in centesimi interi: i centesimi non dipendono da
+    arrotondamenti dei float.
+    """
     
     # Dizionari di conversione
     unita = {
@@ -67,13 +74,16 @@ def number_to_words_it(number):
     try:
         # Gestione input non valido
         try:
-            number = float(str(number).replace(',', '.').strip())
-        except:
+            if isinstance(number, str):
+                number = number.replace(',', '.').strip()
+            cents = to_cents(number)
+        except ValueError:
+            return f"{number} euro"
+        if cents is None:
             return f"{number} euro"
         
         # Separazione parte intera e decimale
-        int_part = int(abs(number))
-        dec_part = int(round((abs(number) - int_part) * 100))
+        int_part, dec_part = split_cents(cents)
         
         # Caso zero
         if int_part == 0 and dec_part == 0:
@@ -136,8 +146,11 @@ def generate_documents(data, output_file, print_after=False):
         
         # Converti e aggiungi importo in lettere
         importo_str = str(data['Importo in €'])
-        importo_numerico = float(importo_str.replace(',', '.'))
-        importo_in_lettere = number_to_words_it(importo_numerico)
+        cents = to_cents(importo_str.replace(',', '.'))
+        if cents is None:
+            raise ValueError(f"Importo non valido: {importo_str}")
+        importo = cents_to_decimal(cents)
+        importo_in_lettere = number_to_words_it(importo)
         layout.add_amount_text(importo_in_lettere)
         
         # Aggiungi firme
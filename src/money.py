@@ -0,0 +1,106 @@
+"""
+Importi in euro, condivisi da CBP e ManRev.
+
+Gli importi sono interi in centesimi: somme e differenze sono esatte, senza
+gli scarti di arrotondamento dei float che su migliaia di righe spostano il
+saldo di qualche centesimo. Decimal serve solo ai confini (lettura del
+testo, visualizzazione, salvataggio); le colonne si sommano come array
+numpy di interi a 64 bit.
+"""
+
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import numpy as np
+
+_CENT = Decimal(1)
+
+
+def parse_cents(text):
+    """
+    Converte il testo di un importo (es. "€ 1,234.50") in centesimi.
+
+    Returns:
+        int: Centesimi, oppure None se il testo è vuoto
+
+    Raises:
+        ValueError: Testo non numerico
+    """
+    text = text.replace("€", "").replace(",", "").strip()
+    if not text:
+        return None
+    try:
+        return decimal_to_cents(Decimal(text))
+    except InvalidOperation:
+        raise ValueError(f"Importo non valido: {text}")
+
+
+def decimal_to_cents(value):
+    """Decimal -> centesimi, arrotondati per eccesso dal mezzo centesimo"""
+    if not value.is_finite():
+        raise ValueError(f"Importo non valido: {value}")
+    return int((value * 100).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def float_to_cents(value):
+    """
+    Float -> centesimi. L'arrotondamento a 6 cifre prima di quello al
+    centesimo assorbe l'errore di rappresentazione (1.005 * 100 = 100.4999...).
+    """
+    if not math.isfinite(value):
+        raise ValueError(f"Importo non valido: {value}")
+    cents = math.floor(abs(round(value * 100, 6)) + 0.5)
+    return -cents if value < 0 else cents
+
+
+def to_cents(value):
+    """
+    Centesimi di un importo qualsiasi: testo, int (euro), float o Decimal.
+
+    Returns:
+        int: Centesimi, oppure None per un valore vuoto
+
+    Raises:
+        ValueError: Valore non numerico
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Importo non valido: {value}")
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        return float_to_cents(value)
+    if isinstance(value, Decimal):
+        return decimal_to_cents(value)
+    return parse_cents(str(value))
+
+
+def cents_to_decimal(cents):
+    """Centesimi -> Decimal con due decimali"""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents):
+    """Centesimi -> testo (es. 1,234.50)"""
+    return f"{cents_to_decimal(cents):,.2f}"
+
+
+def split_cents(cents):
+    """Centesimi -> (euro, centesimi), senza segno"""
+    return divmod(abs(cents), 100)
+
+
+def to_cents_array(values):
+    """
+    Array di float (NaN per le celle vuote) -> array int64 di centesimi,
+    con lo stesso arrotondamento di float_to_cents e 0 al posto dei NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isfinite(values), values, 0.0)
+    cents = np.floor(np.abs(np.round(values * 100, 6)) + 0.5)
+    return np.copysign(cents, values).astype(np.int64)
+
+
+def sum_cents(cents):
+    """Somma esatta di una colonna di centesimi (lista o array)"""
+    return int(np.sum(np.asarray(cents, dtype=np.int64), dtype=np.int64))
@@ -0,0 +1,228 @@
+"""
+Protocollazione in blocco dei documenti.
+
+Il motore riserva in un'unica operazione un blocco contiguo di numeri di
+protocollo, prepara i timbri nel processo principale e delega l'apposizione
+del timbro (la parte costosa: apertura e salvataggio di PDF, Word, Excel e
+immagini) a un pool di processi. L'avanzamento viene notificato file per file
+alla GUI tramite un QThread oppure alla riga di comando.
+
+Uso da terminale:
+    python -m src.ordina.batch CARTELLA_O_FILE [...] [--recursive] [--workers N]
+"""
+
+import os
+import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyQt5.QtCore import QThread, pyqtSignal
+from .file_handler import stamp_document, SUPPORTED_EXTENSIONS
+from .history_dialog import add_to_history
+from .settings import ordina_settings as settings
+from .utils import create_stamp, build_output_path
+
+
+def collect_files(paths, recursive=False):
+    """
+    Espande un elenco di file e cartelle nei documenti da protocollare.
+
+    Args:
+        paths (list): File e/o cartelle
+        recursive (bool): Se True, scende anche nelle sottocartelle
+
+    Returns:
+        list: Percorsi dei file, nell'ordine in cui verranno numerati
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name) for name in sorted(names))
+            else:
+                files.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if os.path.isfile(os.path.join(path, name))
+                )
+        else:
+            files.append(path)
+
+    # Scarta i file che non possono essere protocollati (es. file nascosti, desktop.ini)
+    return [f for f in files if os.path.splitext(f)[1].lower() in SUPPORTED_EXTENSIONS]
+
+
+def _stamp_worker(input_path, output_path, stamp):
+    """Eseguita nei processi del pool: applica il timbro e restituisce il percorso di output"""
+    return stamp_document(input_path, output_path, stamp)
+
+
+class BatchProtocolEngine:
+    """Protocolla un insieme di documenti in parallelo"""
+
+    def __init__(self, files, max_workers=None):
+        self.files = list(files)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._cancelled = False
+
+    def cancel(self):
+        """Richiede l'interruzione: i file non ancora avviati non vengono protocollati"""
+        self._cancelled = True
+
+    def run(self, progress_callback=None):
+        """
+        Esegue la protocollazione.
+
+        Args:
+            progress_callback (callable, optional): Chiamata come
+                progress_callback(completati, totale, risultato) dopo ogni file
+
+        Returns:
+            list: Un dizionario per file con le chiavi
+                  "file", "protocol", "output_path" ed "error"
+        """
+        total = len(self.files)
+        results = []
+
+        def report(result):
+            results.append(result)
+            if progress_callback:
+                progress_callback(len(results), total, result)
+
+        # I file illeggibili vengono scartati prima della prenotazione,
+        # così non consumano numeri di protocollo
+        valid_files = []
+        for file_path in self.files:
+            if os.path.isfile(file_path) and os.access(file_path, os.R_OK):
+                valid_files.append(file_path)
+            else:
+                report(self._result(file_path, None, None, "File non trovato o non leggibile"))
+
+        if not valid_files or self._cancelled:
+            return results
+
+        numbers = settings.reserve_protocol_numbers(len(valid_files))
+        used_numbers = []
+        unused_numbers = []
+
+        # Il contesto "spawn" evita di duplicare con fork lo stato di Qt del processo GUI
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.max_workers, len(valid_files))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {}
+            for file_path, number in zip(valid_files, numbers):
+                try:
+                    output_path = build_output_path(file_path, number)
+                    stamp = create_stamp(number)
+                    if stamp is None:
+                        raise Exception("Errore nella creazione del timbro")
+                except Exception as e:
+                    unused_numbers.append(number)
+                    report(self._result(file_path, number, None, str(e)))
+                    continue
+                future = executor.submit(_stamp_worker, file_path, output_path, stamp)
+                futures[future] = (file_path, number)
+
+            for future in as_completed(futures):
+                if self._cancelled:
+                    for pending in futures:
+                        pending.cancel()
+
+                file_path, number = futures[future]
+                if future.cancelled():
+                    unused_numbers.append(number)
+                    report(self._result(file_path, number, None, "Annullato"))
+                    continue
+
+                try:
+                    output_path = future.result()
+                except Exception as e:
+                    unused_numbers.append(number)
+                    report(self._result(file_path, number, None, str(e)))
+                    continue
+
+                # La cronologia viene scritta solo dal processo principale
+                add_to_history(number, output_path)
+                used_numbers.append(number)
+                report(self._result(file_path, number, output_path, None))
+
+        # Conferma i numeri utilizzati e restituisce quelli rimasti liberi in coda al blocco
+        settings.confirm_protocol_numbers(used_numbers)
+        settings.release_protocol_numbers(unused_numbers)
+
+        return results
+
+    @staticmethod
+    def _result(file_path, protocol, output_path, error):
+        return {
+            "file": file_path,
+            "protocol": protocol,
+            "output_path": output_path,
+            "error": error
+        }
+
+
+class BatchProtocolWorker(QThread):
+    """Esegue il BatchProtocolEngine fuori dal thread della GUI"""
+    file_processed = pyqtSignal(int, int, dict)  # completati, totale, risultato
+    batch_completed = pyqtSignal(list)  # risultati
+    batch_error = pyqtSignal(str)  # messaggio di errore
+
+    def __init__(self, files, max_workers=None):
+        super().__init__()
+        self.engine = BatchProtocolEngine(files, max_workers)
+
+    def run(self):
+        try:
+            results = self.engine.run(progress_callback=self.file_processed.emit)
+            self.batch_completed.emit(results)
+        except Exception as e:
+            self.batch_error.emit(f"Errore durante la protocollazione: {str(e)}")
+
+    def stop(self):
+        self.engine.cancel()
+        self.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ordina - Protocollazione in blocco')
+    parser.add_argument('paths', nargs='+', help='File o cartelle da protocollare')
+    parser.add_argument('--recursive', action='store_true',
+                        help='Includi le sottocartelle')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Numero di processi (default: numero di CPU)')
+    args = parser.parse_args(argv)
+
+    # Il timbro viene disegnato con QPainter: serve un'applicazione Qt, anche senza display
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtGui import QGuiApplication
+    app = QGuiApplication(sys.argv[:1])
+
+    files = collect_files(args.paths, args.recursive)
+    if not files:
+        print("Nessun documento da protocollare")
+        return 1
+
+    def print_progress(done, total, result):
+        name = os.path.basename(result["file"])
+        if result["error"]:
+            print(f"[{done}/{total}] ERRORE {name}: {result['error']}")
+        else:
+            print(f"[{done}/{total}] {result['protocol']} {name} -> {result['output_path']}")
+
+    engine = BatchProtocolEngine(files, args.workers)
+    try:
+        results = engine.run(progress_callback=print_progress)
+    except KeyboardInterrupt:
+        engine.cancel()
+        return 130
+
+    failed = [r for r in results if r["error"]]
+    print(f"Protocollati {len(results) - len(failed)} documenti, {len(failed)} errori")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,16 +1,25 @@
 import os
+import io
+import zlib
+import shutil
+from functools import lru_cache
 from PyQt5.QtCore import Qt
 from PIL import Image
 import fitz  # PyMuPDF
 from docx import Document
 import openpyxl
-from .utils import create_stamp, get_output_path
+from openpyxl.drawing.image import Image as ExcelImage
+from .utils import create_stamp, get_output_path, stamp_png_bytes, stamp_png_stream
 from .settings import ordina_settings as settings
-import io
 from .history_dialog import add_to_history
 
+# Estensioni dei documenti che Ordina è in grado di protocollare
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.xlsx') + IMAGE_EXTENSIONS
+
 def handle_file(file_path):
     """Gestisce il file in base al suo tipo"""
+    protocol_number = None
     try:
         # Ottieni il percorso di output
         output_path = get_output_path(file_path)
@@ -43,39 +52,57 @@ def handle_file(file_path):
             raise Exception("Errore nella creazione del timbro")
             
         # Gestisci il file in base all'estensione
-        ext = os.path.splitext(file_path)[1].lower()
-        print(f"File extension: {ext}")  # Debug
-        
-        if ext == '.pdf':
-            handle_pdf(file_path, output_path, stamp)
-        elif ext == '.docx':
-            handle_docx(file_path, output_path, stamp)
-        elif ext == '.xlsx':
-            handle_xlsx(file_path, output_path, stamp)
-        elif ext in ['.png', '.jpg', '.jpeg']:
-            handle_image(file_path, output_path, stamp)
-        else:
-            raise Exception(f"Formato file non supportato: {ext}")
+        stamp_document(file_path, output_path, stamp)
         
         # Aggiungi alla cronologia
         add_to_history(protocol_number, output_path)
+        settings.confirm_protocol_numbers([protocol_number])
         
         return output_path
         
     except Exception as e:
         print(f"DEBUG - Errore dettagliato: {str(e)}")  # Debug
+        if protocol_number:
+            # Il documento non è stato protocollato: il numero non va consumato
+            settings.release_protocol_numbers([protocol_number])
         raise Exception(f"Errore durante la protocollazione: {str(e)}")
 
+def stamp_document(input_path, output_path, stamp):
+    """Applica il timbro al documento scegliendo il gestore in base all'estensione"""
+    ext = os.path.splitext(input_path)[1].lower()
+    
+    if ext == '.pdf':
+        handle_pdf(input_path, output_path, stamp)
+    elif ext == '.docx':
+        handle_docx(input_path, output_path, stamp)
+    elif ext == '.xlsx':
+        handle_xlsx(input_path, output_path, stamp)
+    elif ext in IMAGE_EXTENSIONS:
+        handle_image(input_path, output_path, stamp)
+    else:
+        raise Exception(f"Formato file non supportato: {ext}")
+    
+    return output_path
+
 def handle_pdf(input_path, output_path, stamp):
     """Gestisce file PDF"""
+    pdf_settings = settings.current_settings.get("pdf_save", {})
+    incremental = pdf_settings.get("incremental", True)
     try:
-        # Apri il PDF
-        pdf = fitz.open(input_path)
-        
-        # Converti il timbro PIL in bytes
-        stamp_bytes = io.BytesIO()
-        stamp.save(stamp_bytes, format='PNG')
-        stamp_bytes = stamp_bytes.getvalue()
+        pdf = None
+        if incremental:
+            # Copia i byte originali e aggiunge il timbro in coda come
+            # aggiornamento incrementale, senza riscrivere tutto il file
+            shutil.copyfile(input_path, output_path)
+            pdf = fitz.open(output_path)
+            if not pdf.can_save_incrementally():
+                # PDF danneggiato e riparato in apertura: serve la riscrittura completa
+                pdf.close()
+                pdf = None
+                incremental = False
+
+        if pdf is None:
+            pdf = fitz.open(input_path)
         
         # Inserisci il timbro nella prima pagina
         first_page = pdf[0]
@@ -99,51 +126,92 @@ def handle_pdf(input_path, output_path, stamp):
             x = 20
             y = rect.height - stamp_height - 20
         
-        # Inserisci il timbro
-        first_page.insert_image((x, y, x + stamp_width, y + stamp_height), stream=stamp_bytes)
+        # Inserisci il timbro: se disponibile, parte fissa e numero separati,
+        # così la parte fissa viene codificata una sola volta per tutto il lotto
+        layers = stamp.info.get("stamp_layers")
+        if layers:
+            static, overlay, (ox, oy) = layers
+            insert_pdf_image(pdf, first_page, (x, y, x + stamp_width, y + stamp_height), static)
+            insert_pdf_image(pdf, first_page, (
+                x + ox / 2, y + oy / 2,
+                x + (ox + overlay.width) / 2, y + (oy + overlay.height) / 2
+            ), overlay)
+        else:
+            insert_pdf_image(pdf, first_page, (x, y, x + stamp_width, y + stamp_height), stamp)
         
         # Salva il PDF
-        pdf.save(output_path)
+        deflate = pdf_settings.get("deflate", False)
+        if incremental:
+            pdf.save(output_path, incremental=True, deflate=deflate,
+                     encryption=fitz.PDF_ENCRYPT_KEEP)
+        else:
+            pdf.save(output_path, garbage=pdf_settings.get("garbage", 0), deflate=deflate)
         pdf.close()
         
     except Exception as e:
+        if incremental and os.path.exists(output_path):
+            # Non lasciare una copia non timbrata nella cartella dei protocolli
+            os.remove(output_path)
         raise Exception(f"Errore nella gestione del PDF: {str(e)}")
 
+@lru_cache(maxsize=16)
+def _pdf_image_streams(png_bytes):
+    """
+    Prepara i flussi compressi (colore e trasparenza) di un'immagine PNG.
+
+    Il risultato è in cache per processo: la parte fissa del timbro viene
+    compressa una volta e poi solo copiata in ogni PDF del lotto.
+    """
+    with Image.open(io.BytesIO(png_bytes)) as img:
+        img = img.convert('RGBA')
+        rgb = zlib.compress(img.convert('RGB').tobytes())
+        alpha = zlib.compress(img.getchannel('A').tobytes())
+        return img.width, img.height, rgb, alpha
+
+def insert_pdf_image(pdf, page, rect, image):
+    """Inserisce un'immagine RGBA nella pagina come XObject già compresso"""
+    width, height, rgb, alpha = _pdf_image_streams(stamp_png_bytes(image))
+    
+    smask_xref = pdf.get_new_xref()
+    pdf.update_object(smask_xref, (
+        f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+        f"/ColorSpace /DeviceGray /BitsPerComponent 8 >>"
+    ))
+    pdf.update_stream(smask_xref, alpha, compress=0)
+    # update_stream rimuove /Filter se non comprime: i dati sono già in Flate
+    pdf.xref_set_key(smask_xref, "Filter", "/FlateDecode")
+    
+    image_xref = pdf.get_new_xref()
+    pdf.update_object(image_xref, (
+        f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+        f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /SMask {smask_xref} 0 R >>"
+    ))
+    pdf.update_stream(image_xref, rgb, compress=0)
+    pdf.xref_set_key(image_xref, "Filter", "/FlateDecode")
+    
+    page.insert_image(rect, xref=image_xref)
+
 def handle_docx(input_path, output_path, stamp):
     """Gestisce file Word"""
     doc = Document(input_path)
     
-    # Salva il timbro come immagine temporanea
-    temp_stamp = "temp_stamp.png"
-    stamp.save(temp_stamp, "PNG")
-    
-    # Aggiungi il timbro al documento
-    doc.add_picture(temp_stamp)
+    # Aggiungi il timbro al documento direttamente dalla memoria
+    doc.add_picture(stamp_png_stream(stamp))
     
     # Salva il documento
     doc.save(output_path)
-    
-    # Rimuovi il file temporaneo
-    os.remove(temp_stamp)
 
 def handle_xlsx(input_path, output_path, stamp):
     """Gestisce file Excel"""
     wb = openpyxl.load_workbook(input_path)
     ws = wb.active
     
-    # Salva il timbro come immagine temporanea
-    temp_stamp = "temp_stamp.png"
-    stamp.save(temp_stamp, "PNG")
-    
-    # Aggiungi il timbro al foglio
-    img = openpyxl.drawing.image.Image(temp_stamp)
+    # Aggiungi il timbro al foglio direttamente dalla memoria
+    img = ExcelImage(stamp_png_stream(stamp))
     ws.add_image(img, 'A1')
     
     # Salva il file
     wb.save(output_path)
-    
-    # Rimuovi il file temporaneo
-    os.remove(temp_stamp)
 
 def handle_image(input_path, output_path, stamp):
     """Gestisce file immagine"""
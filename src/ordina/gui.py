@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QFileDialog,
     QMessageBox, QMenuBar, QMenu, QAction, QDialog, QComboBox, QHBoxLayout,
-    QSpinBox, QGroupBox
+    QSpinBox, QGroupBox, QProgressBar
 )
 from PyQt5.QtGui import QPixmap, QDesktopServices, QIcon
 from PyQt5.QtCore import Qt, QUrl, pyqtSignal
@@ -25,6 +25,7 @@ class ProtocolGUI(QMainWindow):
         self.setGeometry(200, 200, 800, 600)
         self.file_path = None
         self.protocol_button = None
+        self.batch_worker = None
         self.setup_menu()
         self.setup_ui()
         if self.app:
@@ -43,6 +44,14 @@ class ProtocolGUI(QMainWindow):
         load_action.setShortcut('Ctrl+O')
         file_menu.addAction(load_action)
         
+        batch_files_action = QAction('Protocolla Più Documenti...', self)
+        batch_files_action.triggered.connect(self.protocol_batch_files)
+        file_menu.addAction(batch_files_action)
+        
+        batch_folder_action = QAction('Protocolla Cartella...', self)
+        batch_folder_action.triggered.connect(self.protocol_batch_folder)
+        file_menu.addAction(batch_folder_action)
+        
         file_menu.addSeparator()
         
         exit_action = QAction('Esci', self)
@@ -57,6 +66,10 @@ class ProtocolGUI(QMainWindow):
         history_action.triggered.connect(self.show_history)
         tools_menu.addAction(history_action)
 
+        audit_action = QAction('Verifica Numerazione...', self)
+        audit_action.triggered.connect(self.show_protocol_audit)
+        tools_menu.addAction(audit_action)
+
         reset_action = QAction('Azzera Numerazione...', self)
         reset_action.triggered.connect(self.reset_protocol)
         tools_menu.addAction(reset_action)
@@ -84,7 +97,7 @@ class ProtocolGUI(QMainWindow):
         protocol_layout = QHBoxLayout()
         
         # Numero corrente
-        current_number = settings.current_settings["last_protocol_number"] + 1
+        current_number = settings.get_last_protocol_number() + 1
         self.protocol_label = QLabel(f"Prossimo numero: {current_number:05d}")
         protocol_layout.addWidget(self.protocol_label)
         
@@ -103,6 +116,11 @@ class ProtocolGUI(QMainWindow):
         preview_group.setLayout(preview_layout)
         layout.addWidget(preview_group)
 
+        # Avanzamento protocollazione in blocco
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setVisible(False)
+        layout.addWidget(self.batch_progress)
+
         # Pulsanti
         buttons_layout = QHBoxLayout()
         
@@ -114,6 +132,11 @@ class ProtocolGUI(QMainWindow):
         self.protocol_button.clicked.connect(self.protocol_document)
         self.protocol_button.setEnabled(False)
         buttons_layout.addWidget(self.protocol_button)
+
+        self.cancel_batch_button = QPushButton("Interrompi")
+        self.cancel_batch_button.clicked.connect(self.cancel_batch)
+        self.cancel_batch_button.setVisible(False)
+        buttons_layout.addWidget(self.cancel_batch_button)
         
         layout.addLayout(buttons_layout)
 
@@ -150,11 +173,116 @@ class ProtocolGUI(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Errore", f"Errore durante la protocollazione: {str(e)}")
 
+    def protocol_batch_files(self):
+        """Protocolla in blocco i documenti selezionati"""
+        files, _ = QFileDialog.getOpenFileNames(
+            self,
+            "Seleziona Documenti",
+            "",
+            "Documenti (*.pdf *.docx *.xlsx *.png *.jpg *.jpeg)"
+        )
+        if files:
+            from .batch import collect_files
+            self.start_batch(collect_files(files))
+
+    def protocol_batch_folder(self):
+        """Protocolla in blocco tutti i documenti di una cartella"""
+        folder = QFileDialog.getExistingDirectory(self, "Seleziona Cartella")
+        if folder:
+            from .batch import collect_files
+            self.start_batch(collect_files([folder]))
+
+    def start_batch(self, files):
+        """Avvia la protocollazione in blocco in un thread separato"""
+        if self.batch_worker and self.batch_worker.isRunning():
+            QMessageBox.warning(self, "Attenzione", "È già in corso una protocollazione in blocco.")
+            return
+        if not files:
+            QMessageBox.warning(self, "Attenzione", "Nessun documento da protocollare.")
+            return
+
+        self.batch_progress.setMaximum(len(files))
+        self.batch_progress.setValue(0)
+        self.batch_progress.setVisible(True)
+        self.cancel_batch_button.setVisible(True)
+        self.upload_button.setEnabled(False)
+        self.protocol_button.setEnabled(False)
+        self.preview_label.setText(f"Protocollazione di {len(files)} documenti in corso...")
+
+        from .batch import BatchProtocolWorker
+        self.batch_worker = BatchProtocolWorker(files)
+        self.batch_worker.file_processed.connect(self.on_batch_progress)
+        self.batch_worker.batch_completed.connect(self.on_batch_completed)
+        self.batch_worker.batch_error.connect(self.on_batch_error)
+        self.batch_worker.start()
+
+    def cancel_batch(self):
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.engine.cancel()
+            self.cancel_batch_button.setEnabled(False)
+
+    def on_batch_progress(self, done, total, result):
+        self.batch_progress.setValue(done)
+        name = os.path.basename(result["file"])
+        self.preview_label.setText(f"{done}/{total} - {name}")
+
+    def on_batch_completed(self, results):
+        self.finish_batch()
+        failed = [r for r in results if r["error"]]
+        message = f"Documenti protocollati: {len(results) - len(failed)}"
+        if failed:
+            message += "\n\nDocumenti non protocollati:\n- " + "\n- ".join(
+                f"{os.path.basename(r['file'])}: {r['error']}" for r in failed
+            )
+            QMessageBox.warning(self, "Protocollo completato con errori", message)
+        else:
+            QMessageBox.information(self, "Protocollo completato", message)
+        self.preview_label.setText(message.split("\n")[0])
+
+    def on_batch_error(self, error):
+        self.finish_batch()
+        QMessageBox.critical(self, "Errore", error)
+
+    def finish_batch(self):
+        self.batch_progress.setVisible(False)
+        self.cancel_batch_button.setVisible(False)
+        self.cancel_batch_button.setEnabled(True)
+        self.upload_button.setEnabled(True)
+        self.protocol_button.setEnabled(self.file_path is not None)
+        current_number = settings.get_last_protocol_number() + 1
+        self.protocol_label.setText(f"Prossimo numero: {current_number:05d}")
+
     def show_history(self):
         """Mostra la finestra della cronologia"""
         dialog = HistoryDialog(self)
         dialog.exec_()
 
+    def show_protocol_audit(self):
+        """Mostra i numeri di protocollo assegnati ma mai utilizzati"""
+        try:
+            gaps = settings.audit_protocol_gaps()
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Errore nella verifica della numerazione: {str(e)}")
+            return
+
+        year = settings.current_settings["year"]
+        if not gaps:
+            QMessageBox.information(
+                self,
+                "Verifica Numerazione",
+                f"Nessun buco nella numerazione dell'anno {year}"
+            )
+            return
+
+        details = "\n".join(f"{number:05d}: {status}" for number, status in gaps[:50])
+        if len(gaps) > 50:
+            details += f"\n... e altri {len(gaps) - 50}"
+        QMessageBox.warning(
+            self,
+            "Verifica Numerazione",
+            f"Numeri non utilizzati nell'anno {year}: {len(gaps)}\n\n{details}"
+        )
+
     def show_about(self):
         dialog = AboutDialog(self)
         dialog.exec_()
@@ -176,9 +304,8 @@ class ProtocolGUI(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            settings.current_settings["last_protocol_number"] = 0
-            settings.save_settings()
-            current_number = settings.current_settings["last_protocol_number"] + 1
+            settings.reset_protocol_number()
+            current_number = settings.get_last_protocol_number() + 1
             self.protocol_label.setText(f"Prossimo numero: {current_number:05d}")
             QMessageBox.information(
                 self,
@@ -190,11 +317,13 @@ class ProtocolGUI(QMainWindow):
         dialog = SettingsDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             self.apply_theme()
-            current_number = settings.current_settings["last_protocol_number"] + 1
+            current_number = settings.get_last_protocol_number() + 1
             self.protocol_label.setText(f"Prossimo numero: {current_number:05d}")
 
     def closeEvent(self, event):
         """Gestisce l'evento di chiusura della finestra"""
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.stop()
         self.closed.emit()  # Emette il segnale che farà riapparire la finestra di benvenuto
         event.accept()
 
@@ -211,7 +340,7 @@ class ProtocolGUI(QMainWindow):
             )
             
             # Aggiorna il numero del prossimo protocollo
-            current_number = settings.current_settings["last_protocol_number"] + 1
+            current_number = settings.get_last_protocol_number() + 1
             self.protocol_label.setText(f"Prossimo numero: {current_number:05d}")
             
             # Apri la cartella contenente il file
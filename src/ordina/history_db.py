@@ -0,0 +1,154 @@
+import sqlite3
+import os
+from datetime import datetime
+import pandas as pd
+
+HISTORY_COLUMNS = ["protocollo", "data", "ora", "file_path"]
+
+class HistoryDB:
+    """Cronologia dei protocolli di un anno, salvata in SQLite"""
+
+    def __init__(self, year):
+        self.year = str(year)
+        self.history_dir = os.path.join(
+            os.path.expanduser("~"),
+            "Documents",
+            "Abe",
+            "Ordina",
+            self.year
+        )
+        os.makedirs(self.history_dir, exist_ok=True)
+        self.db_path = os.path.join(self.history_dir, f"cronologia_{self.year}.db")
+        self.excel_path = os.path.join(self.history_dir, f"cronologia_{self.year}.xlsx")
+        self.init_db()
+        self.migrate_from_excel()
+
+    def init_db(self):
+        """Inizializza il database se non esiste"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    protocollo TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    ora TEXT NOT NULL,
+                    file_path TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_protocollo ON history(protocollo)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_data ON history(data)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_path ON history(file_path)')
+            conn.commit()
+
+    def migrate_from_excel(self):
+        """Importa una sola volta la vecchia cronologia cronologia_{anno}.xlsx"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM meta WHERE key='excel_migrated'")
+            if cursor.fetchone() or not os.path.exists(self.excel_path):
+                return
+
+            df = pd.read_excel(self.excel_path, dtype=str)
+            df = df.reindex(columns=HISTORY_COLUMNS).fillna("")
+            # Nel file Excel le voci più recenti sono in cima: si inseriscono
+            # al contrario per conservare l'ordine cronologico degli id
+            rows = list(df.iloc[::-1].itertuples(index=False, name=None))
+            cursor.executemany(
+                "INSERT INTO history (protocollo, data, ora, file_path) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            cursor.execute(
+                "INSERT INTO meta (key, value) VALUES ('excel_migrated', ?)",
+                (datetime.now().isoformat(),)
+            )
+            conn.commit()
+
+    def add_entry(self, protocol_number, file_path, timestamp=None):
+        """Aggiunge una voce alla cronologia"""
+        return self.add_entries([(protocol_number, file_path)], timestamp)
+
+    def add_entries(self, entries, timestamp=None):
+        """
+        Aggiunge più voci in un'unica transazione.
+
+        Args:
+            entries (list): Coppie (numero di protocollo, percorso del file)
+            timestamp (datetime, optional): Data e ora da registrare (default: adesso)
+        """
+        now = timestamp or datetime.now()
+        data = now.strftime("%d/%m/%Y")
+        ora = now.strftime("%H:%M:%S")
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO history (protocollo, data, ora, file_path) VALUES (?, ?, ?, ?)",
+                [(str(protocol), data, ora, path) for protocol, path in entries]
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def get_entries(self, limit=None):
+        """Restituisce le voci, dalla più recente"""
+        query = "SELECT protocollo, data, ora, file_path FROM history ORDER BY id DESC"
+        params = []
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def find_by_protocol(self, protocol_number):
+        """Cerca le voci con un dato numero di protocollo"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT protocollo, data, ora, file_path FROM history WHERE protocollo=? ORDER BY id DESC",
+                (str(protocol_number),)
+            )
+            return cursor.fetchall()
+
+    def find_by_file(self, file_path):
+        """Cerca le voci relative a un file protocollato"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT protocollo, data, ora, file_path FROM history WHERE file_path=? ORDER BY id DESC",
+                (file_path,)
+            )
+            return cursor.fetchall()
+
+    def find_by_date(self, date):
+        """Cerca le voci di un giorno (formato gg/mm/aaaa)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT protocollo, data, ora, file_path FROM history WHERE data=? ORDER BY id DESC",
+                (date,)
+            )
+            return cursor.fetchall()
+
+    def export_to_excel(self, output_path=None):
+        """
+        Esporta la cronologia in Excel.
+
+        Args:
+            output_path (str, optional): File di destinazione.
+                                       Se None, usa cronologia_{anno}.xlsx
+
+        Returns:
+            str: Percorso del file esportato
+        """
+        if output_path is None:
+            output_path = self.excel_path
+        df = pd.DataFrame(self.get_entries(), columns=HISTORY_COLUMNS)
+        df.to_excel(output_path, index=False)
+        return output_path
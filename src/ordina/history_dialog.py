@@ -1,22 +1,21 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit,
-    QMessageBox
+    QMessageBox, QFileDialog
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QDesktopServices
 from PyQt5.QtCore import QUrl
-import pandas as pd
 import os
-from datetime import datetime
 from .settings import ordina_settings
+from .history_db import HistoryDB
 
 class HistoryDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Cronologia Protocolli")
         self.setGeometry(100, 100, 800, 600)
-        self.history_file = self.get_history_file()
+        self.history_db = get_history_db()
         self.setup_ui()
         self.load_history()
         
@@ -60,6 +59,10 @@ class HistoryDialog(QDialog):
         open_folder_btn.clicked.connect(self.open_folder)
         buttons_layout.addWidget(open_folder_btn)
         
+        export_btn = QPushButton("Esporta Excel")
+        export_btn.clicked.connect(self.export_history)
+        buttons_layout.addWidget(export_btn)
+        
         close_btn = QPushButton("Chiudi")
         close_btn.clicked.connect(self.accept)
         buttons_layout.addWidget(close_btn)
@@ -67,30 +70,10 @@ class HistoryDialog(QDialog):
         layout.addLayout(buttons_layout)
         self.setLayout(layout)
     
-    def get_history_file(self):
-        """Ottiene il percorso del file della cronologia per l'anno corrente"""
-        year = ordina_settings.current_settings["year"]
-        history_dir = os.path.join(
-            os.path.expanduser("~"),
-            "Documents",
-            "Abe",
-            "Ordina",
-            year
-        )
-        os.makedirs(history_dir, exist_ok=True)
-        return os.path.join(history_dir, f"cronologia_{year}.xlsx")
-    
     def load_history(self):
-        """Carica la cronologia dal file Excel"""
+        """Carica la cronologia dal database"""
         try:
-            if os.path.exists(self.history_file):
-                df = pd.read_excel(self.history_file)
-            else:
-                df = pd.DataFrame(columns=["protocollo", "data", "ora", "file_path"])
-                df.to_excel(self.history_file, index=False)
-            
-            self.populate_table(df)
-            
+            self.populate_table(self.history_db.get_entries())
         except Exception as e:
             QMessageBox.warning(
                 self,
@@ -98,21 +81,42 @@ class HistoryDialog(QDialog):
                 f"Errore nel caricamento della cronologia: {str(e)}"
             )
     
-    def populate_table(self, df):
-        """Popola la tabella con i dati del DataFrame"""
-        self.table.setRowCount(len(df))
-        
-        for i, row in df.iterrows():
-            items = [
-                QTableWidgetItem(str(row['protocollo'])),
-                QTableWidgetItem(str(row['data'])),
-                QTableWidgetItem(str(row['ora'])),
-                QTableWidgetItem(str(row['file_path']))
-            ]
-            
-            for j, item in enumerate(items):
+    def populate_table(self, entries):
+        """Popola la tabella con le voci della cronologia"""
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(entries))
+        
+        for i, entry in enumerate(entries):
+            for j, value in enumerate(entry):
+                item = QTableWidgetItem(str(value))
                 item.setFlags(item.flags() & ~Qt.ItemIsEditable)
                 self.table.setItem(i, j, item)
+        
+        self.table.setUpdatesEnabled(True)
+    
+    def export_history(self):
+        """Esporta la cronologia in un file Excel"""
+        output_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Esporta Cronologia",
+            self.history_db.excel_path,
+            "Excel Files (*.xlsx)"
+        )
+        if not output_path:
+            return
+        try:
+            self.history_db.export_to_excel(output_path)
+            QMessageBox.information(
+                self,
+                "Esportazione completata",
+                f"Cronologia esportata in:\n{output_path}"
+            )
+        except Exception as e:
+            QMessageBox.critical(
+                self,
+                "Errore",
+                f"Errore nell'esportazione della cronologia: {str(e)}"
+            )
     
     def search_protocol(self):
         """Filtra la tabella in base al testo cercato"""
@@ -156,39 +160,19 @@ class HistoryDialog(QDialog):
                     f"La cartella non esiste più nel percorso:\n{folder_path}"
                 )
 
+# Database della cronologia già aperti, per anno
+_history_dbs = {}
+
+def get_history_db(year=None):
+    """Restituisce il database della cronologia per l'anno indicato o corrente"""
+    year = str(year or ordina_settings.current_settings["year"])
+    if year not in _history_dbs:
+        _history_dbs[year] = HistoryDB(year)
+    return _history_dbs[year]
+
 def add_to_history(protocol_number, file_path):
     """Aggiunge una nuova voce alla cronologia"""
     try:
-        # Ottieni il file della cronologia
-        year = ordina_settings.current_settings["year"]
-        history_dir = os.path.join(
-            os.path.expanduser("~"),
-            "Documents",
-            "Abe",
-            "Ordina",
-            year
-        )
-        history_file = os.path.join(history_dir, f"cronologia_{year}.xlsx")
-        
-        # Crea o carica il DataFrame
-        if os.path.exists(history_file):
-            df = pd.read_excel(history_file)
-        else:
-            df = pd.DataFrame(columns=["protocollo", "data", "ora", "file_path"])
-        
-        # Aggiungi la nuova voce
-        now = datetime.now()
-        new_row = {
-            "protocollo": protocol_number,
-            "data": now.strftime("%d/%m/%Y"),
-            "ora": now.strftime("%H:%M:%S"),
-            "file_path": file_path
-        }
-        
-        df = pd.concat([pd.DataFrame([new_row]), df], ignore_index=True)
-        
-        # Salva il DataFrame
-        df.to_excel(history_file, index=False)
-        
+        get_history_db().add_entry(protocol_number, file_path)
     except Exception as e:
-        print(f"Errore nell'aggiunta alla cronologia: {e}") 
\ No newline at end of file
+        print(f"Errore nell'aggiunta alla cronologia: {e}")
@@ -0,0 +1,263 @@
+import sqlite3
+import os
+
+# Stati di un numero di protocollo assegnato
+STATUS_RESERVED = "riservato"
+STATUS_USED = "usato"
+STATUS_VOID = "annullato"
+
+class ProtocolCounter:
+    """
+    Numerazione dei protocolli condivisa tra più istanze di Ordina.
+
+    Ogni anno ha la propria sequenza. Le prenotazioni avvengono in una
+    transazione SQLite con lock in scrittura (BEGIN IMMEDIATE), quindi due
+    finestre o due postazioni che condividono la cartella Documents non
+    possono ricevere lo stesso numero. Ogni numero assegnato viene registrato
+    per poter verificare i buchi nella numerazione.
+    """
+
+    def __init__(self, db_path=None, timeout=30):
+        if db_path is None:
+            db_dir = os.path.join(os.path.expanduser("~"), "Documents", "Abe", "Ordina")
+            db_path = os.path.join(db_dir, "numerazione.db")
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.timeout = timeout
+        self.init_db()
+
+    def connect(self):
+        # isolation_level=None: le transazioni sono gestite esplicitamente
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def init_db(self):
+        """Inizializza il database se non esiste"""
+        conn = self.connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sequences (
+                    year TEXT PRIMARY KEY,
+                    last_number INTEGER NOT NULL,
+                    base_number INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS allocations (
+                    year TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (year, number)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_status ON allocations(year, status)')
+        finally:
+            conn.close()
+
+    def ensure_year(self, year, start_from=0):
+        """
+        Crea la sequenza dell'anno se non esiste.
+
+        Args:
+            year (str): Anno della sequenza
+            start_from (int): Ultimo numero già assegnato prima dell'adozione
+                              del contatore (es. dal vecchio ordina_config.json)
+        """
+        conn = self.connect()
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO sequences (year, last_number, base_number) VALUES (?, ?, ?)",
+                (str(year), start_from, start_from)
+            )
+        finally:
+            conn.close()
+
+    def reserve(self, year, count=1):
+        """
+        Riserva un blocco contiguo di numeri in un'unica transazione.
+
+        Returns:
+            list: Numeri riservati (interi)
+        """
+        if count <= 0:
+            return []
+        year = str(year)
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last_number FROM sequences WHERE year=?", (year,)
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO sequences (year, last_number) VALUES (?, 0)", (year,)
+                    )
+                    last = 0
+                else:
+                    last = row[0]
+
+                numbers = list(range(last + 1, last + count + 1))
+                conn.execute(
+                    "UPDATE sequences SET last_number=? WHERE year=?", (numbers[-1], year)
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO allocations (year, number, status) VALUES (?, ?, ?)",
+                    [(year, number, STATUS_RESERVED) for number in numbers]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return numbers
+        finally:
+            conn.close()
+
+    def confirm(self, year, numbers):
+        """Segna i numeri come effettivamente utilizzati"""
+        self._set_status(year, numbers, STATUS_USED)
+
+    def release(self, year, numbers):
+        """
+        Restituisce numeri riservati e non utilizzati.
+
+        I numeri in coda alla sequenza tornano disponibili; gli altri non
+        possono essere riassegnati senza creare duplicati e vengono annullati.
+
+        Returns:
+            int: Quanti numeri sono tornati disponibili
+        """
+        year = str(year)
+        numbers = sorted({int(n) for n in numbers}, reverse=True)
+        if not numbers:
+            return 0
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last_number FROM sequences WHERE year=?", (year,)
+                ).fetchone()
+                last = row[0] if row else 0
+                reclaimed = []
+                for number in numbers:
+                    if number != last:
+                        break
+                    reclaimed.append(number)
+                    last -= 1
+
+                voided = numbers[len(reclaimed):]
+                conn.executemany(
+                    "UPDATE allocations SET status=?, updated_at=CURRENT_TIMESTAMP "
+                    "WHERE year=? AND number=?",
+                    [(STATUS_VOID, year, number) for number in voided]
+                )
+
+                # Anche i numeri annullati in precedenza che ora sono in coda tornano disponibili
+                if reclaimed:
+                    while last > 0:
+                        status = conn.execute(
+                            "SELECT status FROM allocations WHERE year=? AND number=?",
+                            (year, last)
+                        ).fetchone()
+                        if status is None or status[0] != STATUS_VOID:
+                            break
+                        reclaimed.append(last)
+                        last -= 1
+
+                if reclaimed:
+                    conn.execute(
+                        "UPDATE sequences SET last_number=? WHERE year=?", (last, year)
+                    )
+                    conn.executemany(
+                        "DELETE FROM allocations WHERE year=? AND number=?",
+                        [(year, number) for number in reclaimed]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return len(reclaimed)
+        finally:
+            conn.close()
+
+    def last_number(self, year):
+        """Ultimo numero assegnato per l'anno"""
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                "SELECT last_number FROM sequences WHERE year=?", (str(year),)
+            ).fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    def reset(self, year):
+        """Azzera la numerazione dell'anno"""
+        year = str(year)
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sequences (year, last_number, base_number) VALUES (?, 0, 0)",
+                    (year,)
+                )
+                conn.execute("DELETE FROM allocations WHERE year=?", (year,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def audit_gaps(self, year):
+        """
+        Elenca i numeri assegnati ma mai utilizzati.
+
+        Returns:
+            list: Coppie (numero, stato) ordinate per numero. Lo stato è
+                  "riservato" (prenotato ma non confermato), "annullato"
+                  oppure "mancante" se il numero non risulta mai assegnato
+        """
+        year = str(year)
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                "SELECT last_number, base_number FROM sequences WHERE year=?", (year,)
+            ).fetchone()
+            if row is None:
+                return []
+            last, base = row
+            statuses = dict(conn.execute(
+                "SELECT number, status FROM allocations WHERE year=? AND number>?",
+                (year, base)
+            ).fetchall())
+        finally:
+            conn.close()
+
+        gaps = []
+        for number in range(base + 1, last + 1):
+            status = statuses.get(number, "mancante")
+            if status != STATUS_USED:
+                gaps.append((number, status))
+        return gaps
+
+    def _set_status(self, year, numbers, status):
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE allocations SET status=?, updated_at=CURRENT_TIMESTAMP "
+                    "WHERE year=? AND number=?",
+                    [(status, str(year), int(number)) for number in numbers]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
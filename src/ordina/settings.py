@@ -8,12 +8,13 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QPushButton, QLabel, QGroupBox,
     QHBoxLayout, QSpinBox, QComboBox, QFileDialog, QMessageBox,
     QTabWidget, QGridLayout, QTextEdit, QFontComboBox, QColorDialog,
-    QWidget, QLineEdit
+    QWidget, QLineEdit, QCheckBox
 )
 from PyQt5.QtGui import (
     QFont, QImage, QPainter, QColor, QPixmap
 )
 from PyQt5.QtCore import Qt, QRectF
+from .protocol_counter import ProtocolCounter
 
 class OrdinaSettings:
     def __init__(self):
@@ -36,6 +37,11 @@ class OrdinaSettings:
             "stamp_image": None,
             "stamp_position": "top-right",
             "location": "Cagliari",
+            "pdf_save": {
+                "incremental": True,
+                "garbage": 0,
+                "deflate": False
+            },
             "stamp_settings": {
                 "width": 150,
                 "height": 150,
@@ -46,6 +52,10 @@ class OrdinaSettings:
             }
         }
         self.current_settings = self.load_settings()
+        self._protocol_counter = None
+        self._counter_years = set()
+        # Anno a cui si riferisce il last_protocol_number letto dal file
+        self._legacy_counter_year = self.current_settings["year"]
         self.ensure_output_directory()
 
     def load_settings(self):
@@ -76,19 +86,82 @@ class OrdinaSettings:
     def get_next_protocol_number(self):
         """Genera il prossimo numero di protocollo"""
         try:
-            current = self.current_settings["last_protocol_number"]
-            next_number = current + 1
-            print(f"Current protocol: {current}, Next: {next_number}")  # Debug
-            
-            self.current_settings["last_protocol_number"] = next_number
-            self.save_settings()
-            
-            return f"{next_number:05d}"
+            next_number = self.reserve_protocol_numbers(1)[0]
+            return next_number
             
         except Exception as e:
             print(f"DEBUG - Errore in get_next_protocol_number: {str(e)}")  # Debug
             raise Exception(f"Errore nella generazione del numero di protocollo: {str(e)}")
 
+    def get_protocol_counter(self):
+        """
+        Restituisce il contatore condiviso dei protocolli per l'anno corrente.
+
+        Alla prima apertura di un anno la sequenza riparte dall'ultimo numero
+        salvato in ordina_config.json, così il passaggio al contatore non
+        riutilizza numeri già assegnati.
+        """
+        year = self.current_settings["year"]
+        if self._protocol_counter is None:
+            self._protocol_counter = ProtocolCounter()
+        if year not in self._counter_years:
+            start_from = 0
+            if year == self._legacy_counter_year:
+                start_from = self.current_settings["last_protocol_number"]
+            self._protocol_counter.ensure_year(year, start_from)
+            self._counter_years.add(year)
+        return self._protocol_counter
+
+    def get_last_protocol_number(self):
+        """Restituisce l'ultimo numero di protocollo assegnato per l'anno corrente"""
+        counter = self.get_protocol_counter()
+        last = counter.last_number(self.current_settings["year"])
+        self.current_settings["last_protocol_number"] = last
+        return last
+
+    def reserve_protocol_numbers(self, count):
+        """
+        Riserva un blocco contiguo di numeri di protocollo in un'unica transazione.
+
+        Args:
+            count (int): Quanti numeri riservare
+
+        Returns:
+            list: Numeri riservati già formattati ("00001", "00002", ...)
+        """
+        if count <= 0:
+            return []
+        try:
+            counter = self.get_protocol_counter()
+            numbers = counter.reserve(self.current_settings["year"], count)
+            self.current_settings["last_protocol_number"] = numbers[-1]
+            return [f"{number:05d}" for number in numbers]
+        except Exception as e:
+            raise Exception(f"Errore nella prenotazione dei numeri di protocollo: {str(e)}")
+
+    def confirm_protocol_numbers(self, numbers):
+        """Registra i numeri riservati come effettivamente utilizzati"""
+        if numbers:
+            self.get_protocol_counter().confirm(self.current_settings["year"], numbers)
+
+    def release_protocol_numbers(self, numbers):
+        """
+        Restituisce i numeri riservati ma non utilizzati.
+
+        Il contatore viene riportato indietro solo se i numeri da liberare sono
+        in coda alla numerazione: un numero già seguito da altri assegnati
+        non può essere riutilizzato senza creare duplicati e resta annullato.
+        """
+        if not numbers:
+            return 0
+        released = self.get_protocol_counter().release(self.current_settings["year"], numbers)
+        self.get_last_protocol_number()
+        return released
+
+    def audit_protocol_gaps(self):
+        """Elenca i numeri dell'anno corrente assegnati ma mai utilizzati"""
+        return self.get_protocol_counter().audit_gaps(self.current_settings["year"])
+
     def get_output_directory(self):
         """Restituisce la directory di output per i file protocollati."""
         year = datetime.now().year
@@ -128,6 +201,7 @@ class OrdinaSettings:
         """
         if year:
             self.current_settings["year"] = str(year)
+        self.get_protocol_counter().reset(self.current_settings["year"])
         self.current_settings["last_protocol_number"] = 0
         self.save_settings()
 
@@ -173,7 +247,7 @@ class SettingsDialog(QDialog):
         reset_button.setStyleSheet("background-color: #ff9999;")
         
         # Numero corrente
-        current_number = ordina_settings.current_settings["last_protocol_number"]
+        current_number = ordina_settings.get_last_protocol_number()
         self.protocol_info = QLabel(f"Ultimo numero: {current_number:05d}")
         
         reset_row.addWidget(self.protocol_info)
@@ -197,6 +271,35 @@ class SettingsDialog(QDialog):
         dir_group.setLayout(dir_layout)
         general_layout.addWidget(dir_group)
 
+        # Salvataggio PDF
+        pdf_save = ordina_settings.current_settings["pdf_save"]
+        pdf_group = QGroupBox("Salvataggio PDF")
+        pdf_layout = QGridLayout()
+        
+        pdf_layout.addWidget(QLabel("Modalità:"), 0, 0)
+        self.pdf_mode_combo = QComboBox()
+        self.pdf_mode_combo.addItems(["Incrementale (consigliata)", "Riscrittura completa"])
+        self.pdf_mode_combo.setCurrentIndex(0 if pdf_save.get("incremental", True) else 1)
+        pdf_layout.addWidget(self.pdf_mode_combo, 0, 1)
+        
+        pdf_layout.addWidget(QLabel("Pulizia oggetti (solo riscrittura):"), 1, 0)
+        self.pdf_garbage_spin = QSpinBox()
+        self.pdf_garbage_spin.setRange(0, 4)
+        self.pdf_garbage_spin.setValue(pdf_save.get("garbage", 0))
+        pdf_layout.addWidget(self.pdf_garbage_spin, 1, 1)
+        
+        self.pdf_deflate_check = QCheckBox("Comprimi i flussi non compressi")
+        self.pdf_deflate_check.setChecked(pdf_save.get("deflate", False))
+        pdf_layout.addWidget(self.pdf_deflate_check, 2, 0, 1, 2)
+        
+        self.pdf_mode_combo.currentIndexChanged.connect(
+            lambda index: self.pdf_garbage_spin.setEnabled(index == 1)
+        )
+        self.pdf_garbage_spin.setEnabled(self.pdf_mode_combo.currentIndex() == 1)
+        
+        pdf_group.setLayout(pdf_layout)
+        general_layout.addWidget(pdf_group)
+
         general_tab.setLayout(general_layout)
         tab_widget.addTab(general_tab, "Generale")
 
@@ -402,6 +505,11 @@ class SettingsDialog(QDialog):
         ordina_settings.set_theme(self.theme_combo.currentText())
         ordina_settings.current_settings["year"] = str(self.year_spin.value())
         ordina_settings.current_settings["location"] = self.location_input.text()
+        ordina_settings.current_settings["pdf_save"] = {
+            "incremental": self.pdf_mode_combo.currentIndex() == 0,
+            "garbage": self.pdf_garbage_spin.value(),
+            "deflate": self.pdf_deflate_check.isChecked()
+        }
         
         # Salva le impostazioni del timbro
         ordina_settings.current_settings["stamp_settings"].update({
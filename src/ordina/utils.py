@@ -1,9 +1,15 @@
 import os
+import io
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from .settings import ordina_settings as settings
 from PIL import Image, ImageDraw, ImageFont
-from PyQt5.QtGui import QImage, QPainter, QFont, QColor
-from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import (
+    QImage, QPainter, QFont, QColor, QFontMetricsF, QTextLayout, QTextOption,
+    QTextCharFormat
+)
+from PyQt5.QtCore import Qt, QRectF, QPointF
 
 def generate_protocol():
     """Genera il prossimo numero di protocollo"""
@@ -12,9 +18,6 @@ def generate_protocol():
 def get_output_path(original_path):
     """Genera il percorso di output per il file protocollato"""
     try:
-        filename = os.path.basename(original_path)
-        name, ext = os.path.splitext(filename)
-        
         # Ottieni il numero di protocollo
         protocol = generate_protocol()
         if not protocol:
@@ -22,15 +25,7 @@ def get_output_path(original_path):
             
         print(f"Generated protocol: {protocol}")  # Debug
         
-        # Crea il nome del file
-        new_name = f"{name}__{protocol}{ext}"
-        print(f"New filename: {new_name}")  # Debug
-        
-        # Crea il percorso completo
-        year_folder = os.path.join(settings.get_output_directory(), settings.current_settings["year"])
-        os.makedirs(year_folder, exist_ok=True)
-        
-        full_path = os.path.join(year_folder, new_name)
+        full_path = build_output_path(original_path, protocol)
         print(f"Full output path: {full_path}")  # Debug
         
         return full_path
@@ -39,40 +34,257 @@ def get_output_path(original_path):
         print(f"DEBUG - Errore in get_output_path: {str(e)}")  # Debug
         raise Exception(f"Errore nella generazione del percorso di output: {str(e)}")
 
-def create_stamp(protocol_number):
-    """Crea il timbro come immagine"""
-    stamp_settings = settings.current_settings["stamp_settings"]
-    
-    # Crea un'immagine QImage con sfondo trasparente
-    img = QImage(stamp_settings["width"], stamp_settings["height"], QImage.Format_ARGB32)
-    img.fill(Qt.transparent)
+def build_output_path(original_path, protocol):
+    """Costruisce il percorso di output per un numero di protocollo già assegnato"""
+    filename = os.path.basename(original_path)
+    name, ext = os.path.splitext(filename)
     
-    # Prepara il painter
-    painter = QPainter(img)
-    painter.setRenderHint(QPainter.Antialiasing)
+    # Crea il nome del file
+    new_name = f"{name}__{protocol}{ext}"
     
-    # Imposta il font
-    font = QFont(stamp_settings["font_family"])
-    font.setPointSize(stamp_settings["font_size"])
-    painter.setFont(font)
+    # Crea il percorso completo
+    year_folder = os.path.join(settings.get_output_directory(), settings.current_settings["year"])
+    os.makedirs(year_folder, exist_ok=True)
     
-    # Imposta il colore
-    painter.setPen(QColor(stamp_settings["text_color"]))
-    
-    # Prepara il testo
-    text = stamp_settings["text"]
-    text = text.replace("{number}", protocol_number)
-    text = text.replace("{date}", datetime.now().strftime("%d/%m/%Y"))
-    text = text.replace("{location}", settings.current_settings.get("location", "Cagliari"))
-    
-    # Disegna il testo
-    rect = QRectF(0, 0, img.width(), img.height())
-    painter.drawText(rect, Qt.AlignCenter, text)
-    
-    painter.end()
-    
-    # Converti QImage in PIL Image
-    buffer = img.bits().asstring(img.byteCount())
-    pil_image = Image.frombytes('RGBA', (img.width(), img.height()), buffer)
-    
-    return pil_image 
\ No newline at end of file
+    return os.path.join(year_folder, new_name)
+
+def create_stamp(protocol_number):
+    """Crea il timbro come immagine"""
+    return stamp_cache.get_stamp(protocol_number)
+
+def stamp_png_bytes(stamp):
+    """
+    Restituisce il timbro codificato in PNG.
+
+    La codifica viene memorizzata nell'immagine stessa (stamp.info), così lo
+    stesso timbro non viene ricodificato per ogni documento. I byte sono
+    immutabili: più thread possono condividerli senza lock; se due thread
+    codificano lo stesso timbro insieme, setdefault conserva una sola copia.
+    """
+    png = stamp.info.get("png_bytes")
+    if png is None:
+        buffer = io.BytesIO()
+        stamp.save(buffer, format='PNG', compress_level=1)
+        png = stamp.info.setdefault("png_bytes", buffer.getvalue())
+    return png
+
+def stamp_png_stream(stamp):
+    """
+    Restituisce il PNG del timbro come stream in memoria.
+
+    Ogni chiamata crea un nuovo BytesIO sugli stessi byte condivisi: la
+    posizione di lettura è privata del chiamante, quindi i documenti dello
+    stesso lotto possono essere timbrati in parallelo senza file temporanei.
+    """
+    return io.BytesIO(stamp_png_bytes(stamp))
+
+def _qimage_to_pil(img):
+    """Converte una QImage RGBA8888 in immagine PIL"""
+    buffer = img.constBits().asstring(img.byteCount())
+    return Image.frombytes('RGBA', (img.width(), img.height()), buffer)
+
+class StampCache:
+    """
+    Cache dei timbri.
+
+    Nei lotti di protocollazione cambia solo il numero: per ogni combinazione
+    di impostazioni del timbro, data e località viene disegnata una volta la
+    parte fissa del timbro e una volta ogni cifra in ogni posizione del numero.
+    Il timbro di un documento si ottiene incollando le cifre sulla parte fissa,
+    senza rifare l'impaginazione del testo con QPainter.
+    """
+
+    def __init__(self, max_templates=8, max_stamps=64):
+        self.max_templates = max_templates
+        self.max_stamps = max_stamps
+        self._templates = OrderedDict()
+        self._stamps = OrderedDict()
+        # La cache è usata sia dalla GUI sia dal thread della protocollazione in blocco
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._stamps.clear()
+
+    def get_stamp(self, protocol_number):
+        """Restituisce il timbro per il numero indicato"""
+        with self._lock:
+            return self._get_stamp(str(protocol_number))
+
+    def _get_stamp(self, protocol_number):
+        key = self._settings_key()
+
+        stamp_key = (key, protocol_number)
+        stamp = self._stamps.get(stamp_key)
+        if stamp is not None:
+            self._stamps.move_to_end(stamp_key)
+            return stamp
+
+        template = self._get_template(key, len(protocol_number))
+        if template is None or not protocol_number.isdigit():
+            # Cifre a larghezza variabile o segnaposto ripetuto: disegno completo
+            stamp = self._render(key, protocol_number)
+        else:
+            static, tiles = template
+            overlay = Image.new('RGBA', static.size, (0, 0, 0, 0))
+            for position, digit in enumerate(protocol_number):
+                tile = tiles[position][digit]
+                if tile is not False:
+                    image, offset = tile
+                    overlay.alpha_composite(image, offset)
+            box = overlay.getbbox()
+
+            stamp = static.copy()
+            # copy() porta con sé anche info: il PNG della parte fissa non ha il numero
+            stamp.info.pop("png_bytes", None)
+            if box:
+                overlay = overlay.crop(box)
+                stamp.alpha_composite(overlay, box[:2])
+                # Chi sa sovrapporre le immagini (es. i PDF) può riusare la parte
+                # fissa, identica per tutto il lotto, e aggiungere solo il numero
+                stamp.info["stamp_layers"] = (static, overlay, box[:2])
+
+        self._stamps[stamp_key] = stamp
+        if len(self._stamps) > self.max_stamps:
+            self._stamps.popitem(last=False)
+        return stamp
+
+    def _settings_key(self):
+        stamp_settings = settings.current_settings["stamp_settings"]
+        return (
+            stamp_settings["width"],
+            stamp_settings["height"],
+            stamp_settings["text"],
+            stamp_settings["font_family"],
+            stamp_settings["font_size"],
+            stamp_settings["text_color"],
+            datetime.now().strftime("%d/%m/%Y"),
+            settings.current_settings.get("location", "Cagliari")
+        )
+
+    def _get_template(self, key, digits):
+        template_key = (key, digits)
+        if template_key in self._templates:
+            self._templates.move_to_end(template_key)
+            return self._templates[template_key]
+
+        template = self._build_template(key, digits)
+        self._templates[template_key] = template
+        if len(self._templates) > self.max_templates:
+            self._templates.popitem(last=False)
+        return template
+
+    def _build_template(self, key, digits):
+        """Disegna la parte fissa del timbro e le cifre nelle singole posizioni"""
+        width, height, text, font_family, font_size, text_color, date, location = key
+        if text.count("{number}") != 1:
+            return None
+
+        font = QFont(font_family)
+        font.setPointSize(font_size)
+        metrics = QFontMetricsF(font)
+        advances = {metrics.horizontalAdvance(str(d)) for d in range(10)}
+        if len(advances) != 1:
+            return None
+
+        before, after = self._fill_text(text, date, location).split("{number}")
+        start = len(before)
+
+        # Parte fissa: il numero viene impaginato ma non disegnato
+        static = self._render(key, "0" * digits, hidden=[(0, digits)])
+        stamp_png_bytes(static)
+
+        tiles = []
+        for position in range(digits):
+            position_tiles = {}
+            for digit in "0123456789":
+                number = "0" * position + digit + "0" * (digits - position - 1)
+                hidden = [(0, position), (position + 1, digits - position - 1)]
+                image = self._render(key, number, hidden=hidden, only_number=True)
+                bbox = image.getbbox()
+                # False: la cifra non lascia pixel visibili in questa posizione
+                position_tiles[digit] = (image.crop(bbox), bbox[:2]) if bbox else False
+            tiles.append(position_tiles)
+        return static, tiles
+
+    @staticmethod
+    def _fill_text(text, date, location):
+        return text.replace("{date}", date).replace("{location}", location)
+
+    def _render(self, key, protocol_number, hidden=None, only_number=False):
+        """
+        Disegna il timbro con QTextLayout.
+
+        Args:
+            hidden: Intervalli (inizio, lunghezza) del numero da impaginare
+                    senza disegnarli
+            only_number: Se True disegna solo le cifre del numero
+        """
+        width, height, text, font_family, font_size, text_color, date, location = key
+        filled = self._fill_text(text, date, location)
+        number_start = filled.find("{number}")
+        text = filled.replace("{number}", protocol_number)
+
+        # Crea un'immagine QImage con sfondo trasparente
+        img = QImage(width, height, QImage.Format_RGBA8888)
+        img.fill(Qt.transparent)
+
+        # Imposta il font
+        font = QFont(font_family)
+        font.setPointSize(font_size)
+
+        # Le parti nascoste vengono disegnate in trasparente
+        color = QColor(text_color)
+        transparent = QTextCharFormat()
+        transparent.setForeground(QColor(0, 0, 0, 0))
+        ranges = []
+        if only_number:
+            visible_start = number_start if number_start >= 0 else 0
+            for start, length in ((0, visible_start),
+                                  (visible_start + len(protocol_number),
+                                   len(text) - visible_start - len(protocol_number))):
+                if length > 0:
+                    ranges.append((start, length))
+        if hidden and number_start >= 0:
+            ranges.extend((number_start + start, length) for start, length in hidden if length > 0)
+
+        # Il testo va a capo solo sui \n, come con QPainter.drawText
+        layout = QTextLayout(text.replace("\n", "\u2028"), font)
+        option = QTextOption(Qt.AlignHCenter)
+        option.setWrapMode(QTextOption.NoWrap)
+        layout.setTextOption(option)
+        formats = []
+        for start, length in ranges:
+            format_range = QTextLayout.FormatRange()
+            format_range.start = start
+            format_range.length = length
+            format_range.format = transparent
+            formats.append(format_range)
+        layout.setFormats(formats)
+
+        # Interlinea calcolata come in QPainter.drawText
+        leading = QFontMetricsF(font).leading()
+        layout.beginLayout()
+        y = -leading
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            y += leading
+            line.setPosition(QPointF(0, y))
+            y += line.height()
+        layout.endLayout()
+
+        # Prepara il painter e disegna il testo centrato anche in verticale
+        painter = QPainter(img)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(color)
+        layout.draw(painter, QPointF(0, (height - y) / 2))
+        painter.end()
+
+        return _qimage_to_pil(img)
+
+# Istanza condivisa della cache dei timbri
+stamp_cache = StampCache()
@@ -2,6 +2,11 @@
 PDFtoA - Conversione PDF in PDF/A
 """
 
-from .gui import PDFtoAGUI
+__all__ = ['PDFtoAGUI']
 
-__all__ = ['PDFtoAGUI'] 
\ No newline at end of file
+def __getattr__(name):
+    # Import differito della GUI: la riga di comando non deve caricare PyQt
+    if name == 'PDFtoAGUI':
+        from .gui import PDFtoAGUI
+        return PDFtoAGUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
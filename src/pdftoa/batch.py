@@ -0,0 +1,266 @@
+"""
+Conversione in blocco di PDF in PDF/A.
+
+I file vengono convertiti in un pool di processi limitato al numero di CPU
+e salvati in un'unica cartella di output secondo un modello di nome.
+Il modulo non dipende da Qt: la GUI lo usa tramite un QThread.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .converter import (
+    PDFConverter, PeakMemoryMonitor, limit_process_memory,
+    PROFILE_AUTO, DEFAULT_LOW_MEMORY_THRESHOLD_MB
+)
+
+DEFAULT_NAMING_TEMPLATE = "{name}_PDFA.pdf"
+
+
+def build_output_name(input_path, template=DEFAULT_NAMING_TEMPLATE, index=1):
+    """
+    Costruisce il nome del file convertito.
+
+    Il modello può usare {name} (nome del file senza estensione),
+    {index} (posizione nel lotto, da 1) e {ext} (estensione originale).
+    """
+    name, ext = os.path.splitext(os.path.basename(input_path))
+    output_name = template.format(name=name, index=index, ext=ext.lstrip('.'))
+    if not output_name.lower().endswith('.pdf'):
+        output_name += '.pdf'
+    return output_name
+
+
+def plan_outputs(files, output_dir, template=DEFAULT_NAMING_TEMPLATE):
+    """
+    Associa a ogni file il percorso di output, evitando che due file del
+    lotto finiscano sullo stesso nome e che un file già presente nella
+    cartella venga sovrascritto (viene usato il primo suffisso _N libero).
+
+    Returns:
+        list: Coppie (input, output)
+    """
+    used = set()
+    plan = []
+    for index, input_path in enumerate(files, start=1):
+        output_name = build_output_name(input_path, template, index)
+        base, ext = os.path.splitext(output_name)
+        candidate = output_name
+        counter = 1
+        while candidate.lower() in used or os.path.exists(os.path.join(output_dir, candidate)):
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+        used.add(candidate.lower())
+        plan.append((input_path, os.path.join(output_dir, candidate)))
+    return plan
+
+
+def _convert_worker(input_path, output_path, cache=None, profile=PROFILE_AUTO,
+                    threshold_mb=DEFAULT_LOW_MEMORY_THRESHOLD_MB):
+    """
+    Eseguita nei processi del pool.
+
+    Returns:
+        dict: "elapsed" (secondi), "profile" usato, "peak_mb" (picco di
+              memoria del processo, None se non misurabile) e "cached"
+              (True se servito dalla cache, False se convertito, None se
+              la cache non è in uso)
+    """
+    start = time.perf_counter()
+    profile = PDFConverter.resolve_profile(input_path, profile, threshold_mb)
+    stats = {"profile": profile, "peak_mb": None, "cached": None}
+    key = None
+    if cache is not None:
+        stats["cached"] = False
+        # Un problema della cache non deve mai far fallire la conversione
+        try:
+            key = cache.make_key(input_path, profile)
+            if cache.fetch(key, output_path):
+                stats["cached"] = True
+                stats["elapsed"] = time.perf_counter() - start
+                return stats
+        except Exception:
+            key = None
+
+    with PeakMemoryMonitor() as monitor:
+        PDFConverter.convert_to_pdfa(input_path, output_path, profile)
+    stats["peak_mb"] = monitor.peak_mb
+
+    if key is not None:
+        try:
+            cache.store(key, output_path)
+        except Exception:
+            pass
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+class BatchConverter:
+    """Converte un insieme di PDF in parallelo"""
+
+    def __init__(self, files=(), output_dir=None, template=DEFAULT_NAMING_TEMPLATE,
+                 max_workers=None, plan=None, cache=None, profile=PROFILE_AUTO,
+                 low_memory_threshold_mb=DEFAULT_LOW_MEMORY_THRESHOLD_MB, memory_limit_mb=0):
+        """
+        Args:
+            files (list): PDF da convertire in output_dir secondo template
+            plan (list, optional): Coppie (input, output) già pronte, in
+                                   alternativa a files/output_dir
+            cache (ConversionCache, optional): Cache delle conversioni già eseguite
+            profile (str): Profilo di conversione (vedi PDFConverter.PROFILES)
+                           oppure "auto"
+            low_memory_threshold_mb (float): Con "auto", dimensione oltre la
+                                             quale si usa il profilo a basso consumo
+            memory_limit_mb (float): Memoria massima per processo del pool
+                                     (0 = nessun limite)
+        """
+        self.files = list(files)
+        self.output_dir = output_dir
+        self.template = template
+        self.plan = list(plan) if plan is not None else None
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.profile = profile
+        self.low_memory_threshold_mb = low_memory_threshold_mb
+        self.memory_limit_mb = memory_limit_mb
+        self._cancelled = False
+
+    def cancel(self):
+        """Interrompe il lotto: le conversioni già avviate vengono completate"""
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def run(self, progress_callback=None):
+        """
+        Esegue la conversione.
+
+        Args:
+            progress_callback (callable, optional): Chiamata come
+                progress_callback(completati, totale, risultato) dopo ogni file
+
+        Returns:
+            tuple: (risultati, riepilogo). Ogni risultato è un dizionario con
+                   "input", "output", "error", "elapsed", "size", "cached",
+                   "profile" e "peak_mb"; il riepilogo contiene conteggi,
+                   tempo totale, throughput, picco di memoria e statistiche
+                   della cache
+        """
+        if self.plan is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            plan = plan_outputs(self.files, self.output_dir, self.template)
+        else:
+            plan = self.plan
+            for output_dir in {os.path.dirname(output) for _, output in plan}:
+                os.makedirs(output_dir, exist_ok=True)
+        total = len(plan)
+        results = []
+        start = time.perf_counter()
+
+        def report(result):
+            results.append(result)
+            if progress_callback:
+                progress_callback(len(results), total, result)
+
+        if plan and not self._cancelled:
+            context = multiprocessing.get_context("spawn")
+            workers = min(self.max_workers, total)
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=limit_process_memory, initargs=(self.memory_limit_mb,)
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        _convert_worker, input_path, output_path, self.cache,
+                        self.profile, self.low_memory_threshold_mb
+                    ): (input_path, output_path)
+                    for input_path, output_path in plan
+                }
+                for future in as_completed(futures):
+                    if self._cancelled:
+                        for pending in futures:
+                            pending.cancel()
+
+                    input_path, output_path = futures[future]
+                    if future.cancelled():
+                        report(self._result(input_path, None, "Annullato"))
+                        continue
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        report(self._result(input_path, None, str(e)))
+                        continue
+                    report(self._result(input_path, output_path, None, **stats))
+
+        summary = self.summarize(results, time.perf_counter() - start)
+        if self.cache is not None:
+            try:
+                summary["cache_evicted"] = self.cache.evict()
+            except Exception:
+                pass
+        return results, summary
+
+    @staticmethod
+    def _result(input_path, output_path, error, elapsed=0.0, cached=None,
+                profile=None, peak_mb=None):
+        try:
+            size = os.path.getsize(input_path)
+        except OSError:
+            size = 0
+        return {
+            "input": input_path,
+            "output": output_path,
+            "error": error,
+            "elapsed": elapsed,
+            "size": size,
+            "cached": cached,
+            "profile": profile,
+            "peak_mb": peak_mb
+        }
+
+    @staticmethod
+    def summarize(results, elapsed):
+        """Calcola il riepilogo del lotto"""
+        converted = [r for r in results if not r["error"]]
+        cancelled = [r for r in results if r["error"] == "Annullato"]
+        hits = sum(1 for r in converted if r["cached"] is True)
+        misses = sum(1 for r in converted if r["cached"] is False)
+        peaks = [r["peak_mb"] for r in converted if r["peak_mb"] is not None]
+        megabytes = sum(r["size"] for r in converted) / (1024 * 1024)
+        return {
+            "total": len(results),
+            "converted": len(converted),
+            "failed": len(results) - len(converted) - len(cancelled),
+            "cancelled": len(cancelled),
+            "elapsed": elapsed,
+            "files_per_second": len(converted) / elapsed if elapsed > 0 else 0.0,
+            "mb_per_second": megabytes / elapsed if elapsed > 0 else 0.0,
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "peak_mb": max(peaks) if peaks else None
+        }
+
+
+def format_summary(summary):
+    """Riepilogo leggibile per messaggi e terminale"""
+    text = (
+        f"Convertiti: {summary['converted']}/{summary['total']}"
+        f" - Errori: {summary['failed']}"
+    )
+    if summary["cancelled"]:
+        text += f" - Annullati: {summary['cancelled']}"
+    text += (
+        f"\nTempo: {summary['elapsed']:.1f} s"
+        f" ({summary['files_per_second']:.2f} file/s, {summary['mb_per_second']:.1f} MB/s)"
+    )
+    if summary.get("peak_mb") is not None:
+        text += f"\nPicco di memoria per processo: {summary['peak_mb']:.0f} MB"
+    if summary.get("cache_hits") or summary.get("cache_misses"):
+        text += (
+            f"\nCache: {summary['cache_hits']} file già convertiti,"
+            f" {summary['cache_misses']} nuove conversioni"
+        )
+    return text
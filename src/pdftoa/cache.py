@@ -0,0 +1,172 @@
+"""
+Cache persistente delle conversioni PDF/A.
+
+La chiave è l'hash SHA-256 del contenuto del PDF di ingresso combinato con
+le impostazioni del convertitore e con il nome del file (che finisce nei
+metadati dc:title). Se la chiave è già presente, il convertito salvato in
+cache viene collegato (hardlink) o copiato nella destinazione senza
+rielaborare il PDF. Le voci vecchie o in eccesso rispetto alla dimensione
+massima vengono eliminate a fine lotto, partendo dalle meno usate.
+"""
+
+import sqlite3
+import os
+import time
+import shutil
+import hashlib
+from .converter import PDFConverter, PROFILE_STANDARD
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), "Documents", "Abe", "PDFtoA", "cache")
+DEFAULT_MAX_AGE_DAYS = 90
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Hash SHA-256 del file, letto a blocchi per non caricarlo in memoria"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    Archivio dei PDF/A già prodotti.
+
+    L'oggetto contiene solo percorsi e limiti, quindi può essere passato ai
+    processi del pool: ogni operazione apre la propria connessione SQLite.
+    """
+
+    def __init__(self, cache_dir=None, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB, timeout=30):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.files_dir = os.path.join(self.cache_dir, "files")
+        self.db_path = os.path.join(self.cache_dir, "cache.db")
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.timeout = timeout
+        os.makedirs(self.files_dir, exist_ok=True)
+        self.init_db()
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, timeout=self.timeout)
+
+    def init_db(self):
+        """Inizializza il database se non esiste"""
+        with self.connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)')
+
+    @staticmethod
+    def make_key(input_path, profile=PROFILE_STANDARD):
+        """Chiave della conversione: contenuto, nome del file e impostazioni"""
+        fingerprint = PDFConverter.settings_fingerprint(profile)
+        name = os.path.basename(input_path)
+        return hashlib.sha256(
+            f"{file_digest(input_path)}|{name}|{fingerprint}".encode('utf-8')
+        ).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.files_dir, f"{key}.pdf")
+
+    def fetch(self, key, output_path):
+        """
+        Copia nella destinazione il convertito in cache, se presente.
+
+        Returns:
+            bool: True se la conversione è stata servita dalla cache
+        """
+        entry_path = self._entry_path(key)
+        with self.connect() as conn:
+            row = conn.execute("SELECT size FROM entries WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return False
+            if not os.path.exists(entry_path):
+                # Il file è stato rimosso a mano: la voce non è più valida
+                conn.execute("DELETE FROM entries WHERE key=?", (key,))
+                return False
+            conn.execute("UPDATE entries SET last_used=? WHERE key=?", (time.time(), key))
+
+        self._link_or_copy(entry_path, output_path)
+        return True
+
+    def store(self, key, output_path):
+        """Registra in cache il convertito appena prodotto"""
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        # Copia su file temporaneo: due processi possono registrare la stessa voce
+        shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, entry_path)
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, os.path.getsize(entry_path), now, now)
+            )
+
+    def evict(self):
+        """
+        Elimina le voci scadute e, se la cache supera la dimensione massima,
+        quelle usate meno di recente.
+
+        Returns:
+            int: Numero di voci eliminate
+        """
+        removed = []
+        with self.connect() as conn:
+            if self.max_age_days:
+                limit = time.time() - self.max_age_days * 86400
+                removed.extend(key for key, in conn.execute(
+                    "SELECT key FROM entries WHERE last_used<?", (limit,)
+                ))
+                conn.execute("DELETE FROM entries WHERE last_used<?", (limit,))
+            if self.max_size_mb:
+                max_bytes = self.max_size_mb * 1024 * 1024
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                oldest = []
+                for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                    if total <= max_bytes:
+                        break
+                    oldest.append(key)
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE key=?", [(key,) for key in oldest])
+                removed.extend(oldest)
+
+        for key in removed:
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+        return len(removed)
+
+    def clear(self):
+        """Svuota la cache"""
+        with self.connect() as conn:
+            conn.execute("DELETE FROM entries")
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+
+    def stats(self):
+        """Numero di voci e dimensione totale in byte"""
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+    @staticmethod
+    def _link_or_copy(source, destination):
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            # Filesystem diversi o senza supporto agli hardlink
+            shutil.copyfile(source, destination)
+        # Il convertito deve risultare più recente dell'originale (vedi cli.is_up_to_date)
+        os.utime(destination)
@@ -0,0 +1,225 @@
+"""
+Conversione PDF/A da riga di comando, senza interfaccia grafica.
+
+Converte file e cartelle (anche ricorsivamente) usando il pool di processi
+di BatchConverter. Un file viene saltato se il convertito esiste già ed è
+più recente dell'originale, quindi il comando può essere rilanciato ogni
+notte sulla stessa cartella. Con --watch resta in ascolto su una cartella
+di deposito e converte i nuovi PDF appena sono stati copiati per intero.
+
+Il modulo non importa PyQt.
+
+Uso da terminale:
+    python -m src.pdftoa.cli INGRESSO [...] -o CARTELLA_OUTPUT [--workers N]
+    python -m src.pdftoa.cli CARTELLA_DEPOSITO -o CARTELLA_OUTPUT --watch
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from .batch import BatchConverter, DEFAULT_NAMING_TEMPLATE, build_output_name, format_summary
+from .cache import ConversionCache
+from .converter import PDFConverter, PROFILE_AUTO, DEFAULT_LOW_MEMORY_THRESHOLD_MB
+
+
+def collect_pdfs(paths, recursive=True):
+    """
+    Espande file e cartelle nei PDF da convertire.
+
+    Returns:
+        list: Coppie (percorso del file, cartella di partenza). La cartella
+              di partenza serve a ricreare la struttura delle sottocartelle
+              nell'output; per i file indicati direttamente è None
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    files.extend((os.path.join(root, name), path) for name in sorted(names))
+            else:
+                files.extend(
+                    (os.path.join(path, name), path) for name in sorted(os.listdir(path))
+                    if os.path.isfile(os.path.join(path, name))
+                )
+        else:
+            files.append((path, None))
+    return [(f, base) for f, base in files if f.lower().endswith('.pdf')]
+
+
+def output_path_for(input_path, base_dir, output_dir, template=DEFAULT_NAMING_TEMPLATE):
+    """Percorso di output che rispecchia la posizione del file sotto base_dir"""
+    relative_dir = ""
+    if base_dir is not None:
+        relative_dir = os.path.dirname(os.path.relpath(input_path, base_dir))
+    return os.path.join(output_dir, relative_dir, build_output_name(input_path, template))
+
+
+def is_up_to_date(input_path, output_path):
+    """True se il convertito esiste ed è più recente dell'originale"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def build_plan(paths, output_dir, template=DEFAULT_NAMING_TEMPLATE, recursive=True, force=False):
+    """
+    Prepara le coppie (input, output) da convertire.
+
+    Returns:
+        tuple: (piano, numero di file saltati perché già aggiornati)
+    """
+    plan = []
+    skipped = 0
+    output_root = os.path.abspath(output_dir)
+    for input_path, base_dir in collect_pdfs(paths, recursive):
+        # Se l'output è dentro la cartella di ingresso non si riconvertono i convertiti
+        if os.path.abspath(input_path).startswith(output_root + os.sep):
+            continue
+        output_path = output_path_for(input_path, base_dir, output_dir, template)
+        if not force and is_up_to_date(input_path, output_path):
+            skipped += 1
+            continue
+        plan.append((input_path, output_path))
+    return plan, skipped
+
+
+def print_progress(done, total, result):
+    name = os.path.basename(result["input"])
+    if result["error"]:
+        print(f"[{done}/{total}] ERRORE {name}: {result['error']}", flush=True)
+    else:
+        details = f"{result['elapsed']:.2f} s, {result['profile']}"
+        if result["cached"]:
+            details += ", cache"
+        elif result["peak_mb"] is not None:
+            details += f", picco {result['peak_mb']:.0f} MB"
+        print(f"[{done}/{total}] {name} -> {result['output']} ({details})", flush=True)
+
+
+def convert(paths, output_dir, template, workers, recursive, force, cache=None,
+            quiet=False, **options):
+    """
+    Esegue una passata di conversione. Restituisce il riepilogo.
+
+    Le opzioni aggiuntive (profile, low_memory_threshold_mb, memory_limit_mb)
+    vengono passate a BatchConverter.
+    """
+    plan, skipped = build_plan(paths, output_dir, template, recursive, force)
+    if skipped and not quiet:
+        print(f"Saltati {skipped} file già convertiti", flush=True)
+    if not plan:
+        return None
+
+    converter = BatchConverter(plan=plan, max_workers=workers, cache=cache, **options)
+    try:
+        _, summary = converter.run(progress_callback=print_progress)
+    except KeyboardInterrupt:
+        converter.cancel()
+        raise
+    print(format_summary(summary), flush=True)
+    return summary
+
+
+def watch(paths, output_dir, template, workers, recursive, interval, cache=None, **options):
+    """
+    Controlla periodicamente le cartelle di deposito.
+
+    Un file viene convertito solo quando dimensione e data di modifica
+    restano invariate tra due controlli consecutivi, così non si convertono
+    PDF ancora in fase di copia.
+    """
+    print(f"In ascolto su {', '.join(paths)} (ogni {interval} s, Ctrl+C per uscire)", flush=True)
+    previous = {}
+    failed = {}
+    while True:
+        plan, _ = build_plan(paths, output_dir, template, recursive)
+        current = {}
+        ready = []
+        for input_path, output_path in plan:
+            try:
+                stat = os.stat(input_path)
+            except OSError:
+                continue
+            current[input_path] = (stat.st_size, stat.st_mtime)
+            # Un file non convertibile viene ritentato solo se viene sostituito
+            if failed.get(input_path) == current[input_path]:
+                continue
+            if previous.get(input_path) == current[input_path]:
+                ready.append((input_path, output_path))
+        previous = current
+
+        if ready:
+            converter = BatchConverter(plan=ready, max_workers=workers, cache=cache, **options)
+            results, _ = converter.run(
+                progress_callback=print_progress
+            )
+            for result in results:
+                if result["error"]:
+                    failed[result["input"]] = current[result["input"]]
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PDFtoA - Conversione in PDF/A da riga di comando')
+    parser.add_argument('paths', nargs='+', help='File PDF o cartelle da convertire')
+    parser.add_argument('-o', '--output', required=True, help='Cartella di output')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Numero di processi (default: numero di CPU)')
+    parser.add_argument('--template', default=DEFAULT_NAMING_TEMPLATE,
+                        help='Modello del nome di output: {name}, {ext} (default: %(default)s)')
+    parser.add_argument('--no-recursive', dest='recursive', action='store_false',
+                        help='Non scendere nelle sottocartelle')
+    parser.add_argument('--force', action='store_true',
+                        help='Riconverte anche i file con output già aggiornato')
+    parser.add_argument('--watch', action='store_true',
+                        help='Resta in ascolto e converte i nuovi PDF depositati')
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help='Secondi tra due controlli in modalità --watch (default: %(default)s)')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help='Non usare la cache delle conversioni')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Cartella della cache (default: Documents/Abe/PDFtoA/cache)')
+    parser.add_argument('--profile', default=PROFILE_AUTO,
+                        choices=[PROFILE_AUTO, *PDFConverter.PROFILES],
+                        help='Profilo di conversione (default: %(default)s, sceglie in base alla dimensione)')
+    parser.add_argument('--low-memory-threshold', type=float, default=DEFAULT_LOW_MEMORY_THRESHOLD_MB,
+                        help='MB oltre i quali il profilo auto usa low_memory (default: %(default)s)')
+    parser.add_argument('--memory-limit', type=float, default=0,
+                        help='Memoria massima per processo in MB, 0 = nessun limite (solo Linux/macOS)')
+    args = parser.parse_args(argv)
+
+    # Il modello {index} non ha senso tra passate diverse: il nome deve restare stabile
+    if '{index}' in args.template:
+        parser.error("il modello {index} non è supportato da riga di comando")
+
+    cache = ConversionCache(args.cache_dir) if args.cache else None
+    options = {
+        "profile": args.profile,
+        "low_memory_threshold_mb": args.low_memory_threshold,
+        "memory_limit_mb": args.memory_limit
+    }
+
+    try:
+        if args.watch:
+            watch(args.paths, args.output, args.template, args.workers, args.recursive,
+                  args.interval, cache, **options)
+            return 0
+        summary = convert(args.paths, args.output, args.template, args.workers,
+                          args.recursive, args.force, cache, **options)
+    except KeyboardInterrupt:
+        return 130
+
+    if summary is None:
+        print("Nessun PDF da convertire")
+        return 0
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,9 +1,144 @@
 import pikepdf
 import os
+import json
+import threading
+
+try:
+    import psutil
+except ImportError:  # La misura della memoria è facoltativa
+    psutil = None
+
+PROFILE_AUTO = "auto"
+PROFILE_STANDARD = "standard"
+PROFILE_LOW_MEMORY = "low_memory"
+
+# Sopra questa dimensione il profilo automatico passa a PROFILE_LOW_MEMORY
+DEFAULT_LOW_MEMORY_THRESHOLD_MB = 100
+
+
+class PeakMemoryMonitor:
+    """
+    Misura il picco di memoria residente (RSS) del processo durante un blocco
+    di codice, campionandola da un thread secondario.
+
+    Uso:
+        with PeakMemoryMonitor() as monitor:
+            ...
+        monitor.peak_mb
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = psutil.Process() if psutil else None
+
+    def _sample(self):
+        rss = self._process.memory_info().rss
+        if rss > self.peak:
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self._process is not None:
+            self._sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        return False
+
+    @property
+    def peak_mb(self):
+        """Picco in MB, None se psutil non è disponibile"""
+        return self.peak / (1024 * 1024) if self._process is not None else None
+
+
+def limit_process_memory(limit_mb):
+    """
+    Limita la memoria che il processo corrente può allocare.
+
+    Oltre il limite le allocazioni falliscono e la conversione termina con
+    un errore invece di esaurire la RAM della macchina. Disponibile solo su
+    Linux e macOS; su Windows non ha effetto.
+
+    Returns:
+        bool: True se il limite è stato applicato
+    """
+    if not limit_mb:
+        return False
+    try:
+        import resource
+    except ImportError:
+        return False
+    limit = int(limit_mb * 1024 * 1024)
+    for name in ("RLIMIT_DATA", "RLIMIT_AS"):
+        kind = getattr(resource, name, None)
+        if kind is None:
+            continue
+        try:
+            soft, hard = resource.getrlimit(kind)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(kind, (limit, hard))
+            return True
+        except (ValueError, OSError):
+            continue
+    return False
+
 
 class PDFConverter:
+    # Da incrementare quando cambia il PDF prodotto: invalida la cache delle conversioni
+    VERSION = 1
+
+    # Opzioni di apertura e salvataggio per profilo.
+    # PROFILE_LOW_MEMORY legge il file a flusso e non linearizza né
+    # rigenera gli object stream, operazioni che richiedono di tenere in
+    # memoria l'intero grafo degli oggetti
+    PROFILES = {
+        PROFILE_STANDARD: {
+            "access_mode": "default",
+            "linearize": True,  # Ottimizzazione
+            "object_stream_mode": "generate",
+            "compress_streams": True
+        },
+        PROFILE_LOW_MEMORY: {
+            "access_mode": "stream",
+            "linearize": False,
+            "object_stream_mode": "preserve",
+            "compress_streams": True
+        }
+    }
+
+    @classmethod
+    def resolve_profile(cls, input_path, profile=PROFILE_AUTO,
+                        threshold_mb=DEFAULT_LOW_MEMORY_THRESHOLD_MB):
+        """Sceglie il profilo effettivo: con "auto" dipende dalla dimensione del file"""
+        if profile in cls.PROFILES:
+            return profile
+        try:
+            size_mb = os.path.getsize(input_path) / (1024 * 1024)
+        except OSError:
+            return PROFILE_STANDARD
+        return PROFILE_LOW_MEMORY if size_mb > threshold_mb else PROFILE_STANDARD
+
+    @classmethod
+    def settings_fingerprint(cls, profile=PROFILE_STANDARD):
+        """Stringa che identifica le impostazioni che influenzano il PDF prodotto"""
+        options = {k: v for k, v in cls.PROFILES[profile].items() if k != "access_mode"}
+        return json.dumps({"version": cls.VERSION, **options}, sort_keys=True)
+
     @staticmethod
-    def convert_to_pdfa(input_path, output_path=None):
+    def convert_to_pdfa(input_path, output_path=None, profile=PROFILE_STANDARD):
         """
         Converte un PDF in PDF/A usando pikepdf.
         
@@ -11,6 +146,8 @@ class PDFConverter:
             input_path (str): Percorso del file PDF da convertire
             output_path (str, optional): Percorso dove salvare il PDF/A.
                                        Se None, usa il nome del file originale + "_PDFA"
+            profile (str): PROFILE_STANDARD, PROFILE_LOW_MEMORY oppure
+                           PROFILE_AUTO (sceglie in base alla dimensione)
         
         Returns:
             str: Percorso del file convertito
@@ -22,7 +159,11 @@ class PDFConverter:
                 output_path = f"{base_path}.pdf"
 
             # Apri il PDF
-            with pikepdf.Pdf.open(input_path) as pdf:
+            profile = PDFConverter.resolve_profile(input_path, profile)
+            options = PDFConverter.PROFILES[profile]
+            with pikepdf.Pdf.open(
+                input_path, access_mode=pikepdf.AccessMode[options["access_mode"]]
+            ) as pdf:
                 # Imposta i metadati per PDF/A
                 with pdf.open_metadata(set_pikepdf_as_editor=False) as meta:
                     meta['pdf:Producer'] = 'Abe-Gestionale PDFtoA Converter'
@@ -32,13 +173,15 @@ class PDFConverter:
                     meta['pdfaid:conformance'] = 'B'  # Level B
 
                 # Salva come PDF/A
-                pdf.save(output_path, 
-                    linearize=True,  # Ottimizzazione
-                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
-                    compress_streams=True
+                pdf.save(output_path,
+                    linearize=options["linearize"],
+                    object_stream_mode=pikepdf.ObjectStreamMode[options["object_stream_mode"]],
+                    compress_streams=options["compress_streams"]
                 )
             
             return output_path
             
+        except MemoryError:
+            raise Exception("Errore durante la conversione: memoria insufficiente")
         except Exception as e:
             raise Exception(f"Errore durante la conversione: {str(e)}") 
\ No newline at end of file
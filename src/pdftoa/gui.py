@@ -3,14 +3,39 @@ from PyQt5.QtWidgets import (
     QMessageBox, QMenuBar, QMenu, QAction, QListWidget, QHBoxLayout,
     QProgressBar, QGroupBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QThread
 from PyQt5.QtGui import QIcon
 import fitz  # PyMuPDF
 import os
 from .converter import PDFConverter  # Aggiungi questo import
 from .settings import pdftoa_settings  # Aggiungi questo import
+from .batch import BatchConverter, format_summary
+from .cache import ConversionCache
 from ..utils import get_asset_path
 
+class BatchConversionWorker(QThread):
+    """Esegue il BatchConverter fuori dal thread della GUI"""
+    file_converted = pyqtSignal(int, int, dict)  # completati, totale, risultato
+    batch_completed = pyqtSignal(list, dict)  # risultati, riepilogo
+    batch_error = pyqtSignal(str)  # messaggio di errore
+
+    def __init__(self, files, output_dir, template, max_workers=None, cache=None, **options):
+        super().__init__()
+        self.converter = BatchConverter(
+            files, output_dir, template, max_workers, cache=cache, **options
+        )
+
+    def run(self):
+        try:
+            results, summary = self.converter.run(progress_callback=self.file_converted.emit)
+            self.batch_completed.emit(results, summary)
+        except Exception as e:
+            self.batch_error.emit(f"Errore durante la conversione: {str(e)}")
+
+    def stop(self):
+        self.converter.cancel()
+        self.wait()
+
 class PDFtoAGUI(QMainWindow):
     closed = pyqtSignal()
     
@@ -19,6 +44,7 @@ class PDFtoAGUI(QMainWindow):
         self.app = app
         self.setWindowTitle("PDFtoA - Conversione PDF in PDF/A")
         self.setGeometry(200, 200, 800, 600)
+        self.batch_worker = None
         self.setup_menu()
         self.setup_ui()
         self.pdf_files = []
@@ -68,6 +94,7 @@ class PDFtoAGUI(QMainWindow):
         files_layout = QVBoxLayout()
         
         self.files_list = QListWidget()
+        self.files_list.setSelectionMode(QListWidget.ExtendedSelection)
         self.files_list.itemSelectionChanged.connect(self.update_buttons)
         files_layout.addWidget(self.files_list)
         
@@ -92,11 +119,24 @@ class PDFtoAGUI(QMainWindow):
         self.progress_bar.setVisible(False)
         layout.addWidget(self.progress_bar)
         
-        # Pulsante converti
+        self.status_label = QLabel("")
+        self.status_label.setVisible(False)
+        layout.addWidget(self.status_label)
+        
+        # Pulsanti converti / interrompi
+        convert_layout = QHBoxLayout()
+        
         self.convert_button = QPushButton("Converti in PDF/A")
         self.convert_button.clicked.connect(self.convert_selected)
         self.convert_button.setEnabled(False)
-        layout.addWidget(self.convert_button)
+        convert_layout.addWidget(self.convert_button)
+        
+        self.cancel_button = QPushButton("Interrompi")
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        self.cancel_button.setVisible(False)
+        convert_layout.addWidget(self.cancel_button)
+        
+        layout.addLayout(convert_layout)
 
     def load_pdfs(self):
         """Carica uno o più file PDF"""
@@ -125,68 +165,98 @@ class PDFtoAGUI(QMainWindow):
         self.update_buttons()
 
     def convert_selected(self):
-        """Converte i file selezionati in PDF/A"""
+        """Converte i file selezionati in PDF/A in un'unica cartella di output"""
         selected_items = self.files_list.selectedItems()
         if not selected_items:
             return
+        if self.batch_worker and self.batch_worker.isRunning():
+            return
 
-        # Usa la directory predefinita dalle impostazioni
-        initial_dir = pdftoa_settings.current_settings["output_directory"]
-        
-        converted_files = []
-        failed_files = []
-        
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setMaximum(len(selected_items))
-        self.progress_bar.setValue(0)
-        
-        converter = PDFConverter()
-        
-        for i, item in enumerate(selected_items):
-            idx = self.files_list.row(item)
-            input_path = self.pdf_files[idx]
-            
+        files = [self.pdf_files[self.files_list.row(item)] for item in selected_items]
+
+        # Una sola scelta della cartella per tutto il lotto
+        output_dir = QFileDialog.getExistingDirectory(
+            self,
+            "Cartella di destinazione PDF/A",
+            pdftoa_settings.current_settings["output_directory"]
+        )
+        if not output_dir:
+            return
+
+        max_workers = pdftoa_settings.current_settings.get("max_workers") or None
+        template = pdftoa_settings.current_settings.get("naming_template", "{name}_PDFA.pdf")
+        settings = pdftoa_settings.current_settings
+        cache = None
+        if pdftoa_settings.current_settings.get("cache_enabled", True):
             try:
-                # Chiedi dove salvare il file
-                filename = os.path.basename(input_path)
-                base_name = os.path.splitext(filename)[0]
-                suggested_name = f"{base_name}_PDFA.pdf"
-                
-                output_path, _ = QFileDialog.getSaveFileName(
-                    self,
-                    "Salva PDF/A",
-                    os.path.join(initial_dir, suggested_name),
-                    "PDF Files (*.pdf)"
+                cache = ConversionCache(
+                    max_age_days=pdftoa_settings.current_settings["cache_max_age_days"],
+                    max_size_mb=pdftoa_settings.current_settings["cache_max_size_mb"]
                 )
-                
-                if output_path:
-                    # Converti il file
-                    converter.convert_to_pdfa(input_path, output_path)
-                    converted_files.append(filename)
-                    
-                    # Aggiorna la directory iniziale per il prossimo file
-                    initial_dir = os.path.dirname(output_path)
-                    
             except Exception as e:
-                failed_files.append((filename, str(e)))
-                
-            self.progress_bar.setValue(i + 1)
-        
-        self.progress_bar.setVisible(False)
-        
-        # Mostra il risultato
-        if converted_files:
-            success_msg = f"File convertiti con successo:\n- " + "\n- ".join(converted_files)
-            if failed_files:
-                success_msg += "\n\nFile non convertiti:\n- " + "\n- ".join(
-                    f"{name}: {error}" for name, error in failed_files
-                )
-            QMessageBox.information(self, "Completato", success_msg)
-        elif failed_files:
-            error_msg = "Errori durante la conversione:\n- " + "\n- ".join(
+                print(f"Cache delle conversioni non disponibile: {e}")
+
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setMaximum(len(files))
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Conversione di {len(files)} file in corso...")
+        self.status_label.setVisible(True)
+        self.cancel_button.setVisible(True)
+        self.cancel_button.setEnabled(True)
+        self.convert_button.setEnabled(False)
+        self.load_button.setEnabled(False)
+        self.remove_button.setEnabled(False)
+
+        self.batch_worker = BatchConversionWorker(
+            files, output_dir, template, max_workers, cache,
+            profile=settings.get("conversion_profile", "auto"),
+            low_memory_threshold_mb=settings.get("low_memory_threshold_mb", 100),
+            memory_limit_mb=settings.get("memory_limit_mb", 0)
+        )
+        self.batch_worker.file_converted.connect(self.on_file_converted)
+        self.batch_worker.batch_completed.connect(self.on_batch_completed)
+        self.batch_worker.batch_error.connect(self.on_batch_error)
+        self.batch_worker.start()
+
+    def cancel_conversion(self):
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.converter.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Interruzione in corso: attendo le conversioni avviate...")
+
+    def on_file_converted(self, done, total, result):
+        self.progress_bar.setValue(done)
+        if not self.batch_worker.converter.cancelled:
+            self.status_label.setText(f"{done}/{total} - {os.path.basename(result['input'])}")
+
+    def on_batch_completed(self, results, summary):
+        self.finish_conversion()
+
+        failed_files = [
+            (os.path.basename(r["input"]), r["error"])
+            for r in results if r["error"] and r["error"] != "Annullato"
+        ]
+        message = format_summary(summary)
+        if failed_files:
+            message += "\n\nFile non convertiti:\n- " + "\n- ".join(
                 f"{name}: {error}" for name, error in failed_files
             )
-            QMessageBox.critical(self, "Errore", error_msg)
+
+        if summary["converted"]:
+            QMessageBox.information(self, "Completato", message)
+        else:
+            QMessageBox.critical(self, "Errore", message)
+
+    def on_batch_error(self, error):
+        self.finish_conversion()
+        QMessageBox.critical(self, "Errore", error)
+
+    def finish_conversion(self):
+        self.progress_bar.setVisible(False)
+        self.status_label.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.load_button.setEnabled(True)
+        self.update_buttons()
 
     def update_buttons(self):
         """Aggiorna lo stato dei pulsanti"""
@@ -208,6 +278,8 @@ class PDFtoAGUI(QMainWindow):
             apply_stylesheet(self.app, theme=theme)
 
     def closeEvent(self, event):
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.stop()
         self.closed.emit()
         event.accept() 
 
@@ -2,7 +2,8 @@ import json
 import os
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QPushButton, QLabel, QGroupBox,
-    QHBoxLayout, QFileDialog
+    QHBoxLayout, QFileDialog, QLineEdit, QSpinBox, QGridLayout,
+    QCheckBox, QMessageBox, QComboBox
 )
 from PyQt5.QtCore import Qt
 
@@ -14,7 +15,15 @@ class PDFtoASettings:
         
         self.default_settings = {
             "output_directory": os.path.join(os.path.expanduser("~"), "Documents", "Abe", "PDFtoA"),
-            "last_directory": ""
+            "last_directory": "",
+            "naming_template": "{name}_PDFA.pdf",
+            "max_workers": 0,  # 0 = numero di CPU
+            "cache_enabled": True,
+            "cache_max_age_days": 90,
+            "cache_max_size_mb": 2048,
+            "conversion_profile": "auto",
+            "low_memory_threshold_mb": 100,
+            "memory_limit_mb": 0  # 0 = nessun limite
         }
         self.current_settings = self.load_settings()
         self.ensure_output_directory()
@@ -63,6 +72,73 @@ class SettingsDialog(QDialog):
         dir_group.setLayout(dir_layout)
         layout.addWidget(dir_group)
 
+        # Conversione in blocco
+        batch_group = QGroupBox("Conversione in Blocco")
+        batch_layout = QGridLayout()
+        
+        batch_layout.addWidget(QLabel("Nome file:"), 0, 0)
+        self.template_input = QLineEdit(pdftoa_settings.current_settings["naming_template"])
+        self.template_input.setToolTip("{name} = nome originale, {index} = posizione nel lotto")
+        batch_layout.addWidget(self.template_input, 0, 1)
+        
+        batch_layout.addWidget(QLabel("Processi (0 = automatico):"), 1, 0)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, os.cpu_count() or 1)
+        self.workers_spin.setValue(pdftoa_settings.current_settings["max_workers"])
+        batch_layout.addWidget(self.workers_spin, 1, 1)
+        
+        batch_layout.addWidget(QLabel("Profilo:"), 2, 0)
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItem("Automatico (in base alla dimensione)", "auto")
+        self.profile_combo.addItem("Standard (linearizzato)", "standard")
+        self.profile_combo.addItem("Basso consumo di memoria", "low_memory")
+        index = self.profile_combo.findData(pdftoa_settings.current_settings["conversion_profile"])
+        self.profile_combo.setCurrentIndex(max(index, 0))
+        batch_layout.addWidget(self.profile_combo, 2, 1)
+
+        batch_layout.addWidget(QLabel("Basso consumo oltre (MB):"), 3, 0)
+        self.threshold_spin = QSpinBox()
+        self.threshold_spin.setRange(1, 100000)
+        self.threshold_spin.setValue(pdftoa_settings.current_settings["low_memory_threshold_mb"])
+        batch_layout.addWidget(self.threshold_spin, 3, 1)
+
+        batch_layout.addWidget(QLabel("Memoria per processo (MB, 0 = illimitata):"), 4, 0)
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(0, 1024 * 1024)
+        self.memory_limit_spin.setValue(pdftoa_settings.current_settings["memory_limit_mb"])
+        self.memory_limit_spin.setToolTip("Disponibile solo su Linux e macOS")
+        batch_layout.addWidget(self.memory_limit_spin, 4, 1)
+
+        batch_group.setLayout(batch_layout)
+        layout.addWidget(batch_group)
+
+        # Cache delle conversioni
+        cache_group = QGroupBox("Cache Conversioni")
+        cache_layout = QGridLayout()
+
+        self.cache_check = QCheckBox("Riusa i PDF/A già prodotti per file identici")
+        self.cache_check.setChecked(pdftoa_settings.current_settings["cache_enabled"])
+        cache_layout.addWidget(self.cache_check, 0, 0, 1, 2)
+
+        cache_layout.addWidget(QLabel("Conserva per (giorni):"), 1, 0)
+        self.cache_age_spin = QSpinBox()
+        self.cache_age_spin.setRange(1, 3650)
+        self.cache_age_spin.setValue(pdftoa_settings.current_settings["cache_max_age_days"])
+        cache_layout.addWidget(self.cache_age_spin, 1, 1)
+
+        cache_layout.addWidget(QLabel("Dimensione massima (MB):"), 2, 0)
+        self.cache_size_spin = QSpinBox()
+        self.cache_size_spin.setRange(10, 1024 * 1024)
+        self.cache_size_spin.setValue(pdftoa_settings.current_settings["cache_max_size_mb"])
+        cache_layout.addWidget(self.cache_size_spin, 2, 1)
+
+        clear_cache_btn = QPushButton("Svuota Cache")
+        clear_cache_btn.clicked.connect(self.clear_cache)
+        cache_layout.addWidget(clear_cache_btn, 3, 1)
+
+        cache_group.setLayout(cache_layout)
+        layout.addWidget(cache_group)
+
         # Pulsante salva
         save_button = QPushButton("Salva")
         save_button.clicked.connect(self.save_settings)
@@ -80,7 +156,35 @@ class SettingsDialog(QDialog):
             pdftoa_settings.current_settings["output_directory"] = dir_path
             self.dir_label.setText(dir_path)
 
+    def clear_cache(self):
+        from .cache import ConversionCache
+        try:
+            ConversionCache().clear()
+            QMessageBox.information(self, "Cache", "Cache delle conversioni svuotata")
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Impossibile svuotare la cache: {str(e)}")
+
     def save_settings(self):
+        template = self.template_input.text() or "{name}_PDFA.pdf"
+        # Un segnaposto sbagliato (es. {nome}) farebbe fallire l'intero lotto
+        try:
+            template.format(name="x", index=1, ext="pdf")
+        except (KeyError, IndexError, ValueError) as e:
+            QMessageBox.warning(
+                self,
+                "Modello di nome non valido",
+                f"Il modello \"{template}\" non è valido ({e}).\n"
+                "Usa solo {name}, {index} ed {ext}."
+            )
+            return
+        pdftoa_settings.current_settings["naming_template"] = template
+        pdftoa_settings.current_settings["max_workers"] = self.workers_spin.value()
+        pdftoa_settings.current_settings["conversion_profile"] = self.profile_combo.currentData()
+        pdftoa_settings.current_settings["low_memory_threshold_mb"] = self.threshold_spin.value()
+        pdftoa_settings.current_settings["memory_limit_mb"] = self.memory_limit_spin.value()
+        pdftoa_settings.current_settings["cache_enabled"] = self.cache_check.isChecked()
+        pdftoa_settings.current_settings["cache_max_age_days"] = self.cache_age_spin.value()
+        pdftoa_settings.current_settings["cache_max_size_mb"] = self.cache_size_spin.value()
         pdftoa_settings.save_settings()
         self.accept()
 